@@ -0,0 +1,145 @@
+"""Micro-benchmark: line based vs. byte level parsing of the Hue event stream.
+
+Compares the former ``iter_events`` implementation (``iter_lines`` with
+unicode decoding, ``strip`` per line, joined strings and ``json.loads``)
+with :class:`hue_plugin.hue_client.SSEParser` plus ``decode_json`` on the
+same synthetic stream of light updates, once for the framing alone and
+once including JSON decoding. Run from the repository root::
+
+    python -m benchmarks.sse_parser [--messages 20000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import time
+from typing import Any, Callable, Iterator, List
+
+from requests.models import Response
+
+from hue_plugin.hue_client import SSEParser, _orjson, decode_json
+
+
+def build_stream(messages: int) -> bytes:
+    parts: List[bytes] = []
+    for index in range(messages):
+        payload = [
+            {
+                "creationtime": "2024-01-01T12:00:00Z",
+                "id": f"evt-{index}",
+                "type": "update",
+                "data": [
+                    {
+                        "id": f"light-{index % 40}",
+                        "id_v1": f"/lights/{index % 40}",
+                        "type": "light",
+                        "owner": {"rid": f"device-{index % 40}", "rtype": "device"},
+                        "dimming": {"brightness": float(index % 100)},
+                        "on": {"on": bool(index % 2)},
+                    }
+                ],
+            }
+        ]
+        parts.append(f"id: {index}:0\n".encode())
+        parts.append(b"data: " + json.dumps(payload).encode() + b"\n\n")
+        if index % 50 == 0:
+            parts.append(b": hi\n\n")
+    return b"".join(parts)
+
+
+def _response(stream: bytes) -> Response:
+    response = Response()
+    response.raw = io.BytesIO(stream)
+    response.encoding = "utf-8"
+    response.status_code = 200
+    return response
+
+
+def legacy_events(stream: bytes, decode: Callable[[str], Any] = json.loads) -> Iterator[Any]:
+    data_lines: List[str] = []
+    for raw_line in _response(stream).iter_lines(decode_unicode=True):
+        if raw_line is None:
+            continue
+        line = raw_line.strip()
+        if line == "":
+            if not data_lines:
+                continue
+            payload_str = "\n".join(data_lines)
+            data_lines = []
+            try:
+                yield decode(payload_str)
+            except ValueError:
+                continue
+            continue
+        if line.startswith(":"):
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+
+
+def parser_events(
+    stream: bytes,
+    chunk_size: int = 512,
+    decode: Callable[[bytes], Any] = decode_json,
+) -> Iterator[Any]:
+    parser = SSEParser()
+    for chunk in _response(stream).iter_content(chunk_size=chunk_size):
+        for data in parser.feed(chunk):
+            try:
+                yield decode(data)
+            except ValueError:
+                continue
+
+
+def _identity(data: Any) -> Any:
+    return data
+
+
+def _measure(name: str, run: Callable[[], int], repeat: int) -> float:
+    best = float("inf")
+    count = 0
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = run()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    print(f"{name:<36} {best * 1000:9.1f} ms  ({count} Nachrichten, {count / best:,.0f}/s)")
+    return best
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    stream = build_stream(args.messages)
+    print(f"Stream: {len(stream) / 1024:.0f} KiB, {args.messages} Nachrichten")
+    _measure(
+        "iter_lines (nur Framing)",
+        lambda: sum(1 for _ in legacy_events(stream, decode=_identity)),
+        args.repeat,
+    )
+    _measure(
+        "SSEParser (nur Framing)",
+        lambda: sum(1 for _ in parser_events(stream, decode=_identity)),
+        args.repeat,
+    )
+    legacy = _measure("iter_lines + json.loads", lambda: sum(1 for _ in legacy_events(stream)), args.repeat)
+    decoder = "orjson" if _orjson is not None else "json"
+    fast = _measure(
+        f"SSEParser + decode_json ({decoder})",
+        lambda: sum(1 for _ in parser_events(stream)),
+        args.repeat,
+    )
+    print(f"Faktor: {legacy / fast:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
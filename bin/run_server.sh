@@ -40,12 +40,25 @@ cleanup() {
     kill "$FORWARDER_PID" >/dev/null 2>&1 || true
     wait "$FORWARDER_PID" 2>/dev/null || true
   fi
+  if [[ -n "${COMMAND_DAEMON_PID:-}" ]]; then
+    kill "$COMMAND_DAEMON_PID" >/dev/null 2>&1 || true
+    wait "$COMMAND_DAEMON_PID" 2>/dev/null || true
+  fi
 }
 
 trap cleanup EXIT INT TERM
 
-"$PYTHON_BIN" -m hue_plugin.event_forwarder >/dev/null 2>&1 &
-FORWARDER_PID=$!
+# with HUE_PLUGIN_EMBEDDED_FORWARDER the API server runs the forwarder itself
+case "${HUE_PLUGIN_EMBEDDED_FORWARDER:-0}" in
+  1|true|yes|on) ;;
+  *)
+    "$PYTHON_BIN" -m hue_plugin.event_forwarder >/dev/null 2>&1 &
+    FORWARDER_PID=$!
+    ;;
+esac
+
+"$PYTHON_BIN" -m hue_plugin.command_daemon >/dev/null 2>&1 &
+COMMAND_DAEMON_PID=$!
 
 "$PYTHON_BIN" -m uvicorn hue_plugin.server:app --host 0.0.0.0 --port 5510 "$@"
 status=$?
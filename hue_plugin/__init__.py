@@ -2,20 +2,24 @@
 
 from .config import (
     ConfigError,
+    ConfigSnapshot,
     HueBridgeConfig,
     PluginConfig,
     ensure_bridge_id,
     load_config,
+    load_config_snapshot,
     save_config,
 )
 from .hue_client import HueBridgeClient
 
 __all__ = [
     "ConfigError",
+    "ConfigSnapshot",
     "HueBridgeConfig",
     "PluginConfig",
     "ensure_bridge_id",
     "load_config",
+    "load_config_snapshot",
     "save_config",
     "HueBridgeClient",
 ]
@@ -0,0 +1,1044 @@
+"""Asyncio engine for the Hue → Loxone event forwarder.
+
+Alternative to the thread based :class:`~hue_plugin.event_forwarder.HueEventForwarder`:
+all bridges share one event loop. Each bridge has an asynchronous event
+stream reader that reconciles the mapped resources after every
+(re)connection, deliveries to the Miniserver are
+coroutines (ordered per virtual input like the thread variant) and button
+resets are scheduled with ``loop.call_later``. Failed deliveries go to the
+same :class:`~hue_plugin.outbox.DeliveryOutbox` as in thread mode; its
+retry thread uses a blocking :class:`LoxoneSender`. Mapping semantics are the
+same as in thread mode. Requires the optional ``httpx`` package.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+try:  # pragma: no cover - exercised implicitly when httpx is installed
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None  # type: ignore[assignment]
+
+from .config import (
+    ConfigError,
+    HueBridgeConfig,
+    LoxoneSettings,
+    PluginConfig,
+    VirtualInputConfig,
+    config_path,
+    load_config_snapshot,
+)
+from .config_watcher import BridgeAssignments, ConfigWatcher, bridge_assignments, diff_bridge_assignments
+from .delivery_filter import DEFER, SEND, DeliveryFilter, filter_enabled
+from .delivery_queue import BACKPRESSURE_POLICIES
+from .event_forwarder import (
+    EVENT_OUTCOMES,
+    EventSequencer,
+    LoxoneSender,
+    _split_credentials,
+    _yield_to_embedded_forwarder,
+    extract_button_event,
+    extract_button_report,
+    extract_motion_state,
+    extract_report_time,
+    forwarder_metrics,
+    observe_loxone_request,
+    open_event_store,
+    start_metrics_server,
+    stop_metrics_server,
+)
+from .hue_client import (
+    BRIDGE_REQUEST_SECONDS,
+    BRIDGE_REQUESTS,
+    HueBridgeError,
+    ResourceIdFilter,
+    SSEParser,
+    decode_json,
+    iter_timed_event_entries,
+)
+from .latency import LatencyTracker, parse_creation_time
+from .metrics import REGISTRY, MetricFamily
+from .outbox import DeliveryOutbox, outbox_path
+
+_Factory = Callable[[], Awaitable[None]]
+
+
+def _log(message: str) -> None:
+    print(f"[hue-forwarder-async] {message}", flush=True)
+
+
+def async_available() -> bool:
+    """Whether the asyncio engine can run (``httpx`` is installed)."""
+
+    return httpx is not None
+
+
+def _require_httpx() -> None:
+    if httpx is None:
+        raise RuntimeError("Der asyncio-Modus benötigt das Paket 'httpx'.")
+
+
+class AsyncDeliveryLanes:
+    """Bounded, key-ordered delivery queue for coroutines.
+
+    Counterpart of :class:`~hue_plugin.delivery_queue.DeliveryQueue` inside
+    an event loop: jobs of one key run in submission order, at most
+    ``workers`` jobs run concurrently and ``policy`` handles a full queue
+    exactly like the thread variant.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 4,
+        max_pending: int = 256,
+        policy: str = "drop_oldest",
+        block_timeout: float = 1.0,
+        name: str = "hue-delivery",
+    ) -> None:
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unbekannte Backpressure-Strategie: {policy}")
+        self._workers = max(1, int(workers))
+        self._max_pending = max(1, int(max_pending))
+        self._policy = policy
+        self._block_timeout = block_timeout
+        self._name = name
+        self._condition = asyncio.Condition()
+        self._slots = asyncio.Semaphore(self._workers)
+        self._lanes: Dict[str, Deque[Tuple[int, _Factory]]] = {}
+        self._runners: Dict[str, asyncio.Task] = {}
+        self._sequence = 0
+        self._pending = 0
+        self._running = 0
+        self._closed = False
+        self._stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "max_queue_depth": 0,
+        }
+
+    async def submit(self, key: str, factory: _Factory) -> bool:
+        """Queue the coroutine returned by ``factory`` behind earlier jobs of ``key``."""
+
+        async with self._condition:
+            if self._closed:
+                return False
+            if self._pending >= self._max_pending:
+                if not await self._make_room_locked(key):
+                    self._stats["dropped"] += 1
+                    return False
+            self._stats["submitted"] += 1
+            self._sequence += 1
+            self._lanes.setdefault(key, deque()).append((self._sequence, factory))
+            self._pending += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._pending)
+            if key not in self._runners:
+                self._runners[key] = asyncio.get_running_loop().create_task(self._drain(key))
+            return True
+
+    async def _make_room_locked(self, key: str) -> bool:
+        if self._policy == "drop_newest":
+            return False
+        if self._policy == "block":
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(
+                        lambda: self._pending < self._max_pending or self._closed
+                    ),
+                    timeout=self._block_timeout,
+                )
+            except asyncio.TimeoutError:
+                return False
+            return not self._closed
+
+        victim = key if self._lanes.get(key) else None
+        if victim is None:
+            heads = [(lane[0][0], name) for name, lane in self._lanes.items() if lane]
+            if not heads:
+                return False
+            victim = min(heads)[1]
+        self._lanes[victim].popleft()
+        self._pending -= 1
+        self._stats["dropped"] += 1
+        if not self._lanes[victim]:
+            del self._lanes[victim]
+        _log(f"Warteschlange '{self._name}' voll, älteste Weiterleitung für '{victim}' verworfen.")
+        return True
+
+    async def _drain(self, key: str) -> None:
+        while True:
+            async with self._condition:
+                lane = self._lanes.get(key)
+                if not lane:
+                    self._runners.pop(key, None)
+                    self._condition.notify_all()
+                    return
+                _, factory = lane.popleft()
+                if not lane:
+                    del self._lanes[key]
+                self._pending -= 1
+                self._running += 1
+                self._condition.notify_all()
+            failed = False
+            try:
+                async with self._slots:
+                    await factory()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pragma: no cover - jobs handle their own errors
+                failed = True
+                _log(f"Weiterleitung für '{key}' fehlgeschlagen: {exc}")
+            finally:
+                async with self._condition:
+                    self._stats["failed" if failed else "completed"] += 1
+                    self._running -= 1
+                    self._condition.notify_all()
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has finished; ``False`` on timeout."""
+
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: not self._pending and not self._running),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                return False
+            return True
+
+    async def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop accepting jobs, let queued ones finish up to ``timeout``."""
+
+        await self.join(timeout=timeout)
+        async with self._condition:
+            self._closed = True
+            dropped = self._pending
+            self._lanes.clear()
+            self._pending = 0
+            self._stats["dropped"] += dropped
+            runners = list(self._runners.values())
+            self._runners.clear()
+            self._condition.notify_all()
+        for runner in runners:
+            runner.cancel()
+        if dropped:
+            _log(f"Warteschlange '{self._name}' beendet, {dropped} Weiterleitung(en) verworfen.")
+
+    def stats(self) -> Dict[str, Any]:
+        payload: Dict[str, Any] = dict(self._stats)
+        payload["queue_depth"] = self._pending
+        payload["in_flight"] = self._running
+        payload["capacity"] = self._max_pending
+        payload["workers"] = self._workers
+        payload["policy"] = self._policy
+        return payload
+
+
+class AsyncLoxoneSender:
+    """Asynchronous variant of :class:`~hue_plugin.event_forwarder.LoxoneSender`.
+
+    Uses one keep-alive ``httpx.AsyncClient`` per Miniserver base URL.
+    """
+
+    def __init__(
+        self,
+        settings: LoxoneSettings | None = None,
+        *,
+        pool_maxsize: int = 4,
+        timeout: float = 5,
+    ) -> None:
+        self._base_url = ""
+        self._request_base = ""
+        self._auth: Optional[Tuple[str, str]] = None
+        self._method = "POST"
+        self._pool_maxsize = max(1, int(pool_maxsize))
+        self._timeout = timeout
+        self._client: Any = None
+        self._stale: List[Any] = []
+        if settings:
+            self.update(settings)
+
+    def update(self, settings: LoxoneSettings) -> None:
+        base_url = (settings.base_url or "").strip().rstrip("/")
+        method = (settings.event_method or "POST").strip().upper()
+        if method not in {"GET", "POST"}:
+            method = "POST"
+        if base_url != self._base_url:
+            if self._client is not None:
+                self._stale.append(self._client)
+                self._client = None
+            self._base_url = base_url
+            self._request_base, self._auth = _split_credentials(base_url)
+        self._method = method
+
+    @property
+    def available(self) -> bool:
+        return bool(self._base_url)
+
+    def _http(self) -> Any:
+        if self._client is None:
+            _require_httpx()
+            self._client = httpx.AsyncClient(
+                auth=self._auth,
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self._pool_maxsize,
+                    max_keepalive_connections=self._pool_maxsize,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        clients, self._stale = self._stale, []
+        if self._client is not None:
+            clients.append(self._client)
+            self._client = None
+        for client in clients:
+            await client.aclose()
+
+    async def send(self, virtual_input: str, value: str) -> None:
+        if not self._request_base:
+            raise RuntimeError("Keine Loxone-Basis-URL konfiguriert.")
+        if self._stale:
+            stale, self._stale = self._stale, []
+            for client in stale:
+                await client.aclose()
+
+        safe_input = quote(virtual_input, safe="")
+        safe_value = quote(value, safe="")
+        url = f"{self._request_base}/dev/sps/io/{safe_input}/{safe_value}"
+
+        client = self._http()
+        started = time.perf_counter()
+        status = "error"
+        try:
+            if self._method == "POST":
+                response = await client.post(url)
+            else:
+                response = await client.get(url)
+            response.raise_for_status()
+            status = "ok"
+        except httpx.HTTPError as exc:
+            if isinstance(exc, httpx.HTTPStatusError):
+                status = str(exc.response.status_code)
+            raise RuntimeError(f"Anfrage an Loxone fehlgeschlagen: {exc}") from exc
+        finally:
+            observe_loxone_request(status, time.perf_counter() - started)
+
+
+class AsyncBridgeWorker:
+    """Per-bridge tasks of the asyncio engine: event stream, reconciliation, resets."""
+
+    def __init__(
+        self,
+        bridge_config: HueBridgeConfig,
+        sender: AsyncLoxoneSender,
+        state_store: Any,
+        delivery: Optional[AsyncDeliveryLanes] = None,
+        outbox: Optional[DeliveryOutbox] = None,
+    ) -> None:
+        self._bridge_config = bridge_config
+        self._sender = sender
+        self._outbox = outbox
+        self._state_store = state_store
+        self._delivery = delivery or AsyncDeliveryLanes(name=f"hue-delivery-{bridge_config.id}")
+        self._lookup: Dict[Tuple[str, str], Tuple[VirtualInputConfig, ...]] = {}
+        self._sequencer = EventSequencer()
+        self._health: Dict[str, Any] = {
+            "connected": False,
+            "connects": 0,
+            "disconnects": 0,
+            "backoff": 0.0,
+            "reconciliations": 0,
+            "last_connect": None,
+            "last_event": None,
+            "last_heartbeat": None,
+        }
+        self._events: Dict[str, int] = dict.fromkeys(EVENT_OUTCOMES, 0)
+        self._resets: Dict[str, Tuple[asyncio.TimerHandle, VirtualInputConfig]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._client: Any = None
+        self._payload_filter = ResourceIdFilter()
+        self._payload_stats: Dict[str, int] = {"decoded": 0, "skipped": 0}
+        self._reset_stats: Dict[str, int] = {"scheduled": 0, "rescheduled": 0, "fired": 0}
+        self._filter = DeliveryFilter()
+        self._held: Dict[str, Tuple[asyncio.TimerHandle, VirtualInputConfig]] = {}
+        self._latency = LatencyTracker()
+
+    @property
+    def bridge_id(self) -> str:
+        return self._bridge_config.id
+
+    def delivery_stats(self) -> Dict[str, Any]:
+        return self._delivery.stats()
+
+    def payload_stats(self) -> Dict[str, int]:
+        return dict(self._payload_stats)
+
+    def stream_health(self) -> Dict[str, Any]:
+        return dict(self._health)
+
+    def dedup_stats(self) -> Dict[str, int]:
+        return self._sequencer.stats()
+
+    def event_stats(self) -> Dict[str, int]:
+        return dict(self._events)
+
+    def filter_stats(self) -> Dict[str, Dict[str, int]]:
+        return self._filter.stats()
+
+    def latency_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        return self._latency.stats()
+
+    @property
+    def latency(self) -> LatencyTracker:
+        return self._latency
+
+    def timer_stats(self) -> Dict[str, int]:
+        payload = dict(self._reset_stats)
+        payload["pending"] = len(self._resets)
+        return payload
+
+    def update_bridge(self, config: HueBridgeConfig) -> None:
+        self._bridge_config = config
+
+    def update_mappings(self, mappings: Iterable[VirtualInputConfig]) -> None:
+        grouped: Dict[Tuple[str, str], List[VirtualInputConfig]] = defaultdict(list)
+        for mapping in mappings:
+            grouped[(mapping.resource_id, mapping.resource_type)].append(mapping)
+        self._lookup = {key: tuple(items) for key, items in grouped.items()}
+        self._payload_filter = ResourceIdFilter(rid for rid, _ in self._lookup)
+        self._sequencer.retain(rid for rid, _ in self._lookup)
+        self._filter.retain(mapping.id for items in self._lookup.values() for mapping in items)
+
+    def start(self) -> None:
+        self._spawn(asyncio.get_running_loop().create_task(self._stream_loop()))
+
+    def _spawn(self, task: asyncio.Task) -> None:
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # deliver outstanding resets now so no virtual input stays active
+        for mapping_id in list(self._resets):
+            handle, mapping = self._resets.pop(mapping_id)
+            handle.cancel()
+            self._reset_stats["fired"] += 1
+            await self._delivery.submit(mapping.id, lambda mapping=mapping: self._send_reset(mapping))
+        for mapping_id in list(self._held):
+            handle, mapping = self._held.pop(mapping_id)
+            handle.cancel()
+            await self._delivery.submit(mapping.id, lambda mapping=mapping: self._send_held_back(mapping))
+        await self._delivery.close(timeout=2.0)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -- bridge access -------------------------------------------------------------
+    def _http(self) -> Any:
+        if self._client is None:
+            _require_httpx()
+            headers = {"hue-application-key": self._bridge_config.application_key}
+            if self._bridge_config.client_key:
+                headers["hue-client-key"] = self._bridge_config.client_key
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                verify=self._bridge_config.verify_tls,
+                timeout=httpx.Timeout(10.0, read=60.0),
+            )
+        return self._client
+
+    def _url(self, path: str) -> str:
+        protocol = "https" if self._bridge_config.use_https else "http"
+        return f"{protocol}://{self._bridge_config.bridge_ip}/{path}"
+
+    async def _iter_raw_events(
+        self,
+        *,
+        on_connect: Optional[Callable[[], Awaitable[None]]] = None,
+        on_disconnect: Optional[Callable[[], None]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield the undecoded messages of one event stream connection.
+
+        As with :meth:`HueBridgeClient.iter_raw_events`, ``on_connect`` runs
+        once the stream is up and ``on_disconnect`` when it ended for any
+        reason, including a clean close by the bridge.
+        """
+
+        try:
+            async with self._http().stream(
+                "GET",
+                self._url("eventstream/clip/v2"),
+                headers={"Accept": "text/event-stream"},
+            ) as response:
+                response.raise_for_status()
+                try:
+                    if on_connect is not None:
+                        await on_connect()
+                    parser = SSEParser()
+                    async for chunk in response.aiter_bytes():
+                        comments = parser.comments
+                        for data in parser.feed(chunk):
+                            self._health["last_event"] = time.time()
+                            yield data
+                        if parser.comments != comments:
+                            self._health["last_heartbeat"] = time.time()
+                finally:
+                    if on_disconnect is not None:
+                        on_disconnect()
+        except httpx.HTTPError as exc:
+            raise HueBridgeError(f"Event-Stream konnte nicht aufgebaut werden: {exc}") from exc
+
+    async def _get_resources(self, rtype: str) -> List[Dict[str, Any]]:
+        labels = {"bridge": self.bridge_id, "method": "GET", "resource": rtype}
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._http().get(self._url(f"clip/v2/resource/{rtype}"))
+            status = str(response.status_code)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            raise HueBridgeError(f"Anfrage an die Bridge fehlgeschlagen: {exc}") from exc
+        finally:
+            BRIDGE_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+            BRIDGE_REQUESTS.inc(status=status, **labels)
+        items = data.get("data") if isinstance(data, dict) else None
+        return [item for item in items or [] if isinstance(item, dict)]
+
+    # -- long running tasks ----------------------------------------------------------
+    async def _stream_loop(self) -> None:
+        backoff = 5.0
+        while True:
+            if not self._lookup or not self._sender.available:
+                await asyncio.sleep(5.0)
+                continue
+            events = self._iter_raw_events(
+                on_connect=self._on_stream_connected,
+                on_disconnect=self._on_stream_closed,
+            )
+            try:
+                async for data in events:
+                    await self.handle_raw_payload(data)
+            except HueBridgeError as exc:
+                _log(f"Event-Stream für Bridge '{self.bridge_id}' unterbrochen: {exc}")
+            except Exception as exc:
+                # e.g. httpx.StreamError; the bridge must not stop forwarding for good
+                _log(f"Unerwarteter Fehler im Event-Stream für Bridge '{self.bridge_id}': {exc!r}")
+            else:
+                # closed by the bridge, reconnect right away
+                backoff = 5.0
+                continue
+            finally:
+                await events.aclose()
+            self._health["backoff"] = backoff
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    async def _on_stream_connected(self) -> None:
+        self._health["connected"] = True
+        self._health["connects"] += 1
+        self._health["backoff"] = 0.0
+        self._health["last_connect"] = time.time()
+        await self._reconcile()
+
+    def _on_stream_closed(self) -> None:
+        self._health["connected"] = False
+        self._health["disconnects"] += 1
+
+    async def _reconcile(self) -> None:
+        """Forward state changes that happened while the stream was down."""
+
+        types = {rtype for (_, rtype) in self._lookup}
+        for rtype, handler in (("motion", self.handle_motion_poll), ("button", self.handle_button_poll)):
+            if rtype not in types:
+                continue
+            try:
+                resources = await self._get_resources(rtype)
+            except HueBridgeError as exc:
+                _log(
+                    f"Ressourcen '{rtype}' konnten nicht abgefragt werden "
+                    f"(Bridge '{self.bridge_id}'): {exc}"
+                )
+                continue
+            await handler(resources)
+        self._health["reconciliations"] += 1
+
+    # -- dispatch --------------------------------------------------------------------
+    async def handle_raw_payload(self, data: bytes) -> None:
+        """Decode and dispatch a stream message if it mentions a mapped resource."""
+
+        received = time.time()
+        self._events["received"] += 1
+        if not self._payload_filter.matches(data):
+            self._payload_stats["skipped"] += 1
+            return
+        try:
+            payload = decode_json(data)
+        except ValueError:
+            return
+        self._payload_stats["decoded"] += 1
+        await self.handle_payload(payload, received=received)
+
+    async def handle_payload(self, payload: Any, *, received: Optional[float] = None) -> None:
+        """Queue deliveries for every mapped entry of an event stream payload."""
+
+        lookup = self._lookup
+        received = received or time.time()
+        for created, entry in iter_timed_event_entries(payload):
+            rid = entry.get("id")
+            rtype = entry.get("type")
+            if not isinstance(rid, str) or not isinstance(rtype, str):
+                continue
+            mappings = lookup.get((rid, rtype), ())
+            if not mappings or not self._accept_stream_entry(rid, rtype, entry):
+                continue
+            trace = {"received": received}
+            created_at = parse_creation_time(created)
+            if created_at is not None:
+                trace["created"] = created_at
+            self._events["matched"] += len(mappings)
+            for mapping in mappings:
+                await self._delivery.submit(
+                    mapping.id,
+                    lambda entry=entry, mapping=mapping, trace=trace: self._deliver(entry, mapping, trace),
+                )
+
+    async def handle_motion_poll(self, resources: Iterable[Dict[str, Any]]) -> None:
+        """Forward motion state changes found when reconciling with the bridge."""
+
+        lookup = self._lookup
+        trace = {"received": time.time()}
+        for resource in resources:
+            rid = resource.get("id")
+            mappings = lookup.get((rid, "motion")) if isinstance(rid, str) else None
+            if not mappings:
+                continue
+            state = extract_motion_state(resource)
+            if state is None:
+                continue
+            if not self._sequencer.accept(rid, state, extract_report_time(resource), initial=state is True):
+                continue
+            for mapping in mappings:
+                await self._delivery.submit(
+                    mapping.id,
+                    lambda mapping=mapping, state=state: self._send_motion(
+                        mapping, state, trace, polled=True
+                    ),
+                )
+
+    def _accept_stream_entry(self, resource_id: str, rtype: str, entry: Dict[str, Any]) -> bool:
+        if rtype == "motion":
+            state = extract_motion_state(entry)
+            if state is None:
+                return False
+            return self._sequencer.accept(resource_id, state, extract_report_time(entry))
+        if rtype == "button":
+            return self._sequencer.accept(resource_id, None, extract_report_time(entry))
+        return True
+
+    async def handle_button_poll(self, resources: Iterable[Dict[str, Any]]) -> None:
+        """Forward button presses whose report is newer than the last one seen."""
+
+        lookup = self._lookup
+        trace = {"received": time.time()}
+        for resource in resources:
+            rid = resource.get("id")
+            mappings = lookup.get((rid, "button")) if isinstance(rid, str) else None
+            if not mappings:
+                continue
+            report = extract_button_report(resource)
+            reported = extract_report_time(resource)
+            if report is None or reported is None:
+                continue
+            if not self._sequencer.accept(rid, None, reported, initial=False):
+                continue
+            entry = {"id": rid, "type": "button", "button": {"button_report": report}}
+            for mapping in mappings:
+                await self._delivery.submit(
+                    mapping.id,
+                    lambda entry=entry, mapping=mapping: self._deliver(entry, mapping, trace),
+                )
+
+    async def _deliver(
+        self,
+        entry: Dict[str, Any],
+        mapping: VirtualInputConfig,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        trace = {**(trace or {}), "dispatched": time.time()}
+        try:
+            if mapping.resource_type == "button":
+                await self._handle_button_event(entry, mapping, trace)
+            elif mapping.resource_type == "motion":
+                state = extract_motion_state(entry)
+                if state is not None:
+                    await self._send_motion(mapping, state, trace)
+        except RuntimeError as exc:
+            _log(f"Weiterleitung für Bridge '{self.bridge_id}' fehlgeschlagen: {exc}")
+
+    def _record_event(self, mapping: VirtualInputConfig, state: str, value: Optional[str], **kwargs: Any) -> None:
+        # the forwarder opens the store with write-behind, so this only
+        # appends to memory and does not block the loop on disk I/O
+        if self._state_store:
+            self._state_store.record(mapping, state=state, value=value, **kwargs)
+
+    async def _forward(
+        self,
+        mapping: VirtualInputConfig,
+        value: str,
+        state: str,
+        *,
+        event_type: str,
+        trigger: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Send and record ``value``; see ``BridgeWorker._forward``."""
+
+        action, delay = self._filter.offer(mapping, value, (state, event_type, trigger, extra, trace))
+        if action == DEFER:
+            handle = asyncio.get_running_loop().call_later(delay, self._release_held_back, mapping)
+            self._held[mapping.id] = (handle, mapping)
+        if action != SEND:
+            return
+        await self._send_value(
+            mapping, value, state, event_type=event_type, trigger=trigger, extra=extra, trace=trace
+        )
+
+    def _release_held_back(self, mapping: VirtualInputConfig) -> None:
+        self._held.pop(mapping.id, None)
+        task = asyncio.get_running_loop().create_task(
+            self._delivery.submit(mapping.id, lambda: self._send_held_back(mapping))
+        )
+        self._spawn(task)
+
+    async def _send_held_back(self, mapping: VirtualInputConfig) -> None:
+        pending = self._filter.take_pending(mapping)
+        if pending is None:
+            return
+        value, (state, event_type, trigger, extra, trace) = pending
+        trace = {**(trace or {}), "dispatched": time.time()}
+        try:
+            await self._send_value(
+                mapping, value, state, event_type=event_type, trigger=trigger, extra=extra, trace=trace
+            )
+        except RuntimeError as exc:
+            _log(f"Weiterleitung für Bridge '{self.bridge_id}' fehlgeschlagen: {exc}")
+
+    async def _send_value(
+        self,
+        mapping: VirtualInputConfig,
+        value: str,
+        state: str,
+        *,
+        event_type: str,
+        trigger: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        if filter_enabled(mapping):
+            extra = {**(extra or {}), "filter": self._filter.counters(mapping.id)}
+        trace = {"dispatched": time.time(), **(trace or {})}
+        outbox = self._outbox
+        queued = dict(event_type=event_type, state=state, trigger=trigger, extra=extra, trace=trace)
+        if outbox is not None and outbox.pending_for(mapping.id):
+            # the outbox appends with fsync, keep that off the loop
+            await asyncio.to_thread(outbox.put, mapping, value, **queued)
+            return
+        try:
+            await self._sender.send(mapping.virtual_input, value)
+        except RuntimeError as exc:
+            self._events["failed"] += 1
+            self._filter.send_failed(mapping, value)
+            if outbox is None:
+                raise
+            _log(
+                f"Weiterleitung an '{mapping.virtual_input}' fehlgeschlagen, "
+                f"wird später wiederholt: {exc}"
+            )
+            await asyncio.to_thread(outbox.put, mapping, value, **queued)
+            return
+        trace["responded"] = time.time()
+        self._events["forwarded"] += 1
+        self._record_event(
+            mapping, state, value, event_type=event_type, trigger=trigger, extra=extra, trace=trace
+        )
+        self._latency.observe(mapping.id, trace)
+
+    async def _handle_button_event(
+        self,
+        entry: Dict[str, Any],
+        mapping: VirtualInputConfig,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        event_name = extract_button_event(entry)
+        if event_name is None:
+            return
+        if mapping.trigger and mapping.trigger != event_name:
+            return
+        await self._forward(
+            mapping,
+            mapping.active_value,
+            "active",
+            event_type="button",
+            trigger=event_name,
+            trace=trace,
+        )
+        if mapping.reset_value is not None and mapping.reset_delay_ms > 0:
+            self._schedule_reset(mapping)
+
+    def _schedule_reset(self, mapping: VirtualInputConfig) -> None:
+        # a new press postpones the pending reset instead of adding one
+        current = self._resets.pop(mapping.id, None)
+        if current is not None:
+            current[0].cancel()
+            self._reset_stats["rescheduled"] += 1
+        self._reset_stats["scheduled"] += 1
+        loop = asyncio.get_running_loop()
+        handle = loop.call_later(mapping.reset_delay_ms / 1000.0, self._fire_reset, mapping)
+        self._resets[mapping.id] = (handle, mapping)
+
+    def _fire_reset(self, mapping: VirtualInputConfig) -> None:
+        self._resets.pop(mapping.id, None)
+        self._reset_stats["fired"] += 1
+        task = asyncio.get_running_loop().create_task(
+            self._delivery.submit(mapping.id, lambda: self._send_reset(mapping))
+        )
+        self._spawn(task)
+
+    async def _send_motion(
+        self,
+        mapping: VirtualInputConfig,
+        state: bool,
+        trace: Optional[Dict[str, float]] = None,
+        *,
+        polled: bool = False,
+    ) -> None:
+        value = mapping.active_value if state else mapping.inactive_value
+        label = "active" if state else "inactive"
+        extra = {"motion_state": state}
+        if value is not None:
+            try:
+                await self._forward(mapping, value, label, event_type="motion", extra=extra, trace=trace)
+                return
+            except RuntimeError as exc:
+                if not polled:
+                    raise
+                _log(
+                    "Bewegungsmelder-Weiterleitung "
+                    f"für Bridge '{self.bridge_id}' fehlgeschlagen: {exc}"
+                )
+        self._record_event(mapping, label, value, event_type="motion", delivered=False, extra=extra)
+
+    async def _send_reset(self, mapping: VirtualInputConfig) -> None:
+        try:
+            await self._forward(
+                mapping,
+                mapping.reset_value or "0",
+                "reset",
+                event_type=mapping.resource_type,
+                trigger="reset",
+            )
+        except RuntimeError as exc:
+            _log(f"Reset-Weiterleitung für Bridge '{self.bridge_id}' fehlgeschlagen: {exc}")
+
+
+class AsyncHueEventForwarder:
+    """Runs all bridge workers in one asyncio event loop."""
+
+    def __init__(
+        self,
+        reload_interval: float = 30.0,
+        *,
+        delivery_workers: int = 4,
+        delivery_queue_size: int = 256,
+        backpressure: str = "drop_oldest",
+        loxone_pool_size: Optional[int] = None,
+        state_store: Any = None,
+        outbox: bool = True,
+    ) -> None:
+        self._reload_interval = reload_interval
+        self._sender = AsyncLoxoneSender(
+            pool_maxsize=loxone_pool_size if loxone_pool_size else delivery_workers,
+        )
+        self._workers: Dict[str, AsyncBridgeWorker] = {}
+        self._state_store = state_store if state_store is not None else open_event_store(write_behind=True)
+        self._delivery_workers = delivery_workers
+        self._delivery_queue_size = delivery_queue_size
+        if backpressure not in BACKPRESSURE_POLICIES:
+            _log(f"Unbekannte Backpressure-Strategie '{backpressure}', verwende 'drop_oldest'.")
+            backpressure = "drop_oldest"
+        self._backpressure = backpressure
+        self._reported_drops: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._assignments: BridgeAssignments = {}
+        self._watcher = ConfigWatcher(config_path())
+        self._retry_sender = LoxoneSender(pool_maxsize=1)
+        self._outbox: Optional[DeliveryOutbox] = None
+        if outbox:
+            self._outbox = DeliveryOutbox(outbox_path(), lambda: self._retry_sender, self._state_store.record)
+        self._metrics_server: Any = None
+        REGISTRY.register_collector(self.collect_metrics)
+
+    def delivery_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {bridge_id: worker.delivery_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def payload_stats(self) -> Dict[str, Dict[str, int]]:
+        return {bridge_id: worker.payload_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def stream_health(self) -> Dict[str, Dict[str, Any]]:
+        return {bridge_id: worker.stream_health() for bridge_id, worker in list(self._workers.items())}
+
+    def dedup_stats(self) -> Dict[str, Dict[str, int]]:
+        return {bridge_id: worker.dedup_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def filter_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        return {bridge_id: worker.filter_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def latency_stats(self) -> Dict[str, Dict[str, Dict[str, Dict[str, float]]]]:
+        return {bridge_id: worker.latency_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def event_stats(self) -> Dict[str, Dict[str, int]]:
+        return {bridge_id: worker.event_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def latency_trackers(self) -> Dict[str, LatencyTracker]:
+        return {bridge_id: worker.latency for bridge_id, worker in list(self._workers.items())}
+
+    def collect_metrics(self) -> List[MetricFamily]:
+        return forwarder_metrics(self)
+
+    def event_store_stats(self) -> Dict[str, float]:
+        return self._state_store.flush_stats()
+
+    def timer_stats(self) -> Dict[str, int]:
+        """Reset timer counters summed over all bridges."""
+
+        totals: Dict[str, int] = {"scheduled": 0, "rescheduled": 0, "fired": 0, "pending": 0}
+        for worker in list(self._workers.values()):
+            for key, value in worker.timer_stats().items():
+                totals[key] += value
+        return totals
+
+    def outbox_stats(self) -> Dict[str, int]:
+        return self._outbox.stats() if self._outbox is not None else {}
+
+    def _report_delivery_stats(self) -> None:
+        for bridge_id, stats in self.delivery_stats().items():
+            dropped = int(stats.get("dropped", 0))
+            if dropped > self._reported_drops.get(bridge_id, 0):
+                _log(
+                    f"Bridge '{bridge_id}': {dropped} Weiterleitung(en) verworfen, "
+                    f"Warteschlange {stats['queue_depth']}/{stats['capacity']} "
+                    f"(max. {stats['max_queue_depth']})."
+                )
+            self._reported_drops[bridge_id] = dropped
+
+    def stop(self) -> None:
+        """Ask :meth:`run` to finish; safe to call from any thread."""
+
+        if self._loop is not None and self._stop_event is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        self._watcher.close()
+
+    async def _stop_worker(self, bridge_id: str) -> None:
+        worker = self._workers.pop(bridge_id)
+        await worker.stop()
+
+    async def sync_workers(self, config: PluginConfig) -> None:
+        self._sender.update(config.loxone)
+        self._retry_sender.update(config.loxone)
+
+        assignments = bridge_assignments(config)
+        changes = diff_bridge_assignments(self._assignments, assignments)
+        for bridge_id in changes.removed + changes.reconnect:
+            if bridge_id in self._workers:
+                await self._stop_worker(bridge_id)
+
+        for bridge_id in changes.added + changes.reconnect:
+            bridge, mappings = assignments[bridge_id]
+            worker = AsyncBridgeWorker(
+                bridge,
+                self._sender,
+                self._state_store,
+                AsyncDeliveryLanes(
+                    workers=self._delivery_workers,
+                    max_pending=self._delivery_queue_size,
+                    policy=self._backpressure,
+                    name=f"hue-delivery-{bridge.id}",
+                ),
+                self._outbox,
+            )
+            worker.update_mappings(mappings)
+            worker.start()
+            self._workers[bridge_id] = worker
+
+        for bridge_id in changes.updated:
+            bridge, mappings = assignments[bridge_id]
+            worker = self._workers[bridge_id]
+            worker.update_bridge(bridge)
+            if self._assignments[bridge_id][1] != mappings:
+                worker.update_mappings(mappings)
+        self._assignments = assignments
+
+    async def aclose(self) -> None:
+        REGISTRY.unregister_collector(self.collect_metrics)
+        stop_metrics_server(self._metrics_server)
+        self._metrics_server = None
+        for bridge_id in list(self._workers):
+            await self._stop_worker(bridge_id)
+        if self._outbox is not None:
+            await asyncio.to_thread(self._outbox.close)
+        self._retry_sender.close()
+        await self._sender.close()
+        self._state_store.close()
+
+    async def run(self) -> None:  # pragma: no cover - integration path
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        generation: Optional[int] = None
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    snapshot = load_config_snapshot()
+                except ConfigError as exc:
+                    _log(f"Konfiguration konnte nicht geladen werden: {exc}")
+                else:
+                    if snapshot.generation != generation:
+                        await self.sync_workers(snapshot.config)
+                        if generation is None and self._outbox is not None:
+                            self._outbox.start()
+                        generation = snapshot.generation
+                self._report_delivery_stats()
+                if self._stop_event.is_set() or _yield_to_embedded_forwarder():
+                    break
+                # stop() closes the watcher, which ends the wait right away
+                await asyncio.to_thread(self._watcher.wait, self._reload_interval)
+        finally:
+            await self.aclose()
+
+    def run_forever(self) -> None:  # pragma: no cover - integration path
+        _require_httpx()
+        _log("Starte Hue-Event-Forwarder (asyncio)")
+        self._metrics_server = start_metrics_server()
+        asyncio.run(self.run())
+
+
+__all__ = [
+    "AsyncBridgeWorker",
+    "AsyncDeliveryLanes",
+    "AsyncHueEventForwarder",
+    "AsyncLoxoneSender",
+    "async_available",
+]
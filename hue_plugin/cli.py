@@ -4,32 +4,47 @@ from __future__ import annotations
 import argparse
 import json
 import sys
-from collections import defaultdict
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import date, datetime
+from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import math
-import re
 
+from .color import kelvin_to_mirek, parse_rgb_string, rgb_to_xy
+from .command_scheduler import CommandSchedulerRegistry
 from .config import (
     ConfigError,
     HueBridgeConfig,
     PluginConfig,
-    load_config,
+    command_socket_path,
+    load_config_snapshot,
     runtime_state_path,
 )
 from .event_forwarder import (
-    EventStateStore,
     LoxoneSender,
+    event_store_backend,
     extract_motion_state,
     load_event_state,
+    open_event_store,
 )
-from .hue_client import HueBridgeClient, HueBridgeError, HueResource
+from .hue_client import (
+    HueBridgeClient,
+    HueBridgeError,
+    HueClientPool,
+    HueResource,
+    grouped_light_state_body,
+    light_state_body,
+    scene_recall_body,
+)
+from .resource_mirror import ResourceMirror, ResourceMirrorRegistry
+from .topology import ResourceTopology
 
 
 def _plugin_config(path: str | None) -> PluginConfig:
     try:
-        return load_config(path)
+        return load_config_snapshot(path).config
     except ConfigError as exc:  # pragma: no cover - propagated as exit code
         raise SystemExit(str(exc)) from exc
 
@@ -41,8 +56,41 @@ def _bridge_config(config: PluginConfig, bridge_id: str | None) -> HueBridgeConf
         raise SystemExit(str(exc)) from exc
 
 
+_client_pool: Optional[HueClientPool] = None
+_mirror_registry: Optional[ResourceMirrorRegistry] = None
+_scheduler_registry: Optional[CommandSchedulerRegistry] = None
+_client_pool_lock = threading.Lock()
+
+
+def enable_client_cache() -> None:
+    """Reuse Hue clients (and their sessions) across handler invocations.
+
+    Used by the long-running command daemon so that consecutive commands share
+    the established keep-alive connection to the bridge, resource listings
+    are answered from an in-memory mirror fed by the event stream and light
+    commands pass the rate-aware command scheduler.
+    """
+
+    global _client_pool, _mirror_registry, _scheduler_registry
+    with _client_pool_lock:
+        if _client_pool is None:
+            _client_pool = HueClientPool(factory=lambda bridge: HueBridgeClient(bridge))
+            _mirror_registry = ResourceMirrorRegistry(_client_pool)
+            _scheduler_registry = CommandSchedulerRegistry(_client_pool)
+
+
 def _client(bridge: HueBridgeConfig) -> HueBridgeClient:
-    return HueBridgeClient(bridge)
+    pool = _client_pool
+    if pool is None:
+        return HueBridgeClient(bridge)
+    return pool.get(bridge)
+
+
+def _reader(bridge: HueBridgeConfig) -> HueBridgeClient | ResourceMirror:
+    registry = _mirror_registry
+    if _client_pool is None or registry is None:
+        return _client(bridge)
+    return registry.get(bridge)
 
 
 def _resource_to_dict(resource: HueResource) -> Dict[str, Any]:
@@ -76,59 +124,6 @@ def _event_local_date(timestamp: Optional[datetime]) -> Optional[date]:
     return timestamp.astimezone().date()
 
 
-def _parse_rgb_string(value: str) -> Optional[Tuple[int, int, int]]:
-    cleaned = value.strip()
-    if not cleaned:
-        return None
-    if cleaned.lower().startswith("rgb") and "(" in cleaned and ")" in cleaned:
-        cleaned = cleaned[cleaned.find("(") + 1 : cleaned.rfind(")")]
-    if cleaned.startswith("#"):
-        cleaned = cleaned[1:]
-    cleaned = cleaned.replace(";", ",").replace(":", ",").replace(" ", "")
-    if re.fullmatch(r"[0-9a-fA-F]{6}", cleaned):
-        r = int(cleaned[0:2], 16)
-        g = int(cleaned[2:4], 16)
-        b = int(cleaned[4:6], 16)
-        return (r, g, b)
-    if re.fullmatch(r"\d{1,3}(?:,\d{1,3}){2}", cleaned):
-        parts = [int(part) for part in cleaned.split(",")]
-        if all(0 <= part <= 255 for part in parts):
-            return tuple(parts)  # type: ignore[return-value]
-    return None
-
-
-def _rgb_to_xy(rgb: Tuple[int, int, int]) -> Tuple[float, float]:
-    r, g, b = rgb
-
-    def gamma_correct(component: int) -> float:
-        normalised = component / 255.0
-        if normalised > 0.04045:
-            return ((normalised + 0.055) / 1.055) ** 2.4
-        return normalised / 12.92
-
-    r_corr = gamma_correct(r)
-    g_corr = gamma_correct(g)
-    b_corr = gamma_correct(b)
-
-    X = r_corr * 0.664511 + g_corr * 0.154324 + b_corr * 0.162028
-    Y = r_corr * 0.283881 + g_corr * 0.668433 + b_corr * 0.047685
-    Z = r_corr * 0.000088 + g_corr * 0.07231 + b_corr * 0.986039
-
-    denom = X + Y + Z
-    if denom == 0:
-        return (0.0, 0.0)
-    x = X / denom
-    y = Y / denom
-    return (round(x, 4), round(y, 4))
-
-
-def _kelvin_to_mirek(kelvin: int) -> int:
-    if kelvin <= 0:
-        raise ValueError("Kelvin muss größer als 0 sein")
-    mirek = int(round(1_000_000 / kelvin))
-    return max(153, min(500, mirek))
-
-
 def _resource_name(resource: HueResource) -> str | None:
     name = resource.metadata.get("name")
     return name if isinstance(name, str) else None
@@ -145,103 +140,43 @@ def command_test_connection(args: argparse.Namespace) -> Dict[str, Any]:
     return {"ok": True}
 
 
+_RESOURCE_TYPES = {
+    "lights": "light",
+    "scenes": "scene",
+    "rooms": "room",
+    "buttons": "button",
+    "motions": "motion",
+}
+
+
 def command_list_resources(args: argparse.Namespace) -> Dict[str, Any]:
     config = _plugin_config(args.config)
     bridge = _bridge_config(config, args.bridge_id)
-    client = _client(bridge)
-
-    getter = {
-        "lights": client.get_lights,
-        "scenes": client.get_scenes,
-        "rooms": client.get_rooms,
-        "buttons": client.get_buttons,
-        "motions": client.get_motion_sensors,
-    }[args.type]
+    client = _reader(bridge)
 
     try:
-        resources = list(getter())
+        topology = ResourceTopology(client.get_all_resources())
     except HueBridgeError as exc:
         raise SystemExit(str(exc)) from exc
 
+    resources = topology.resources(_RESOURCE_TYPES[args.type])
     items = [_resource_to_dict(item) for item in resources]
 
     if args.type == "scenes":
-        group_lookup: Dict[str, Dict[str, str | None]] = {}
-        for room in client.get_rooms():
-            group_lookup[room.id] = {"name": _resource_name(room), "type": "room"}
-        for zone in client.get_zones():
-            group_lookup[zone.id] = {"name": _resource_name(zone), "type": "zone"}
-
         for resource, item in zip(resources, items):
-            group = resource.data.get("group")
-            details: Dict[str, Any] | None = None
-            if isinstance(group, dict):
-                rid = group.get("rid")
-                rtype = group.get("rtype")
-                details = {"rid": rid, "rtype": rtype, "name": None}
-                if isinstance(rid, str) and rid in group_lookup:
-                    resolved = group_lookup[rid]
-                    details["name"] = resolved.get("name")
-                    details["rtype"] = resolved.get("type") or rtype
-            item["group"] = details
+            item["group"] = topology.scene_group(resource.id)
 
     if args.type == "lights":
-        room_lookup: Dict[str, List[Dict[str, str | None]]] = defaultdict(list)
-        for room in client.get_rooms():
-            room_name = _resource_name(room)
-            services = room.data.get("services")
-            if not isinstance(services, list):
-                continue
-            for service in services:
-                if not isinstance(service, dict):
-                    continue
-                if service.get("rtype") != "light":
-                    continue
-                rid = service.get("rid")
-                if not isinstance(rid, str):
-                    continue
-                info = {"id": room.id, "name": room_name}
-                if info not in room_lookup[rid]:
-                    room_lookup[rid].append(info)
-
-        scene_lookup: Dict[str, List[Dict[str, str | None]]] = defaultdict(list)
-        for scene in client.get_scenes():
-            scene_name = _resource_name(scene)
-            actions = scene.data.get("actions")
-            if not isinstance(actions, list):
-                continue
-            for action in actions:
-                if not isinstance(action, dict):
-                    continue
-                target = action.get("target")
-                if not isinstance(target, dict):
-                    continue
-                if target.get("rtype") != "light":
-                    continue
-                rid = target.get("rid")
-                if not isinstance(rid, str):
-                    continue
-                info = {"id": scene.id, "name": scene_name}
-                if info not in scene_lookup[rid]:
-                    scene_lookup[rid].append(info)
-
         for resource, item in zip(resources, items):
-            item["rooms"] = room_lookup.get(resource.id, [])
-            item["scenes"] = scene_lookup.get(resource.id, [])
+            item["rooms"] = topology.rooms_for_light(resource.id)
+            item["zones"] = topology.zones_for_light(resource.id)
+            item["scenes"] = topology.scenes_for_light(resource.id)
 
     if args.type == "buttons":
-        device_lookup: Dict[str, Dict[str, Any]] = {}
-        for device in client.get_devices():
-            device_lookup[device.id] = {
-                "name": _resource_name(device),
-                "id": device.id,
-            }
         for resource, item in zip(resources, items):
-            owner = resource.data.get("owner")
-            if isinstance(owner, dict):
-                rid = owner.get("rid")
-                if isinstance(rid, str) and rid in device_lookup:
-                    item["device"] = device_lookup[rid]
+            owner = topology.owner(resource.id)
+            if owner is not None and owner.type == "device":
+                item["device"] = {"name": _resource_name(owner), "id": owner.id}
 
     if args.type == "motions":
         for resource, item in zip(resources, items):
@@ -252,8 +187,14 @@ def command_list_resources(args: argparse.Namespace) -> Dict[str, Any]:
     return {"items": items}
 
 
-def command_virtual_input_events(args: argparse.Namespace) -> Dict[str, Any]:
-    state_path = runtime_state_path(args.config)
+def _events_from_state_file(
+    state_path: Path,
+    *,
+    filter_date: Optional[date],
+    before_id: Optional[int],
+    after_id: Optional[int],
+    limit: Optional[int],
+) -> Dict[str, Any]:
     data = load_event_state(state_path)
     events_raw = data.get("events")
     states = data.get("states")
@@ -271,19 +212,6 @@ def command_virtual_input_events(args: argparse.Namespace) -> Dict[str, Any]:
                 available_dates.add(local_date.isoformat())
             parsed.append((entry, timestamp))
 
-    if not isinstance(states, dict):
-        states = {}
-
-    filter_date: Optional[date] = None
-    if args.date:
-        try:
-            filter_date = datetime.strptime(args.date, "%Y-%m-%d").date()
-        except ValueError as exc:
-            raise SystemExit("Ungültiges Datum. Bitte YYYY-MM-DD verwenden.") from exc
-
-    before_id = getattr(args, "before", None)
-    after_id = getattr(args, "after", None)
-
     filtered: List[Tuple[Dict[str, Any], Optional[datetime]]] = []
     for entry, timestamp in parsed:
         event_id = entry.get("event_id")
@@ -299,32 +227,77 @@ def command_virtual_input_events(args: argparse.Namespace) -> Dict[str, Any]:
 
     filtered.sort(key=lambda pair: pair[0].get("event_id", 0), reverse=True)
 
-    total_filtered = len(filtered)
+    latest_event_id = None
+    if filtered:
+        candidate = filtered[0][0].get("event_id")
+        if isinstance(candidate, int):
+            latest_event_id = candidate
+
+    events = [entry for entry, _ in filtered]
+    return {
+        "events": events[:limit] if limit is not None else events,
+        "states": states if isinstance(states, dict) else {},
+        "available_dates": sorted(available_dates, reverse=True),
+        "total_filtered": len(filtered),
+        "latest_event_id": latest_event_id,
+    }
+
+
+def _events_from_database(
+    state_path: Path,
+    *,
+    filter_date: Optional[date],
+    before_id: Optional[int],
+    after_id: Optional[int],
+    limit: Optional[int],
+) -> Dict[str, Any]:
+    store = open_event_store(state_path, backend="sqlite")
+    try:
+        result = store.query_events(on_date=filter_date, before=before_id, after=after_id, limit=limit)
+        result["states"] = store.states()
+        result["available_dates"] = store.available_dates()
+    finally:
+        store.close()
+    return result
+
+
+def command_virtual_input_events(args: argparse.Namespace) -> Dict[str, Any]:
+    state_path = runtime_state_path(args.config)
+
+    filter_date: Optional[date] = None
+    if args.date:
+        try:
+            filter_date = datetime.strptime(args.date, "%Y-%m-%d").date()
+        except ValueError as exc:
+            raise SystemExit("Ungültiges Datum. Bitte YYYY-MM-DD verwenden.") from exc
+
+    before_id = getattr(args, "before", None)
+    after_id = getattr(args, "after", None)
     limit = getattr(args, "limit", None)
     limit_value = limit if isinstance(limit, int) and limit > 0 else None
-    paginated = filtered
-    has_more = False
-    next_before: Optional[int] = None
 
-    if limit_value is not None and total_filtered > limit_value:
-        paginated = filtered[:limit_value]
-        has_more = True
+    loader = _events_from_database if event_store_backend(state_path) == "sqlite" else _events_from_state_file
+    result = loader(
+        state_path,
+        filter_date=filter_date,
+        before_id=before_id,
+        after_id=after_id,
+        limit=limit_value,
+    )
+
+    payload_events = result["events"]
+    total_filtered = result["total_filtered"]
+    has_more = limit_value is not None and total_filtered > limit_value
+    next_before: Optional[int] = None
+    if has_more:
         event_ids = [
             entry.get("event_id")
-            for entry, _ in paginated
+            for entry in payload_events
             if isinstance(entry.get("event_id"), int)
         ]
         if event_ids:
             next_before = min(event_ids)
 
-    latest_event_id = None
-    if filtered:
-        candidate = filtered[0][0].get("event_id")
-        if isinstance(candidate, int):
-            latest_event_id = candidate
-
-    payload_events = [entry for entry, _ in paginated]
-
     metadata = {
         "has_more": has_more,
         "next_before": next_before,
@@ -332,12 +305,12 @@ def command_virtual_input_events(args: argparse.Namespace) -> Dict[str, Any]:
         "after": after_id,
         "limit": limit_value,
         "date": filter_date.isoformat() if filter_date else None,
-        "available_dates": sorted(available_dates, reverse=True),
+        "available_dates": result["available_dates"],
         "total_filtered": total_filtered,
-        "latest_event_id": latest_event_id,
+        "latest_event_id": result["latest_event_id"],
     }
 
-    return {"events": payload_events, "states": states, "metadata": metadata}
+    return {"events": payload_events, "states": result["states"], "metadata": metadata}
 
 
 def command_light_command(args: argparse.Namespace) -> Dict[str, Any]:
@@ -351,19 +324,19 @@ def command_light_command(args: argparse.Namespace) -> Dict[str, Any]:
         if isinstance(xy_values, (list, tuple)) and len(xy_values) == 2:
             color_xy = (float(xy_values[0]), float(xy_values[1]))
     if getattr(args, "rgb", None):
-        parsed = _parse_rgb_string(args.rgb)
+        parsed = parse_rgb_string(args.rgb)
         if parsed is None:
             raise SystemExit(
                 "Ungültiger RGB-Wert. Verwende #RRGGBB oder R,G,B mit 0-255."
             )
-        color_xy = _rgb_to_xy(parsed)
+        color_xy = rgb_to_xy(parsed)
 
     temperature_mirek: Optional[int] = None
     if getattr(args, "mirek", None) is not None:
         temperature_mirek = int(args.mirek)
     elif getattr(args, "temperature", None) is not None:
         try:
-            temperature_mirek = _kelvin_to_mirek(int(args.temperature))
+            temperature_mirek = kelvin_to_mirek(int(args.temperature))
         except ValueError as exc:
             raise SystemExit(str(exc)) from exc
 
@@ -372,14 +345,27 @@ def command_light_command(args: argparse.Namespace) -> Dict[str, Any]:
         transition_ms = max(0, int(args.transition))
 
     try:
-        client.set_light_state(
-            args.light_id,
-            on=args.state,
-            brightness=args.brightness,
-            color_xy=color_xy,
-            temperature_mirek=temperature_mirek,
-            transition_ms=transition_ms,
-        )
+        scheduler = _scheduler_registry.get(bridge) if _scheduler_registry is not None else None
+        if scheduler is not None:
+            body = light_state_body(
+                on=args.state,
+                brightness=args.brightness,
+                color_xy=color_xy,
+                temperature_mirek=temperature_mirek,
+                transition_ms=transition_ms,
+            )
+            scheduler.submit("light", args.light_id, body).result(timeout=15.0)
+        else:
+            client.set_light_state(
+                args.light_id,
+                on=args.state,
+                brightness=args.brightness,
+                color_xy=color_xy,
+                temperature_mirek=temperature_mirek,
+                transition_ms=transition_ms,
+            )
+    except FutureTimeoutError as exc:
+        raise SystemExit("Der Befehl wurde nicht rechtzeitig an die Bridge übertragen.") from exc
     except (ValueError, HueBridgeError) as exc:
         raise SystemExit(str(exc)) from exc
 
@@ -397,20 +383,45 @@ def command_scene_command(args: argparse.Namespace) -> Dict[str, Any]:
         transition_ms = candidate if candidate > 0 else None
 
     try:
+        scheduler = _scheduler_registry.get(bridge) if _scheduler_registry is not None else None
         state = True if args.state is None else args.state
-        if state:
-            client.activate_scene(
-                args.scene_id,
+        if state and scheduler is not None:
+            body = scene_recall_body(
                 target_rid=args.target_rid,
                 target_rtype=args.target_rtype,
                 dynamics_duration=transition_ms,
             )
-        else:
-            client.deactivate_scene(
+            scheduler.submit("scene", args.scene_id, body).result(timeout=15.0)
+        elif state:
+            client.activate_scene(
                 args.scene_id,
                 target_rid=args.target_rid,
                 target_rtype=args.target_rtype,
+                dynamics_duration=transition_ms,
             )
+        else:
+            options: Dict[str, Any] = {}
+            reader = _reader(bridge)
+            if isinstance(reader, ResourceMirror) and not args.target_rid:
+                options["topology"] = ResourceTopology(reader.get_all_resources())
+            if scheduler is not None:
+                grouped_light_id = client.scene_grouped_light_id(
+                    args.scene_id,
+                    target_rid=args.target_rid,
+                    target_rtype=args.target_rtype,
+                    **options,
+                )
+                body = grouped_light_state_body(on=False)
+                scheduler.submit("grouped_light", grouped_light_id, body).result(timeout=15.0)
+            else:
+                client.deactivate_scene(
+                    args.scene_id,
+                    target_rid=args.target_rid,
+                    target_rtype=args.target_rtype,
+                    **options,
+                )
+    except FutureTimeoutError as exc:
+        raise SystemExit("Der Befehl wurde nicht rechtzeitig an die Bridge übertragen.") from exc
     except HueBridgeError as exc:
         raise SystemExit(str(exc)) from exc
 
@@ -419,8 +430,11 @@ def command_scene_command(args: argparse.Namespace) -> Dict[str, Any]:
 
 def command_clear_virtual_events(args: argparse.Namespace) -> Dict[str, Any]:
     state_path = runtime_state_path(args.config)
-    store = EventStateStore(state_path)
-    store.clear()
+    store = open_event_store(state_path)
+    try:
+        store.clear()
+    finally:
+        store.close()
     return {"ok": True}
 
 
@@ -478,6 +492,12 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Pfad zur Konfigurationsdatei (optional)",
     )
+    parser.add_argument(
+        "--via-daemon",
+        dest="via_daemon",
+        action="store_true",
+        help="Befehl an den laufenden Befehlsdienst übergeben (Fallback: lokal ausführen)",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     parser_test = subparsers.add_parser("test-connection", help="Bridge-Verbindung testen")
@@ -607,9 +627,19 @@ def build_parser() -> argparse.ArgumentParser:
 
 def main(argv: Iterable[str] | None = None) -> int:
     parser = build_parser()
-    args = parser.parse_args(argv)
-    handler = _COMMANDS[args.command]
-    payload = handler(args)
+    argv_list = list(sys.argv[1:] if argv is None else argv)
+    args = parser.parse_args(argv_list)
+    payload: Any = None
+    if args.via_daemon:
+        from .command_daemon import CommandDaemonUnavailable, send_command
+
+        try:
+            payload = send_command(argv_list, command_socket_path(args.config))
+        except CommandDaemonUnavailable:
+            payload = None
+    if payload is None:
+        handler = _COMMANDS[args.command]
+        payload = handler(args)
     json.dump(payload, sys.stdout, ensure_ascii=False)
     return 0
 
@@ -0,0 +1,67 @@
+"""Colour conversion helpers shared by the CLI and the REST server."""
+from __future__ import annotations
+
+import re
+from typing import Optional, Tuple
+
+
+def parse_rgb_string(value: str) -> Optional[Tuple[int, int, int]]:
+    """Parse ``#RRGGBB``, ``R,G,B`` or ``rgb(R,G,B)`` notations."""
+
+    cleaned = value.strip()
+    if not cleaned:
+        return None
+    if cleaned.lower().startswith("rgb") and "(" in cleaned and ")" in cleaned:
+        cleaned = cleaned[cleaned.find("(") + 1 : cleaned.rfind(")")]
+    if cleaned.startswith("#"):
+        cleaned = cleaned[1:]
+    cleaned = cleaned.replace(";", ",").replace(":", ",").replace(" ", "")
+    if re.fullmatch(r"[0-9a-fA-F]{6}", cleaned):
+        r = int(cleaned[0:2], 16)
+        g = int(cleaned[2:4], 16)
+        b = int(cleaned[4:6], 16)
+        return (r, g, b)
+    if re.fullmatch(r"\d{1,3}(?:,\d{1,3}){2}", cleaned):
+        parts = [int(part) for part in cleaned.split(",")]
+        if all(0 <= part <= 255 for part in parts):
+            return tuple(parts)  # type: ignore[return-value]
+    return None
+
+
+def rgb_to_xy(rgb: Tuple[int, int, int]) -> Tuple[float, float]:
+    """Convert sRGB components to CIE xy coordinates used by Hue."""
+
+    r, g, b = rgb
+
+    def gamma_correct(component: int) -> float:
+        normalised = component / 255.0
+        if normalised > 0.04045:
+            return ((normalised + 0.055) / 1.055) ** 2.4
+        return normalised / 12.92
+
+    r_corr = gamma_correct(r)
+    g_corr = gamma_correct(g)
+    b_corr = gamma_correct(b)
+
+    X = r_corr * 0.664511 + g_corr * 0.154324 + b_corr * 0.162028
+    Y = r_corr * 0.283881 + g_corr * 0.668433 + b_corr * 0.047685
+    Z = r_corr * 0.000088 + g_corr * 0.07231 + b_corr * 0.986039
+
+    denom = X + Y + Z
+    if denom == 0:
+        return (0.0, 0.0)
+    x = X / denom
+    y = Y / denom
+    return (round(x, 4), round(y, 4))
+
+
+def kelvin_to_mirek(kelvin: int) -> int:
+    """Convert a colour temperature in Kelvin to the supported mirek range."""
+
+    if kelvin <= 0:
+        raise ValueError("Kelvin muss größer als 0 sein")
+    mirek = int(round(1_000_000 / kelvin))
+    return max(153, min(500, mirek))
+
+
+__all__ = ["kelvin_to_mirek", "parse_rgb_string", "rgb_to_xy"]
@@ -0,0 +1,189 @@
+"""Long-running command daemon for light/scene commands.
+
+The LoxBerry frontend used to spawn ``python -m hue_plugin.cli`` for every
+command. The daemon keeps the interpreter, the parsed modules and the Hue
+client sessions warm and executes the very same CLI handlers on request.
+
+Protocol: one JSON document per line. A request looks like
+``{"argv": ["light-command", "--light-id", "..."]}`` and is answered with
+``{"ok": true, "result": {...}}`` or ``{"ok": false, "error": "..."}``.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import cli
+from .config import command_socket_path
+
+_MAX_REQUEST_BYTES = 64 * 1024
+
+
+def _log(message: str) -> None:
+    print(f"[hue-command-daemon] {message}", flush=True)
+
+
+class CommandDaemonUnavailable(RuntimeError):
+    """Raised when the command daemon cannot be reached."""
+
+
+def execute_command(argv: Iterable[str], *, config: str | Path | None = None) -> Dict[str, Any]:
+    """Run a CLI command in-process and return the protocol response.
+
+    ``config`` is used for commands whose argv does not name a configuration.
+    """
+
+    parser = cli.build_parser()
+    stderr = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(stderr):
+            args = parser.parse_args([str(item) for item in argv])
+    except SystemExit:
+        message = stderr.getvalue().strip().splitlines()
+        return {"ok": False, "error": message[-1] if message else "Ungültiger Aufruf."}
+    if args.config is None and config is not None:
+        args.config = str(config)
+
+    handler = cli._COMMANDS[args.command]
+    try:
+        result = handler(args)
+    except SystemExit as exc:
+        code = exc.code
+        if isinstance(code, str):
+            return {"ok": False, "error": code}
+        if code in (None, 0):
+            return {"ok": True, "result": {"ok": True}}
+        return {"ok": False, "error": f"Befehl endete mit Status {code}."}
+    except Exception as exc:  # pragma: no cover - defensive, keeps daemon alive
+        _log(f"Befehl '{args.command}' fehlgeschlagen: {exc}")
+        return {"ok": False, "error": f"Unerwarteter Fehler: {exc}"}
+    return {"ok": True, "result": result}
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        while True:
+            line = self.rfile.readline(_MAX_REQUEST_BYTES)
+            if not line:
+                return
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line.decode("utf-8"))
+            except ValueError:
+                response: Dict[str, Any] = {"ok": False, "error": "Ungültige Anfrage."}
+            else:
+                argv = request.get("argv") if isinstance(request, dict) else None
+                if not isinstance(argv, list) or not argv:
+                    response = {"ok": False, "error": "Ungültige Anfrage."}
+                else:
+                    config = getattr(self.server, "config_path", None)
+                    response = execute_command(argv, config=config)
+            payload = json.dumps(response, ensure_ascii=False) + "\n"
+            self.wfile.write(payload.encode("utf-8"))
+            self.wfile.flush()
+
+
+class CommandDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server dispatching to the CLI command handlers."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str | Path, *, config: str | Path | None = None) -> None:
+        self.socket_path = Path(path)
+        self.config_path = config
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self.socket_path.unlink()
+        cli.enable_client_cache()
+        super().__init__(str(self.socket_path), _CommandHandler)
+        with contextlib.suppress(OSError):
+            os.chmod(self.socket_path, 0o660)
+
+    def server_close(self) -> None:
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            self.socket_path.unlink()
+
+
+def send_command(
+    argv: Iterable[str],
+    path: str | Path | None = None,
+    *,
+    timeout: float = 15.0,
+) -> Dict[str, Any]:
+    """Execute a command through the daemon and return its JSON result.
+
+    Raises :class:`CommandDaemonUnavailable` if no daemon listens on the
+    socket and :class:`SystemExit` with the error message if the command
+    itself failed, mirroring the behaviour of the local CLI.
+    """
+
+    resolved = Path(path) if path is not None else command_socket_path()
+    request = json.dumps({"argv": [str(item) for item in argv]}) + "\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(str(resolved))
+            conn.sendall(request.encode("utf-8"))
+            with conn.makefile("rb") as handle:
+                line = handle.readline()
+    except OSError as exc:
+        raise CommandDaemonUnavailable(str(exc)) from exc
+
+    try:
+        response = json.loads(line.decode("utf-8"))
+    except ValueError as exc:
+        raise CommandDaemonUnavailable("Ungültige Antwort des Befehlsdienstes.") from exc
+
+    if not isinstance(response, dict):
+        raise CommandDaemonUnavailable("Ungültige Antwort des Befehlsdienstes.")
+    if not response.get("ok"):
+        raise SystemExit(str(response.get("error") or "Unbekannter Fehler."))
+    result = response.get("result")
+    return result if isinstance(result, dict) else {"ok": True}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Hue command daemon")
+    parser.add_argument(
+        "--config",
+        dest="config",
+        default=None,
+        help="Pfad zur Konfigurationsdatei (optional, wie bei der CLI)",
+    )
+    parser.add_argument(
+        "--socket",
+        dest="socket",
+        default=None,
+        help="Pfad des Unix-Sockets (Standard: neben der Konfigurationsdatei)",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:  # pragma: no cover - CLI wrapper
+    args = build_parser().parse_args(argv)
+    # same resolution as ``cli --config ... --via-daemon``
+    path = Path(args.socket) if args.socket else command_socket_path(args.config)
+    server = CommandDaemon(path, config=args.config)
+    _log(f"Lausche auf {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,271 @@
+"""Rate-aware command scheduling towards a Hue bridge.
+
+Hue bridges process roughly ten light commands and one group command per
+second. The scheduler queues state updates per bridge, merges updates for
+the same target that are still waiting (last write wins per field) and
+releases them in submission order according to token buckets for light and
+group targets: a scene recall waiting for the group bucket holds back the
+light commands queued after it, which would otherwise be overwritten.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import HueBridgeConfig
+from .hue_client import HueBridgeClient, HueClientPool, bridge_fingerprint, merge_resource_data
+
+_JSON = Dict[str, Any]
+_LIGHT_TARGETS = {"light"}
+# mutually exclusive light modes: a newer one replaces the others when merging
+_EXCLUSIVE_MODES = ("color", "color_temperature", "gradient", "effects")
+
+
+def merge_state_body(base: _JSON, update: _JSON) -> _JSON:
+    """Merge a queued state body with a newer one for the same target.
+
+    Like :func:`merge_resource_data`, but a colour mode in ``update`` drops
+    the other modes from ``base``, so the bridge applies the newest one.
+    """
+
+    if any(mode in update for mode in _EXCLUSIVE_MODES):
+        base = {key: value for key, value in base.items() if key not in _EXCLUSIVE_MODES or key in update}
+    return merge_resource_data(base, update)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens/s."""
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate = max(float(rate), 0.001)
+        self._capacity = max(float(burst if burst is not None else rate), 1.0)
+        self._tokens = self._capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+
+        self._refill()
+        if self._tokens >= 1.0:
+            return 0.0
+        return (1.0 - self._tokens) / self._rate
+
+    def take(self) -> None:
+        self._refill()
+        self._tokens -= 1.0
+
+
+@dataclass
+class _PendingCommand:
+    key: Tuple[str, str]
+    body: _JSON
+    future: Future
+    merged: int = 0
+
+
+class CommandScheduler:
+    """Per-bridge queue that coalesces and rate-limits state updates."""
+
+    def __init__(
+        self,
+        client: HueBridgeClient,
+        *,
+        light_rate: float = 10.0,
+        group_rate: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._client = client
+        self._buckets = {
+            "light": TokenBucket(light_rate, clock=clock),
+            "group": TokenBucket(group_rate, clock=clock),
+        }
+        self._condition = threading.Condition()
+        # queued commands in submission order and, per target, the one later
+        # updates may still be merged into
+        self._pending: "OrderedDict[int, _PendingCommand]" = OrderedDict()
+        self._open: Dict[Tuple[str, str], int] = {}
+        self._sequence = itertools.count()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, int] = {
+            "submitted": 0,
+            "coalesced": 0,
+            "sent": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+        }
+
+    def submit(self, rtype: str, rid: str, body: _JSON) -> Future:
+        """Queue a state update; returns a future resolved once it was sent.
+
+        Updates for a target that is still queued are merged into the queued
+        command and share its future, unless a group command (scene recall,
+        grouped_light) was queued in between: it may affect the same light,
+        so the newer update is queued behind it instead.
+        """
+
+        key = (rtype, rid)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Befehlsplaner wurde bereits beendet.")
+            self._stats["submitted"] += 1
+            sequence = self._open.get(key)
+            if sequence is not None:
+                pending = self._pending[sequence]
+                pending.body = merge_state_body(pending.body, body)
+                pending.merged += 1
+                self._stats["coalesced"] += 1
+                return pending.future
+            if self._bucket_name(rtype) == "group":
+                self._open.clear()
+            pending = _PendingCommand(key=key, body=dict(body), future=Future())
+            sequence = next(self._sequence)
+            self._pending[sequence] = pending
+            self._open[key] = sequence
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._pending))
+            self._ensure_thread_locked()
+            self._condition.notify()
+            return pending.future
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            payload = dict(self._stats)
+            payload["queue_depth"] = len(self._pending)
+        return payload
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._open.clear()
+            self._condition.notify_all()
+        for command in pending:
+            command.future.set_exception(RuntimeError("Befehlsplaner wurde beendet."))
+
+    def _ensure_thread_locked(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="hue-command-scheduler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    @staticmethod
+    def _bucket_name(rtype: str) -> str:
+        return "light" if rtype in _LIGHT_TARGETS else "group"
+
+    def _next_ready_locked(self) -> Tuple[Optional[_PendingCommand], Optional[float]]:
+        """Dequeue the oldest command if its bucket has a token, else return the wait time."""
+
+        if not self._pending:
+            return None, None
+        sequence, command = next(iter(self._pending.items()))
+        bucket = self._buckets[self._bucket_name(command.key[0])]
+        delay = bucket.delay()
+        if delay > 0:
+            return None, delay
+        bucket.take()
+        del self._pending[sequence]
+        if self._open.get(command.key) == sequence:
+            del self._open[command.key]
+        return command, None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    command, wait = self._next_ready_locked()
+                    if command is not None:
+                        break
+                    self._condition.wait(timeout=wait)
+            self._send(command)
+
+    def _send(self, command: _PendingCommand) -> None:
+        rtype, rid = command.key
+        try:
+            self._client.update_resource(rtype, rid, command.body)
+        except Exception as exc:
+            with self._condition:
+                self._stats["failed"] += 1
+            command.future.set_exception(exc)
+        else:
+            with self._condition:
+                self._stats["sent"] += 1
+            command.future.set_result(None)
+
+
+class CommandSchedulerRegistry:
+    """One :class:`CommandScheduler` per bridge, backed by a client pool."""
+
+    def __init__(
+        self,
+        pool: HueClientPool,
+        *,
+        light_rate: float = 10.0,
+        group_rate: float = 1.0,
+    ) -> None:
+        self._pool = pool
+        self._light_rate = light_rate
+        self._group_rate = group_rate
+        self._lock = threading.Lock()
+        self._schedulers: Dict[str, Tuple[Tuple[Any, ...], CommandScheduler]] = {}
+
+    def get(self, config: HueBridgeConfig) -> CommandScheduler:
+        fingerprint = bridge_fingerprint(config)
+        with self._lock:
+            entry = self._schedulers.get(config.id)
+            if entry is not None and entry[0] == fingerprint:
+                return entry[1]
+            if entry is not None:
+                entry[1].stop()
+            scheduler = CommandScheduler(
+                self._pool.get(config),
+                light_rate=self._light_rate,
+                group_rate=self._group_rate,
+            )
+            self._schedulers[config.id] = (fingerprint, scheduler)
+            return scheduler
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            entries = {bridge_id: entry[1] for bridge_id, entry in self._schedulers.items()}
+        return {bridge_id: scheduler.stats() for bridge_id, scheduler in entries.items()}
+
+    def discard(self, bridge_id: str) -> None:
+        with self._lock:
+            entry = self._schedulers.pop(bridge_id, None)
+        if entry is not None:
+            entry[1].stop()
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._schedulers.values())
+            self._schedulers.clear()
+        for _, scheduler in entries:
+            scheduler.stop()
+
+
+__all__ = ["CommandScheduler", "CommandSchedulerRegistry", "TokenBucket", "merge_state_body"]
@@ -1,16 +1,24 @@
 """Configuration handling for the LoxBerry Hue API v2 plugin."""
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import copy
+from dataclasses import FrozenInstanceError, dataclass, field, fields, is_dataclass
+import itertools
 import json
 import os
 from pathlib import Path
 import re
-from typing import Any, Dict, Iterable, List, Optional
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 _DEFAULT_CONFIG_PATH = Path("config/config.json")
 ENV_CONFIG_PATH = "HUE_PLUGIN_CONFIG"
+ENV_COMMAND_SOCKET = "HUE_PLUGIN_COMMAND_SOCKET"
 _DEFAULT_BRIDGE_ID = "default"
+# Files modified within this window may share their mtime with a later write
+# (coarse file system timestamps), so their content is compared as well.
+_RACY_WINDOW_SECONDS = 2.0
 
 
 class ConfigError(RuntimeError):
@@ -87,6 +95,9 @@ class VirtualInputConfig:
     inactive_value: Optional[str] = None
     reset_value: Optional[str] = None
     reset_delay_ms: int = 250
+    max_age_ms: Optional[int] = None
+    dedup_window_ms: int = 0
+    min_interval_ms: int = 0
 
     def to_dict(self) -> Dict[str, Any]:
         payload: Dict[str, Any] = {
@@ -106,6 +117,12 @@ class VirtualInputConfig:
             payload["inactive_value"] = self.inactive_value
         if self.reset_value is not None:
             payload["reset_value"] = self.reset_value
+        if self.max_age_ms is not None:
+            payload["max_age_ms"] = self.max_age_ms
+        if self.dedup_window_ms:
+            payload["dedup_window_ms"] = self.dedup_window_ms
+        if self.min_interval_ms:
+            payload["min_interval_ms"] = self.min_interval_ms
         return payload
 
 
@@ -140,16 +157,149 @@ class PluginConfig:
         }
 
 
+class _ReadOnly:
+    """Mixin for the frozen configuration objects handed out by snapshots."""
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field '{name}' of a configuration snapshot")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field '{name}' of a configuration snapshot")
+
+    def __eq__(self, other: object) -> bool:
+        # frozen and mutable copies of the same configuration compare equal
+        if not isinstance(other, _MUTABLE_TYPES[type(self)]):
+            return NotImplemented
+        return _thaw(self) == _thaw(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class _FrozenHueBridgeConfig(_ReadOnly, HueBridgeConfig):
+    pass
+
+
+class _FrozenLoxoneSettings(_ReadOnly, LoxoneSettings):
+    pass
+
+
+class _FrozenVirtualInputConfig(_ReadOnly, VirtualInputConfig):
+    pass
+
+
+class _FrozenPluginConfig(_ReadOnly, PluginConfig):
+    pass
+
+
+_FROZEN_TYPES: Dict[type, type] = {
+    HueBridgeConfig: _FrozenHueBridgeConfig,
+    LoxoneSettings: _FrozenLoxoneSettings,
+    VirtualInputConfig: _FrozenVirtualInputConfig,
+    PluginConfig: _FrozenPluginConfig,
+}
+_MUTABLE_TYPES: Dict[type, type] = {frozen: mutable for mutable, frozen in _FROZEN_TYPES.items()}
+
+
+def _convert(value: Any, types: Dict[type, type], sequence: type) -> Any:
+    if is_dataclass(value) and type(value) in types:
+        result = object.__new__(types[type(value)])
+        for item in fields(value):
+            object.__setattr__(result, item.name, _convert(getattr(value, item.name), types, sequence))
+        return result
+    if isinstance(value, (list, tuple)):
+        return sequence(_convert(item, types, sequence) for item in value)
+    return value
+
+
+def _freeze(config: PluginConfig) -> PluginConfig:
+    """Read-only deep copy: assignments raise, lists become tuples."""
+
+    return _convert(config, _FROZEN_TYPES, tuple)
+
+
+def _thaw(config: Any) -> Any:
+    """Mutable deep copy of a configuration object, frozen or not."""
+
+    if type(config) in _MUTABLE_TYPES:
+        return _convert(config, _MUTABLE_TYPES, list)
+    return copy.deepcopy(config)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Cached, parsed state of a configuration file.
+
+    The contained :class:`PluginConfig` is shared between all callers and is
+    frozen: assigning to its fields raises :class:`FrozenInstanceError` and
+    its lists are tuples. Use :func:`load_config` for a private, mutable copy
+    that may be modified and saved. ``generation`` changes whenever the file
+    was re-parsed or written through :func:`save_config`.
+    """
+
+    path: Path
+    config: PluginConfig
+    generation: int
+    signature: Tuple[int, int, int]
+    raw: bytes = field(repr=False, compare=False)
+
+
+_snapshot_lock = threading.Lock()
+_snapshots: Dict[Path, ConfigSnapshot] = {}
+_generations = itertools.count(1)
+
+
+def load_config_snapshot(path: str | Path | None = None) -> ConfigSnapshot:
+    """Return the cached configuration, re-parsing it only if the file changed.
+
+    The file is validated via its mtime, size and inode; a JSON parse only
+    happens when one of them differs from the cached snapshot.
+    """
+
+    resolved_path = _resolve_config_path(path)
+    cache_key = _cache_key(resolved_path)
+    try:
+        stat_result = resolved_path.stat()
+    except FileNotFoundError:
+        with _snapshot_lock:
+            _snapshots.pop(cache_key, None)
+        raise ConfigError(f"Configuration file '{resolved_path}' does not exist.") from None
+    except OSError as exc:
+        raise ConfigError(f"Configuration file '{resolved_path}' is not readable: {exc}") from exc
+
+    signature = _stat_signature(stat_result)
+    with _snapshot_lock:
+        cached = _snapshots.get(cache_key)
+    if cached is not None and cached.signature == signature:
+        if time.time() - stat_result.st_mtime >= _RACY_WINDOW_SECONDS:
+            return cached
+        raw = _read_bytes(resolved_path)
+        if raw == cached.raw:
+            return cached
+    else:
+        raw = _read_bytes(resolved_path)
+
+    config = _parse_plugin_config(_decode_json(raw, resolved_path))
+    snapshot = ConfigSnapshot(
+        path=resolved_path,
+        config=_freeze(config),
+        generation=next(_generations),
+        signature=signature,
+        raw=raw,
+    )
+    with _snapshot_lock:
+        _snapshots[cache_key] = snapshot
+    return snapshot
+
+
 def load_config(path: str | Path | None = None) -> PluginConfig:
     """Load the configuration from disk.
 
     Supports both the current multi-bridge structure as well as the legacy
-    single-bridge JSON layout.
+    single-bridge JSON layout. The result is a private copy of the cached
+    snapshot and may be modified freely.
     """
 
-    resolved_path = _resolve_config_path(path)
-    data = _load_json(resolved_path)
-    return _parse_plugin_config(data)
+    return _thaw(load_config_snapshot(path).config)
 
 
 def save_config(config: PluginConfig, path: str | Path | None = None) -> None:
@@ -158,13 +308,28 @@ def save_config(config: PluginConfig, path: str | Path | None = None) -> None:
     resolved_path = _resolve_config_path(path)
     resolved_path.parent.mkdir(parents=True, exist_ok=True)
 
+    raw = (json.dumps(config.to_dict(), indent=2, ensure_ascii=False) + "\n").encode("utf-8")
     tmp_path = resolved_path.with_suffix(resolved_path.suffix + ".tmp")
-    tmp_path.write_text(
-        json.dumps(config.to_dict(), indent=2, ensure_ascii=False) + "\n",
-        encoding="utf-8",
-    )
+    tmp_path.write_bytes(raw)
     tmp_path.replace(resolved_path)
 
+    cache_key = _cache_key(resolved_path)
+    try:
+        signature = _stat_signature(resolved_path.stat())
+    except OSError:  # pragma: no cover - file vanished right after writing
+        with _snapshot_lock:
+            _snapshots.pop(cache_key, None)
+        return
+    snapshot = ConfigSnapshot(
+        path=resolved_path,
+        config=_freeze(config),
+        generation=next(_generations),
+        signature=signature,
+        raw=raw,
+    )
+    with _snapshot_lock:
+        _snapshots[cache_key] = snapshot
+
 
 def ensure_bridge_id(name: Optional[str], *, existing_ids: Iterable[str]) -> str:
     """Generate a stable identifier for a bridge based on its name/IP."""
@@ -373,6 +538,13 @@ def _parse_virtual_inputs(
                 else None
             ),
             reset_delay_ms=int(item.get("reset_delay_ms", 250) or 0),
+            max_age_ms=(
+                max(0, int(item["max_age_ms"]))
+                if item.get("max_age_ms") is not None
+                else None
+            ),
+            dedup_window_ms=max(0, int(item.get("dedup_window_ms") or 0)),
+            min_interval_ms=max(0, int(item.get("min_interval_ms") or 0)),
         )
 
         existing_ids.add(mapping.id)
@@ -381,16 +553,33 @@ def _parse_virtual_inputs(
     return entries
 
 
-def _load_json(path: Path) -> Dict[str, Any]:
-    if not path.exists():
-        raise ConfigError(f"Configuration file '{path}' does not exist.")
+def _read_bytes(path: Path) -> bytes:
+    try:
+        return path.read_bytes()
+    except FileNotFoundError as exc:
+        raise ConfigError(f"Configuration file '{path}' does not exist.") from exc
+    except OSError as exc:
+        raise ConfigError(f"Configuration file '{path}' is not readable: {exc}") from exc
 
+
+def _decode_json(raw: bytes, path: Path) -> Dict[str, Any]:
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError as exc:
+        return json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
         raise ConfigError(f"Invalid JSON in configuration file '{path}': {exc}") from exc
 
 
+def _stat_signature(stat_result: os.stat_result) -> Tuple[int, int, int]:
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+def _cache_key(path: Path) -> Path:
+    try:
+        return path.resolve()
+    except OSError:  # pragma: no cover - unusual file systems
+        return path.absolute()
+
+
 def _resolve_config_path(path: str | Path | None) -> Path:
     if path is not None:
         return Path(path)
@@ -402,6 +591,12 @@ def _resolve_config_path(path: str | Path | None) -> Path:
     return _DEFAULT_CONFIG_PATH
 
 
+def config_path(path: str | Path | None = None) -> Path:
+    """Return the configuration file in use (``HUE_PLUGIN_CONFIG`` or the default)."""
+
+    return _resolve_config_path(path)
+
+
 def runtime_state_path(path: str | Path | None = None) -> Path:
     """Return the path used to persist transient runtime state."""
 
@@ -410,6 +605,35 @@ def runtime_state_path(path: str | Path | None = None) -> Path:
     return parent / "runtime_state.json"
 
 
+def command_socket_path(path: str | Path | None = None) -> Path:
+    """Return the Unix socket used by the command daemon."""
+
+    env_path = os.environ.get(ENV_COMMAND_SOCKET)
+    if env_path:
+        return Path(env_path)
+    resolved = _resolve_config_path(path)
+    return resolved.parent / "hue_commands.sock"
+
+
+def embedded_forwarder_marker_path(path: str | Path | None = None) -> Path:
+    """Return the file holding the pid of an API server that runs the event forwarder."""
+
+    resolved = _resolve_config_path(path)
+    return resolved.parent / "embedded_forwarder.pid"
+
+
+def env_number(name: str, default: float) -> float:
+    """Read a numeric tuning knob from the environment."""
+
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
 def _slugify(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
@@ -423,9 +647,15 @@ __all__ = [
     "VirtualInputConfig",
     "PluginConfig",
     "ConfigError",
+    "ConfigSnapshot",
     "load_config",
+    "load_config_snapshot",
     "save_config",
     "ensure_bridge_id",
     "ensure_virtual_input_id",
+    "config_path",
     "runtime_state_path",
+    "command_socket_path",
+    "embedded_forwarder_marker_path",
+    "env_number",
 ]
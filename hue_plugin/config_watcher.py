@@ -0,0 +1,216 @@
+"""Change notification for ``config.json`` and diffing of bridge assignments.
+
+:class:`ConfigWatcher` wakes the forwarder as soon as the configuration
+file is replaced or rewritten - by the web UI, :func:`save_config` or an
+editor. It uses Linux inotify on the directory of the file (the file itself
+is replaced atomically, so its inode changes on every save) and falls back
+to comparing ``stat`` signatures at a short interval where inotify is not
+available.
+
+:func:`diff_bridge_assignments` compares the mapped bridges of two
+configurations so that only workers whose mappings or connection settings
+changed have to be touched.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import HueBridgeConfig, PluginConfig, VirtualInputConfig
+from .hue_client import bridge_fingerprint
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_EVENT_HEADER = struct.Struct("iIII")
+
+BridgeAssignments = Dict[str, Tuple[HueBridgeConfig, Tuple[VirtualInputConfig, ...]]]
+
+
+def _log(message: str) -> None:
+    print(f"[hue-config-watcher] {message}", flush=True)
+
+
+def _inotify_init(directory: Path) -> Optional[int]:
+    """Return an inotify descriptor watching ``directory`` or ``None``."""
+
+    if not hasattr(os, "O_NONBLOCK") or os.uname().sysname != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(str(directory)), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class ConfigWatcher:
+    """Blocks until the configuration file changed, a timeout or :meth:`close`."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self._path = Path(path)
+        self._poll_interval = max(0.01, poll_interval)
+        self._closed = threading.Event()
+        self._fd = _inotify_init(self._path.parent) if use_inotify else None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        if self._fd is not None:
+            self._wake_r, self._wake_w = os.pipe()
+        elif use_inotify:
+            _log(f"inotify nicht verfügbar, prüfe '{self._path}' alle {self._poll_interval:g} s.")
+        self._signature = self._stat()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._fd is not None else "poll"
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat_result = self._path.stat()
+        except OSError:
+            return None
+        return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+    def _read_events(self) -> bool:
+        assert self._fd is not None
+        changed = False
+        name = os.fsencode(self._path.name)
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except OSError:  # drained (EAGAIN) or closed concurrently
+                return changed
+            if not data:
+                return changed
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                event_name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if event_name == name or mask & _IN_Q_OVERFLOW:
+                    changed = True
+
+    def _poll_changed(self) -> bool:
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds; ``True`` if the file changed."""
+
+        if self._fd is None:
+            deadline = timeout
+            while deadline > 0 and not self._closed.is_set():
+                if self._poll_changed():
+                    return True
+                step = min(self._poll_interval, deadline)
+                self._closed.wait(timeout=step)
+                deadline -= step
+            return self._poll_changed()
+        while not self._closed.is_set():
+            try:
+                readable, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+            except (OSError, ValueError):
+                return False  # closed concurrently
+            if not readable or self._wake_r in readable:
+                return False
+            if self._read_events():
+                return True
+            # events of other files in the directory; keep waiting
+        return False
+
+    def close(self) -> None:
+        """Wake a pending :meth:`wait` and release the descriptors."""
+
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:  # pragma: no cover - best effort
+                pass
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+
+
+def bridge_assignments(config: PluginConfig) -> BridgeAssignments:
+    """Bridges that have mappings, with their mappings in configuration order."""
+
+    grouped: Dict[str, List[VirtualInputConfig]] = {}
+    for mapping in config.virtual_inputs:
+        grouped.setdefault(mapping.bridge_id, []).append(mapping)
+    return {
+        bridge.id: (bridge, tuple(grouped[bridge.id]))
+        for bridge in config.bridges
+        if grouped.get(bridge.id)
+    }
+
+
+@dataclass(frozen=True)
+class BridgeChanges:
+    """Bridge ids grouped by what a configuration change means for their worker."""
+
+    added: Tuple[str, ...] = ()
+    removed: Tuple[str, ...] = ()
+    reconnect: Tuple[str, ...] = ()
+    updated: Tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.reconnect or self.updated)
+
+
+def diff_bridge_assignments(previous: BridgeAssignments, current: BridgeAssignments) -> BridgeChanges:
+    """Compare two :func:`bridge_assignments` results.
+
+    ``reconnect`` lists bridges whose connection settings changed (the
+    worker must be replaced), ``updated`` those where only the mappings or
+    other bridge fields such as the name differ.
+    """
+
+    added: List[str] = []
+    reconnect: List[str] = []
+    updated: List[str] = []
+    for bridge_id, (bridge, mappings) in current.items():
+        before = previous.get(bridge_id)
+        if before is None:
+            added.append(bridge_id)
+        elif bridge_fingerprint(before[0]) != bridge_fingerprint(bridge):
+            reconnect.append(bridge_id)
+        elif before[0] != bridge or before[1] != mappings:
+            updated.append(bridge_id)
+    removed = [bridge_id for bridge_id in previous if bridge_id not in current]
+    return BridgeChanges(tuple(added), tuple(removed), tuple(reconnect), tuple(updated))
+
+
+__all__ = [
+    "BridgeAssignments",
+    "BridgeChanges",
+    "ConfigWatcher",
+    "bridge_assignments",
+    "diff_bridge_assignments",
+]
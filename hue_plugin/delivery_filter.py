@@ -0,0 +1,157 @@
+"""Per virtual input deduplication and rate limiting of deliveries.
+
+Flapping motion sensors and ``repeat`` events of buttons and dials produce
+the same value for the same virtual input many times per second. With
+``dedup_window_ms`` a mapping suppresses a value equal to the previous one
+within that window; with ``min_interval_ms`` values arriving faster are
+held back and only the latest one is sent when the interval has passed
+(trailing edge). Mappings without both settings pass unchanged. A value
+whose delivery failed is handed back with :meth:`DeliveryFilter.send_failed`
+so neither setting suppresses its retry.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from .config import VirtualInputConfig
+
+SEND = "send"  # forward the value now
+DROP = "drop"  # duplicate of the latest value
+DEFER = "defer"  # held back, schedule :meth:`DeliveryFilter.take_pending` after the delay
+HOLD = "hold"  # replaced the value already held back, its timer is pending
+
+
+def filter_enabled(mapping: VirtualInputConfig) -> bool:
+    return bool(mapping.dedup_window_ms or mapping.min_interval_ms)
+
+
+class _InputState:
+    __slots__ = ("last_value", "last_sent", "previous", "pending", "forwarded", "suppressed")
+
+    def __init__(self) -> None:
+        self.last_value: Optional[str] = None
+        self.last_sent: Optional[float] = None
+        # value and time of the send before the latest, restored by send_failed
+        self.previous: Tuple[Optional[str], Optional[float]] = (None, None)
+        self.pending: Optional[Tuple[str, Any]] = None
+        self.forwarded = 0
+        self.suppressed = 0
+
+
+class DeliveryFilter:
+    """Decides per mapping whether a value is sent, dropped or held back.
+
+    The filter does not send anything itself: the caller sends on
+    :data:`SEND` and, on :data:`DEFER`, schedules a timer that fetches the
+    held back value with :meth:`take_pending`. ``item`` is an opaque
+    payload returned together with the held back value. Values are counted
+    as sent when they are released; the caller reports a failed send with
+    :meth:`send_failed`.
+    """
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inputs: Dict[str, _InputState] = {}
+
+    def offer(self, mapping: VirtualInputConfig, value: str, item: Any = None) -> Tuple[str, float]:
+        """Classify ``value``; returns the action and the delay for :data:`DEFER`."""
+
+        if not filter_enabled(mapping):
+            return SEND, 0.0
+        now = self._clock()
+        with self._lock:
+            state = self._inputs.setdefault(mapping.id, _InputState())
+            if state.pending is not None:
+                if state.pending[0] == value and mapping.dedup_window_ms:
+                    state.suppressed += 1
+                    return DROP, 0.0
+                # only the latest value is sent on the trailing edge
+                state.pending = (value, item)
+                state.suppressed += 1
+                return HOLD, 0.0
+            if self._duplicate_locked(mapping, state, value, now):
+                state.suppressed += 1
+                return DROP, 0.0
+            if mapping.min_interval_ms and state.last_sent is not None:
+                wait = state.last_sent + mapping.min_interval_ms / 1000.0 - now
+                if wait > 0:
+                    state.pending = (value, item)
+                    return DEFER, wait
+            self._mark_sent_locked(state, value, now)
+            return SEND, 0.0
+
+    def take_pending(self, mapping: VirtualInputConfig) -> Optional[Tuple[str, Any]]:
+        """Value and item held back for ``mapping``, ``None`` if nothing is left to send."""
+
+        now = self._clock()
+        with self._lock:
+            state = self._inputs.get(mapping.id)
+            if state is None or state.pending is None:
+                return None
+            pending, state.pending = state.pending, None
+            if self._duplicate_locked(mapping, state, pending[0], now):
+                state.suppressed += 1
+                return None
+            self._mark_sent_locked(state, pending[0], now)
+            return pending
+
+    def send_failed(self, mapping: VirtualInputConfig, value: str) -> None:
+        """Forget that ``value`` was sent so a retry of it is not suppressed."""
+
+        with self._lock:
+            state = self._inputs.get(mapping.id)
+            if state is None or state.last_sent is None or state.last_value != value:
+                return
+            state.last_value, state.last_sent = state.previous
+            state.previous = (None, None)
+            state.forwarded -= 1
+
+    @staticmethod
+    def _duplicate_locked(mapping: VirtualInputConfig, state: _InputState, value: str, now: float) -> bool:
+        return bool(
+            mapping.dedup_window_ms
+            and state.last_sent is not None
+            and state.last_value == value
+            and now - state.last_sent < mapping.dedup_window_ms / 1000.0
+        )
+
+    @staticmethod
+    def _mark_sent_locked(state: _InputState, value: str, now: float) -> None:
+        state.previous = (state.last_value, state.last_sent)
+        state.last_value = value
+        state.last_sent = now
+        state.forwarded += 1
+
+    def counters(self, mapping_id: str) -> Dict[str, int]:
+        """Forwarded and suppressed values of one mapping."""
+
+        with self._lock:
+            state = self._inputs.get(mapping_id)
+            if state is None:
+                return {"forwarded": 0, "suppressed": 0}
+            return {"forwarded": state.forwarded, "suppressed": state.suppressed}
+
+    def retain(self, mapping_ids: Iterable[str]) -> None:
+        """Forget mappings that are no longer configured."""
+
+        keep = set(mapping_ids)
+        with self._lock:
+            for mapping_id in [key for key in self._inputs if key not in keep]:
+                del self._inputs[mapping_id]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                mapping_id: {
+                    "forwarded": state.forwarded,
+                    "suppressed": state.suppressed,
+                    "pending": int(state.pending is not None),
+                }
+                for mapping_id, state in self._inputs.items()
+            }
+
+
+__all__ = ["DEFER", "DROP", "DeliveryFilter", "HOLD", "SEND", "filter_enabled"]
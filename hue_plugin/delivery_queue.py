@@ -0,0 +1,229 @@
+"""Bounded delivery queue between the Hue event stream and Loxone.
+
+The event stream reader only classifies events and enqueues delivery jobs;
+a small pool of worker threads performs the (potentially slow) HTTP calls
+to the Miniserver and the state persistence. Jobs sharing a key - the
+virtual input mapping - are executed strictly in submission order, jobs of
+different keys run in parallel.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+BACKPRESSURE_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+_Job = Callable[[], None]
+
+
+def _log(message: str) -> None:
+    print(f"[hue-delivery-queue] {message}", flush=True)
+
+
+class DeliveryQueue:
+    """Bounded, key-ordered job queue served by a worker pool.
+
+    ``max_pending`` limits the number of queued (not yet running) jobs.
+    When the queue is full, ``policy`` decides what happens to a new job:
+
+    ``drop_oldest``
+        discard the oldest queued job of the same key, or the globally
+        oldest job if the key has nothing queued;
+    ``drop_newest``
+        discard the new job;
+    ``block``
+        wait up to ``block_timeout`` seconds for room, then discard the
+        new job.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 4,
+        max_pending: int = 256,
+        policy: str = "drop_oldest",
+        block_timeout: float = 1.0,
+        name: str = "hue-delivery",
+    ) -> None:
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unbekannte Backpressure-Strategie: {policy}")
+        self._workers = max(1, int(workers))
+        self._max_pending = max(1, int(max_pending))
+        self._policy = policy
+        self._block_timeout = block_timeout
+        self._name = name
+        self._condition = threading.Condition()
+        self._lanes: Dict[str, Deque[Tuple[int, _Job]]] = {}
+        self._ready: Deque[str] = deque()
+        self._active: set[str] = set()
+        self._sequence = 0
+        self._pending = 0
+        self._running = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        self._stats: Dict[str, int] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "max_queue_depth": 0,
+        }
+
+    @property
+    def policy(self) -> str:
+        return self._policy
+
+    def submit(self, key: str, job: _Job) -> bool:
+        """Queue ``job`` behind all earlier jobs of ``key``.
+
+        Returns ``False`` if the job was discarded by the backpressure
+        policy or because the queue is closed.
+        """
+
+        with self._condition:
+            if self._closed:
+                return False
+            if self._pending >= self._max_pending:
+                if not self._make_room_locked(key):
+                    self._stats["dropped"] += 1
+                    return False
+            self._stats["submitted"] += 1
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = deque()
+            self._sequence += 1
+            lane.append((self._sequence, job))
+            self._pending += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._pending)
+            if len(lane) == 1 and key not in self._active:
+                self._ready.append(key)
+            self._ensure_threads_locked()
+            self._condition.notify()
+            return True
+
+    def _make_room_locked(self, key: str) -> bool:
+        if self._policy == "drop_newest":
+            return False
+        if self._policy == "block":
+            deadline = time.monotonic() + self._block_timeout
+            while self._pending >= self._max_pending and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(timeout=remaining)
+            return not self._closed
+
+        victim = key if self._lanes.get(key) else None
+        if victim is None:
+            # oldest queued job overall: smallest sequence number at a lane head
+            heads = [(lane[0][0], name) for name, lane in self._lanes.items() if lane]
+            if not heads:
+                return False
+            victim = min(heads)[1]
+        self._lanes[victim].popleft()
+        self._pending -= 1
+        self._stats["dropped"] += 1
+        if not self._lanes[victim]:
+            del self._lanes[victim]
+            if victim in self._ready:
+                self._ready.remove(victim)
+        _log(f"Warteschlange '{self._name}' voll, älteste Weiterleitung für '{victim}' verworfen.")
+        return True
+
+    def _ensure_threads_locked(self) -> None:
+        if self._threads:
+            return
+        for index in range(self._workers):
+            thread = threading.Thread(
+                target=self._run,
+                name=f"{self._name}-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job_locked(self) -> Optional[Tuple[str, _Job]]:
+        while self._ready:
+            key = self._ready.popleft()
+            lane = self._lanes.get(key)
+            if not lane:
+                continue
+            _, job = lane.popleft()
+            if not lane:
+                del self._lanes[key]
+            self._pending -= 1
+            self._active.add(key)
+            self._running += 1
+            return key, job
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                item = self._next_job_locked()
+                while item is None:
+                    if self._closed:
+                        return
+                    self._condition.wait()
+                    item = self._next_job_locked()
+                # a free slot may unblock a producer waiting under "block"
+                self._condition.notify_all()
+            key, job = item
+            failed = False
+            try:
+                job()
+            except Exception as exc:  # pragma: no cover - jobs handle their own errors
+                failed = True
+                _log(f"Weiterleitung für '{key}' fehlgeschlagen: {exc}")
+            with self._condition:
+                self._stats["failed" if failed else "completed"] += 1
+                self._running -= 1
+                self._active.discard(key)
+                if self._lanes.get(key):
+                    self._ready.append(key)
+                self._condition.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has finished; ``False`` on timeout."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._running:
+                if deadline is None:
+                    self._condition.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(timeout=remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop accepting jobs, let queued ones finish up to ``timeout``."""
+
+        self.join(timeout=timeout)
+        with self._condition:
+            self._closed = True
+            dropped = self._pending
+            self._lanes.clear()
+            self._ready.clear()
+            self._pending = 0
+            self._stats["dropped"] += dropped
+            self._condition.notify_all()
+        if dropped:
+            _log(f"Warteschlange '{self._name}' beendet, {dropped} Weiterleitung(en) verworfen.")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            payload: Dict[str, Any] = dict(self._stats)
+            payload["queue_depth"] = self._pending
+            payload["in_flight"] = self._running
+            payload["capacity"] = self._max_pending
+            payload["workers"] = self._workers
+            payload["policy"] = self._policy
+        return payload
+
+
+__all__ = ["BACKPRESSURE_POLICIES", "DeliveryQueue"]
@@ -0,0 +1,258 @@
+"""SQLite backend for the Hue → Loxone event history.
+
+Alternative to the JSON snapshot/journal of :class:`EventStateStore` for
+long retention: events live in an indexed table (WAL mode, so the
+forwarder can write while the CLI reads) and the virtual-input-events
+queries - date filter, ``--before``/``--after`` cursors, available dates -
+are answered by the database instead of filtering in Python.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import VirtualInputConfig
+from .event_forwarder import (
+    EVENT_STORE_WRITE_SECONDS,
+    EVENT_STORE_WRITTEN,
+    WriteBehindBuffer,
+    build_event_record,
+)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        event_id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        local_date TEXT,
+        mapping_id TEXT,
+        payload TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_events_local_date ON events (local_date, event_id)",
+    "CREATE INDEX IF NOT EXISTS idx_events_mapping ON events (mapping_id, event_id)",
+    """
+    CREATE TABLE IF NOT EXISTS states (
+        mapping_id TEXT PRIMARY KEY,
+        payload TEXT NOT NULL
+    )
+    """,
+)
+
+_TRIM_INTERVAL = 1000
+
+
+def event_database_path(state_path: str | Path) -> Path:
+    """Return the SQLite database that belongs to a runtime state file."""
+
+    return Path(state_path).with_suffix(".sqlite3")
+
+
+def _local_date(timestamp: str) -> Optional[str]:
+    candidate = timestamp.strip()
+    if candidate.endswith("Z"):
+        candidate = candidate[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(candidate)
+    except ValueError:
+        return None
+    return parsed.astimezone().date().isoformat()
+
+
+class SQLiteEventStore:
+    """Event history and latest state per mapping in an SQLite database.
+
+    Implements the writer interface of :class:`EventStateStore`
+    (``record``/``clear``/``close``, optional group commit) plus indexed
+    read queries.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_events: int = 100_000,
+        *,
+        flush_interval_ms: float = 0,
+        flush_batch: int = 50,
+    ) -> None:
+        self._path = Path(path)
+        self._max_events = max(1, int(max_events))
+        self._lock = threading.Lock()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self._path),
+            timeout=5.0,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        row = self._conn.execute("SELECT MAX(event_id) FROM events").fetchone()
+        self._counter = max(int(time.time() * 1000), row[0] or 0)
+        self._since_trim = 0
+        self._write_behind: Optional[WriteBehindBuffer] = None
+        if flush_interval_ms > 0:
+            self._write_behind = WriteBehindBuffer(
+                self._insert_locked,
+                self._lock,
+                interval_ms=flush_interval_ms,
+                max_batch=flush_batch,
+            )
+
+    # -- writer interface ------------------------------------------------------------
+    def record(
+        self,
+        mapping: VirtualInputConfig,
+        *,
+        event_type: str,
+        state: str,
+        value: Optional[str],
+        trigger: Optional[str] = None,
+        delivered: bool = True,
+        extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        event = build_event_record(
+            mapping,
+            event_type=event_type,
+            state=state,
+            value=value,
+            trigger=trigger,
+            delivered=delivered,
+            extra=extra,
+            trace=trace,
+        )
+        with self._lock:
+            self._counter += 1
+            event = {"event_id": self._counter, **event}
+            if self._write_behind is not None:
+                self._write_behind.add(event)
+            else:
+                self._insert_locked([event])
+        return event
+
+    def flush(self) -> None:
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def flush_stats(self) -> Dict[str, float]:
+        return self._write_behind.stats() if self._write_behind is not None else {}
+
+    def _insert_locked(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        started = time.perf_counter()
+        rows = []
+        states = {}
+        for event in events:
+            payload = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+            timestamp = str(event.get("timestamp") or "")
+            rows.append((event["event_id"], timestamp, _local_date(timestamp), event.get("mapping_id"), payload))
+            mapping_id = event.get("mapping_id")
+            if isinstance(mapping_id, str):
+                states[mapping_id] = payload
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events (event_id, timestamp, local_date, mapping_id, payload)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO states (mapping_id, payload) VALUES (?, ?)",
+                list(states.items()),
+            )
+        self._since_trim += len(rows)
+        if self._since_trim >= _TRIM_INTERVAL:
+            self._trim_locked()
+        EVENT_STORE_WRITE_SECONDS.observe(time.perf_counter() - started, backend="sqlite")
+        EVENT_STORE_WRITTEN.inc(len(rows), backend="sqlite")
+
+    def _trim_locked(self) -> None:
+        self._since_trim = 0
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM events WHERE event_id <= ("
+                " SELECT event_id FROM events ORDER BY event_id DESC LIMIT 1 OFFSET ?)",
+                (self._max_events,),
+            )
+
+    def clear(self) -> None:
+        """Remove all persisted events and states."""
+
+        with self._lock, self._conn:
+            if self._write_behind is not None:
+                self._write_behind.discard_locked()
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM events")
+            self._conn.execute("DELETE FROM states")
+
+    def close(self) -> None:
+        if self._write_behind is not None:
+            self._write_behind.close()
+        with self._lock:
+            if self._since_trim:
+                self._trim_locked()
+            self._conn.close()
+
+    # -- queries ---------------------------------------------------------------------
+    def states(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT mapping_id, payload FROM states").fetchall()
+        return {mapping_id: json.loads(payload) for mapping_id, payload in rows}
+
+    def available_dates(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT local_date FROM events"
+                " WHERE local_date IS NOT NULL ORDER BY local_date DESC"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def query_events(
+        self,
+        *,
+        on_date: Optional[date] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Return matching events (newest first), their count and newest id."""
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        if on_date is not None:
+            clauses.append("local_date = ?")
+            params.append(on_date.isoformat())
+        if before is not None:
+            clauses.append("event_id < ?")
+            params.append(before)
+        if after is not None:
+            clauses.append("event_id > ?")
+            params.append(after)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT payload FROM events{where} ORDER BY event_id DESC"
+        query_params = list(params)
+        if limit is not None:
+            sql += " LIMIT ?"
+            query_params.append(limit)
+        with self._lock:
+            total, latest = self._conn.execute(
+                f"SELECT COUNT(*), MAX(event_id) FROM events{where}", params
+            ).fetchone()
+            rows = self._conn.execute(sql, query_params).fetchall()
+        return {
+            "events": [json.loads(row[0]) for row in rows],
+            "total_filtered": total,
+            "latest_event_id": latest,
+        }
+
+
+__all__ = ["SQLiteEventStore", "event_database_path"]
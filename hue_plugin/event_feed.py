@@ -0,0 +1,301 @@
+"""Live feed of forwarded Hue → Loxone events.
+
+:class:`EventFeed` keeps the newest events in memory and lets readers wait
+for events newer than a cursor (``event_id``, as used by the ``--after``
+option of ``virtual-input-events``), either blocking a thread or, from
+asyncio code, awaiting without one. :class:`StoreFeedFollower` fills a
+feed from the event store written by the forwarder process: it tails the
+JSON journal incrementally (or queries the SQLite store by cursor), so
+new events are picked up without re-reading the whole state.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .event_forwarder import (
+    event_journal_path,
+    event_store_backend,
+    load_event_state,
+    open_event_store,
+)
+
+_JSON = Dict[str, Any]
+
+
+def _log(message: str) -> None:
+    print(f"[hue-event-feed] {message}", flush=True)
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class EventFeed:
+    """Bounded in-memory event history with blocking cursor reads."""
+
+    def __init__(self, capacity: int = 500) -> None:
+        self._events: Deque[_JSON] = deque(maxlen=max(1, capacity))
+        self._condition = threading.Condition()
+        self._latest_id: Optional[int] = None
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+
+    @property
+    def latest_id(self) -> Optional[int]:
+        with self._condition:
+            return self._latest_id
+
+    def publish(self, events: Iterable[_JSON]) -> int:
+        """Append events newer than the latest one; returns how many were new."""
+
+        added = 0
+        with self._condition:
+            for event in events:
+                event_id = event.get("event_id") if isinstance(event, dict) else None
+                if not isinstance(event_id, int):
+                    continue
+                if self._latest_id is not None and event_id <= self._latest_id:
+                    continue
+                self._events.append(event)
+                self._latest_id = event_id
+                added += 1
+            if added:
+                self._condition.notify_all()
+                waiters, self._waiters = self._waiters, []
+            else:
+                waiters = []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:  # loop already closed
+                pass
+        return added
+
+    def _after_locked(self, after: Optional[int], limit: Optional[int]) -> List[_JSON]:
+        if after is None:
+            events = list(self._events)
+            return events[-limit:] if limit else events
+        events = [event for event in self._events if event["event_id"] > after]
+        return events[:limit] if limit else events
+
+    def events_after(self, after: Optional[int], limit: Optional[int] = None) -> List[_JSON]:
+        """Events with ``event_id > after`` in ascending order.
+
+        Without a cursor the newest ``limit`` events are returned.
+        """
+
+        with self._condition:
+            return self._after_locked(after, limit)
+
+    def wait_for_events(
+        self,
+        after: Optional[int],
+        timeout: float,
+        limit: Optional[int] = None,
+    ) -> List[_JSON]:
+        """Like :meth:`events_after`, but wait up to ``timeout`` for new events."""
+
+        with self._condition:
+            if after is not None:
+                self._condition.wait_for(
+                    lambda: self._latest_id is not None and self._latest_id > after,
+                    timeout=timeout,
+                )
+            return self._after_locked(after, limit)
+
+    async def wait_for_events_async(
+        self,
+        after: Optional[int],
+        timeout: float,
+        limit: Optional[int] = None,
+    ) -> List[_JSON]:
+        """Asyncio variant of :meth:`wait_for_events` that holds no thread while waiting."""
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            with self._condition:
+                remaining = deadline - loop.time()
+                ready = self._latest_id is not None and after is not None and self._latest_id > after
+                if after is None or ready or remaining <= 0:
+                    return self._after_locked(after, limit)
+                waiter: "asyncio.Future[None]" = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await asyncio.wait({waiter}, timeout=remaining)
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+                    with self._condition:
+                        if (loop, waiter) in self._waiters:
+                            self._waiters.remove((loop, waiter))
+
+
+def _sse_message(event: _JSON) -> str:
+    data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event['event_id']}\nevent: virtual-input\ndata: {data}\n\n"
+
+
+def iter_sse_messages(
+    feed: EventFeed,
+    after: Optional[int],
+    *,
+    heartbeat: float = 15.0,
+    limit: int = 100,
+) -> Iterator[str]:
+    """Yield Server-Sent-Events messages for new events (endless)."""
+
+    cursor = after if after is not None else feed.latest_id
+    yield "retry: 5000\n\n"
+    while True:
+        if cursor is None:
+            cursor = feed.latest_id
+        events = feed.wait_for_events(cursor if cursor is not None else -1, heartbeat, limit)
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            cursor = event["event_id"]
+            yield _sse_message(event)
+
+
+async def aiter_sse_messages(
+    feed: EventFeed,
+    after: Optional[int],
+    *,
+    heartbeat: float = 15.0,
+    limit: int = 100,
+) -> AsyncIterator[str]:
+    """Asyncio variant of :func:`iter_sse_messages` for the API server."""
+
+    cursor = after if after is not None else feed.latest_id
+    yield "retry: 5000\n\n"
+    while True:
+        if cursor is None:
+            cursor = feed.latest_id
+        events = await feed.wait_for_events_async(cursor if cursor is not None else -1, heartbeat, limit)
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            cursor = event["event_id"]
+            yield _sse_message(event)
+
+
+class StoreFeedFollower:
+    """Background thread publishing new events of an event store to a feed."""
+
+    def __init__(
+        self,
+        feed: EventFeed,
+        state_path: str | Path,
+        *,
+        interval: float = 0.5,
+    ) -> None:
+        self._feed = feed
+        self._state_path = Path(state_path)
+        self._journal_path = event_journal_path(self._state_path)
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._offset = 0
+        self._database: Any = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="hue-event-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(timeout=self._interval):
+            try:
+                self.poll()
+            except Exception as exc:  # pragma: no cover - keep following
+                _log(f"Ereignisse konnten nicht gelesen werden: {exc}")
+
+    def poll(self) -> None:
+        """Publish events written since the previous call."""
+
+        if self._database is not None or event_store_backend(self._state_path) == "sqlite":
+            self._poll_database()
+        else:
+            self._poll_journal()
+
+    def _poll_database(self) -> None:
+        if self._database is None:
+            self._database = open_event_store(self._state_path, backend="sqlite")
+        after = self._feed.latest_id
+        limit = None if after is not None else 500
+        result = self._database.query_events(after=after, limit=limit)
+        self._feed.publish(reversed(result["events"]))
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _complete_length(self, size: int) -> int:
+        """Length of the journal prefix that ends with a complete record."""
+
+        try:
+            with self._journal_path.open("rb") as handle:
+                data = handle.read(size)
+        except OSError:
+            return 0
+        return data.rfind(b"\n") + 1
+
+    def _poll_journal(self) -> None:
+        snapshot_signature = self._signature(self._state_path)
+        try:
+            journal_size = self._journal_path.stat().st_size
+        except OSError:
+            journal_size = 0
+
+        if snapshot_signature != self._snapshot_signature or journal_size < self._offset:
+            # compaction or clear: read snapshot and journal once more
+            self._snapshot_signature = snapshot_signature
+            self._offset = self._complete_length(journal_size)
+            self._feed.publish(load_event_state(self._state_path)["events"])
+            return
+        if journal_size == self._offset:
+            return
+
+        try:
+            with self._journal_path.open("rb") as handle:
+                handle.seek(self._offset)
+                chunk = handle.read(journal_size - self._offset)
+        except OSError:
+            return
+        complete = chunk.rfind(b"\n") + 1
+        if not complete:
+            return
+        self._offset += complete
+        events = []
+        for line in chunk[:complete].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                events.append(event)
+        self._feed.publish(events)
+
+
+__all__ = ["EventFeed", "StoreFeedFollower", "aiter_sse_messages", "iter_sse_messages"]
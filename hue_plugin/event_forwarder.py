@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import threading
 import time
 import json
@@ -7,10 +8,11 @@ from collections import defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
-from urllib.parse import quote
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
 
 import requests
 from requests import exceptions as requests_exc
+from requests.adapters import HTTPAdapter
 
 from .config import (
     ConfigError,
@@ -18,46 +20,302 @@ from .config import (
     LoxoneSettings,
     PluginConfig,
     VirtualInputConfig,
-    load_config,
+    config_path,
+    embedded_forwarder_marker_path,
+    env_number,
+    load_config_snapshot,
     runtime_state_path,
 )
-from .hue_client import HueBridgeClient, HueBridgeError
+from .config_watcher import BridgeAssignments, ConfigWatcher, bridge_assignments, diff_bridge_assignments
+from .delivery_filter import DEFER, SEND, DeliveryFilter, filter_enabled
+from .delivery_queue import BACKPRESSURE_POLICIES, DeliveryQueue
+from .hue_client import (
+    HueBridgeClient,
+    HueBridgeError,
+    HueClientPool,
+    ResourceIdFilter,
+    decode_json,
+    iter_timed_event_entries,
+)
+from .latency import BUCKET_BOUNDS_MS, TRACE_STAGES, LatencyTracker, parse_creation_time
+from .metrics import REGISTRY, Counter, Gauge, Histogram, MetricFamily, serve_metrics
+from .outbox import DeliveryOutbox, outbox_path
+from .timer_scheduler import TimerScheduler
 
 
 def _log(message: str) -> None:
     print(f"[hue-event-forwarder] {message}", flush=True)
 
 
+LOXONE_REQUESTS = REGISTRY.counter(
+    "hue_loxone_requests_total",
+    "Anfragen an virtuelle Eingänge des Miniservers (ok, HTTP-Status der Ablehnung oder error).",
+    ("status",),
+)
+LOXONE_REQUEST_SECONDS = REGISTRY.histogram(
+    "hue_loxone_request_duration_seconds",
+    "Antwortzeit des Miniservers in Sekunden.",
+)
+# counters of BridgeWorker.event_stats()
+EVENT_OUTCOMES = ("received", "matched", "forwarded", "failed")
+
+EVENT_STORE_WRITE_SECONDS = REGISTRY.histogram(
+    "hue_event_store_write_duration_seconds",
+    "Dauer eines Schreibvorgangs des Ereignisspeichers in Sekunden.",
+    ("backend",),
+)
+EVENT_STORE_WRITTEN = REGISTRY.counter(
+    "hue_event_store_events_written_total",
+    "In den Ereignisspeicher geschriebene Ereignisse.",
+    ("backend",),
+)
+
+
+def build_event_record(
+    mapping: VirtualInputConfig,
+    *,
+    event_type: str,
+    state: str,
+    value: Optional[str],
+    trigger: Optional[str] = None,
+    delivered: bool = True,
+    extra: Optional[Dict[str, Any]] = None,
+    trace: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """Return the persisted representation of one event (without ``event_id``).
+
+    ``trace`` holds the stage timestamps of :mod:`hue_plugin.latency`;
+    ``persisted`` is added here.
+    """
+
+    now = datetime.now(timezone.utc)
+    timestamp = now.isoformat()
+    value_str = "" if value is None else str(value)
+    event: Dict[str, Any] = {
+        "timestamp": timestamp,
+        "mapping_id": mapping.id,
+        "bridge_id": mapping.bridge_id,
+        "resource_id": mapping.resource_id,
+        "resource_type": mapping.resource_type,
+        "virtual_input": mapping.virtual_input,
+        "name": mapping.name,
+        "event_type": event_type,
+        "state": state,
+        "value": value_str,
+        "delivered": bool(delivered),
+    }
+    if trigger:
+        event["trigger"] = trigger
+    if extra:
+        event["extra"] = extra
+    if trace:
+        stages = {**trace, "persisted": now.timestamp()}
+        event["trace"] = {key: round(stages[key], 3) for key in TRACE_STAGES if key in stages}
+    return event
+
+
+def event_journal_path(path: str | Path) -> Path:
+    """Return the append-only journal that belongs to a state snapshot file."""
+
+    return Path(path).with_suffix(".journal")
+
+
+def _empty_state() -> Dict[str, Any]:
+    return {"events": [], "states": {}}
+
+
+def _read_snapshot(path: Path) -> Dict[str, Any]:
+    try:
+        raw = path.read_text(encoding="utf-8")
+        data = json.loads(raw)
+    except (OSError, ValueError):
+        return _empty_state()
+    if not isinstance(data, dict):
+        return _empty_state()
+    events = data.get("events")
+    states = data.get("states")
+    return {
+        "events": events if isinstance(events, list) else [],
+        "states": states if isinstance(states, dict) else {},
+    }
+
+
+def _apply_event(data: Dict[str, Any], event: Dict[str, Any]) -> None:
+    mapping_id = event.get("mapping_id")
+    if isinstance(mapping_id, str):
+        data.setdefault("states", {})[mapping_id] = dict(event)
+    data.setdefault("events", []).append(event)
+
+
+def _replay_journal(data: Dict[str, Any], journal: Path) -> int:
+    """Apply the journal records newer than the snapshot to ``data``.
+
+    Lines that cannot be decoded - typically a record torn by a crash in
+    the middle of a write - are skipped. Returns the number of records in
+    the journal.
+    """
+
+    try:
+        handle = journal.open("rb")
+    except OSError:
+        return 0
+    ids = [event.get("event_id") for event in data["events"] if isinstance(event, dict)]
+    covered = max((value for value in ids if isinstance(value, int)), default=None)
+    count = 0
+    with handle:
+        for line in handle:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(event, dict):
+                continue
+            count += 1
+            event_id = event.get("event_id")
+            if covered is not None and isinstance(event_id, int) and event_id <= covered:
+                # already part of the snapshot (crash between snapshot and truncate)
+                continue
+            _apply_event(data, event)
+    return count
+
+
+class WriteBehindBuffer:
+    """Group commit for an event store.
+
+    Records are collected in memory and handed to ``write_batch`` by a
+    background thread at least every ``interval_ms`` milliseconds or as
+    soon as ``max_batch`` records are pending. ``lock`` is the lock of the
+    owning store: :meth:`add` and :meth:`discard_locked` must be called
+    while holding it, :meth:`flush` acquires it.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], None],
+        lock: threading.Lock,
+        *,
+        interval_ms: float,
+        max_batch: int = 50,
+        name: str = "hue-event-flusher",
+    ) -> None:
+        self._write_batch = write_batch
+        self._lock = lock
+        self._interval = max(0.001, interval_ms / 1000.0)
+        self._max_batch = max(1, int(max_batch))
+        self._pending: List[Dict[str, Any]] = []
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._stats: Dict[str, float] = {
+            "flushes": 0,
+            "flushed_events": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def add(self, event: Dict[str, Any]) -> None:
+        self._pending.append(event)
+        if len(self._pending) >= self._max_batch:
+            self._wakeup.set()
+
+    def discard_locked(self) -> None:
+        self._pending.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            started = time.perf_counter()
+            self._write_batch(batch)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            stats = self._stats
+            stats["flushes"] += 1
+            stats["flushed_events"] += len(batch)
+            stats["last_batch_size"] = len(batch)
+            stats["max_batch_size"] = max(stats["max_batch_size"], len(batch))
+            stats["last_flush_ms"] = elapsed_ms
+            stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+            stats["total_flush_ms"] += elapsed_ms
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            payload = dict(self._stats)
+            payload["pending"] = len(self._pending)
+        flushes = payload["flushes"]
+        payload["avg_batch_size"] = payload["flushed_events"] / flushes if flushes else 0.0
+        payload["avg_flush_ms"] = payload["total_flush_ms"] / flushes if flushes else 0.0
+        return payload
+
+    def close(self) -> None:
+        """Stop the flusher thread and write everything still pending."""
+
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5.0)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self._interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as exc:  # pragma: no cover - keep flushing later batches
+                _log(f"Ereignisse konnten nicht gespeichert werden: {exc}")
+
+
 class EventStateStore:
-    """Persist and expose the latest Hue → Loxone events."""
+    """Persist and expose the latest Hue → Loxone events.
+
+    Events are appended to a JSONL journal next to the state file; every
+    ``compact_every`` records (and on :meth:`close`) the in-memory state is
+    written as a snapshot to the state file and the journal is truncated.
+    Readers combine snapshot and journal, see :func:`load_event_state`.
 
-    def __init__(self, path: Path, max_events: int = 200) -> None:
+    With ``flush_interval_ms`` > 0 records only update the in-memory state
+    and are written to the journal in batches by a :class:`WriteBehindBuffer`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_events: int = 200,
+        *,
+        compact_every: Optional[int] = None,
+        flush_interval_ms: float = 0,
+        flush_batch: int = 50,
+    ) -> None:
         self._path = Path(path)
+        self._journal_path = event_journal_path(self._path)
         self._max_events = max_events
+        self._compact_every = max(1, compact_every or max_events)
         self._lock = threading.Lock()
         self._counter = int(time.time() * 1000)
-        self._data: Dict[str, Any] = {"events": [], "states": {}}
+        self._data: Dict[str, Any] = _empty_state()
+        self._journal: Optional[Any] = None
+        self._journal_records = 0
         self._load()
+        self._write_behind: Optional[WriteBehindBuffer] = None
+        if flush_interval_ms > 0:
+            self._write_behind = WriteBehindBuffer(
+                self._write_batch_locked,
+                self._lock,
+                interval_ms=flush_interval_ms,
+                max_batch=flush_batch,
+            )
 
     def _load(self) -> None:
-        if not self._path.exists():
-            return
-        try:
-            raw = self._path.read_text(encoding="utf-8")
-            data = json.loads(raw)
-        except (OSError, ValueError):  # pragma: no cover - best effort recovery
-            return
-        if not isinstance(data, dict):
-            return
-        events = data.get("events")
-        states = data.get("states")
-        if not isinstance(events, list):
-            events = []
-        if not isinstance(states, dict):
-            states = {}
+        data = _read_snapshot(self._path)
+        self._journal_records = _replay_journal(data, self._journal_path)
+        events = data["events"]
         if len(events) > self._max_events:
             events = events[-self._max_events :]
-        self._data = {"events": events, "states": states}
+        self._data = {"events": events, "states": data["states"]}
         for event in events:
             event_id = event.get("event_id")
             if isinstance(event_id, int):
@@ -67,7 +325,7 @@ class EventStateStore:
         self._counter += 1
         return self._counter
 
-    def _persist_locked(self) -> None:
+    def _persist_locked(self) -> bool:
         try:
             self._path.parent.mkdir(parents=True, exist_ok=True)
             tmp_path = self._path.with_suffix(".tmp")
@@ -77,6 +335,63 @@ class EventStateStore:
             tmp_path.replace(self._path)
         except OSError as exc:  # pragma: no cover - best effort logging
             _log(f"Statusdatei konnte nicht aktualisiert werden: {exc}")
+            return False
+        return True
+
+    def _append_locked(self, events: List[Dict[str, Any]]) -> None:
+        lines = "".join(
+            json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n" for event in events
+        )
+        try:
+            if self._journal is None:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                self._journal = self._journal_path.open("a+b")
+                self._journal.seek(0, os.SEEK_END)
+                if self._journal.tell() > 0:
+                    self._journal.seek(-1, os.SEEK_END)
+                    if self._journal.read(1) != b"\n":
+                        # terminate a record torn by an earlier crash
+                        self._journal.write(b"\n")
+            self._journal.write(lines.encode("utf-8"))
+            self._journal.flush()
+        except OSError as exc:  # pragma: no cover - best effort logging
+            _log(f"Ereignisjournal konnte nicht geschrieben werden: {exc}")
+            self._close_journal_locked()
+            return
+        self._journal_records += len(events)
+
+    def _write_batch_locked(self, events: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        self._append_locked(events)
+        if self._journal_records >= self._compact_every:
+            self._compact_locked()
+        EVENT_STORE_WRITE_SECONDS.observe(time.perf_counter() - started, backend="json")
+        EVENT_STORE_WRITTEN.inc(len(events), backend="json")
+
+    def _close_journal_locked(self) -> None:
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except OSError:  # pragma: no cover - best effort
+                pass
+            self._journal = None
+
+    def _truncate_journal_locked(self) -> bool:
+        self._close_journal_locked()
+        try:
+            with self._journal_path.open("wb"):
+                pass
+        except OSError as exc:  # pragma: no cover - best effort logging
+            _log(f"Ereignisjournal konnte nicht gekürzt werden: {exc}")
+            return False
+        self._journal_records = 0
+        return True
+
+    def _compact_locked(self) -> None:
+        # Journal records already contained in the snapshot are skipped on
+        # replay, so a crash between both steps loses nothing.
+        if self._persist_locked():
+            self._truncate_journal_locked()
 
     def record(
         self,
@@ -88,43 +403,81 @@ class EventStateStore:
         trigger: Optional[str] = None,
         delivered: bool = True,
         extra: Optional[Dict[str, Any]] = None,
-    ) -> None:
-        timestamp = datetime.now(timezone.utc).isoformat()
-        value_str = "" if value is None else str(value)
-        event: Dict[str, Any] = {
-            "event_id": self._next_event_id(),
-            "timestamp": timestamp,
-            "mapping_id": mapping.id,
-            "bridge_id": mapping.bridge_id,
-            "resource_id": mapping.resource_id,
-            "resource_type": mapping.resource_type,
-            "virtual_input": mapping.virtual_input,
-            "name": mapping.name,
-            "event_type": event_type,
-            "state": state,
-            "value": value_str,
-            "delivered": bool(delivered),
-        }
-        if trigger:
-            event["trigger"] = trigger
-        if extra:
-            event["extra"] = extra
-
+        trace: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        event = build_event_record(
+            mapping,
+            event_type=event_type,
+            state=state,
+            value=value,
+            trigger=trigger,
+            delivered=delivered,
+            extra=extra,
+            trace=trace,
+        )
         with self._lock:
-            states = self._data.setdefault("states", {})
-            states[mapping.id] = dict(event)
-            events = self._data.setdefault("events", [])
-            events.append(event)
+            event = {"event_id": self._next_event_id(), **event}
+            _apply_event(self._data, event)
+            events = self._data["events"]
             if len(events) > self._max_events:
                 del events[:-self._max_events]
-            self._persist_locked()
+            if self._write_behind is not None:
+                self._write_behind.add(event)
+            else:
+                self._write_batch_locked([event])
+        return event
+
+    def flush(self) -> None:
+        """Write pending records now (no-op without write-behind)."""
+
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def flush_stats(self) -> Dict[str, float]:
+        """Batch size and latency counters of the write-behind buffer."""
+
+        return self._write_behind.stats() if self._write_behind is not None else {}
 
     def clear(self) -> None:
         """Remove all persisted events and states."""
 
         with self._lock:
-            self._data = {"events": [], "states": {}}
-            self._persist_locked()
+            if self._write_behind is not None:
+                self._write_behind.discard_locked()
+            self._data = _empty_state()
+            # journal first: a crash in between leaves the old state intact
+            if self._truncate_journal_locked():
+                self._persist_locked()
+
+    def close(self) -> None:
+        """Write a final snapshot and release the journal."""
+
+        if self._write_behind is not None:
+            self._write_behind.close()
+        with self._lock:
+            if self._journal_records:
+                self._compact_locked()
+            self._close_journal_locked()
+
+
+class PublishingEventStore:
+    """Event store wrapper that hands every recorded event to ``publish``.
+
+    Used when the forwarder runs inside the API server: the events reach the
+    live feed of the server directly instead of through the files.
+    """
+
+    def __init__(self, store: Any, publish: Callable[[List[Dict[str, Any]]], Any]) -> None:
+        self._store = store
+        self._publish = publish
+
+    def record(self, mapping: VirtualInputConfig, **kwargs: Any) -> Dict[str, Any]:
+        event = self._store.record(mapping, **kwargs)
+        self._publish([event])
+        return event
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._store, name)
 
 
 def _coerce_motion_state(value: Any) -> Optional[bool]:
@@ -174,13 +527,135 @@ def extract_motion_state(entry: Dict[str, Any]) -> Optional[bool]:
     return _coerce_motion_state(state)
 
 
+def extract_button_report(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the ``button_report`` (event and ``updated`` time) of a payload."""
+
+    button = entry.get("button")
+    if not isinstance(button, dict):
+        return None
+    report = button.get("button_report")
+    return report if isinstance(report, dict) else None
+
+
+def extract_button_event(entry: Dict[str, Any]) -> Optional[str]:
+    """Return the reported button event (e.g. ``short_release``) of a payload."""
+
+    report = extract_button_report(entry)
+    event_name = report.get("event") if report else None
+    return event_name if isinstance(event_name, str) else None
+
+
+def extract_report_time(entry: Dict[str, Any]) -> Optional[str]:
+    """Return ``motion_report.changed`` or ``button_report.updated`` of a payload."""
+
+    motion = entry.get("motion")
+    if isinstance(motion, dict):
+        report = motion.get("motion_report")
+        changed = report.get("changed") if isinstance(report, dict) else None
+        return changed if isinstance(changed, str) else None
+    report = extract_button_report(entry)
+    updated = report.get("updated") if report else None
+    return updated if isinstance(updated, str) else None
+
+
+def _parse_report_time(value: str) -> Any:
+    candidate = value.strip()
+    if candidate.endswith("Z"):
+        candidate = candidate[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(candidate)
+    except ValueError:
+        return value
+
+
+class EventSequencer:
+    """Delivers each physical transition of a resource only once.
+
+    The event stream and the reconciliation after a reconnect can report the
+    same motion change or button press. Every observation passes through
+    :meth:`accept` with the report time of the bridge
+    (``motion_report.changed`` / ``button_report.updated``); it is accepted
+    only if it is newer than the last accepted one. Without report times
+    a change of ``state`` counts as a new transition (``None`` always does).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._seen: Dict[str, Tuple[Any, Any]] = {}
+        self._stats: Dict[str, int] = {"accepted": 0, "suppressed": 0}
+
+    def accept(
+        self,
+        resource_id: str,
+        state: Any,
+        reported: Optional[str],
+        *,
+        initial: bool = True,
+    ) -> bool:
+        """Whether to deliver an observation; ``initial`` decides for unknown resources."""
+
+        stamp = _parse_report_time(reported) if reported else None
+        with self._lock:
+            previous = self._seen.get(resource_id)
+            if previous is None:
+                accepted = initial
+                # the first observation is the baseline even if not delivered
+                self._seen[resource_id] = (stamp, state)
+                if accepted:
+                    self._stats["accepted"] += 1
+                return accepted
+            previous_stamp, previous_state = previous
+            if stamp is not None and previous_stamp is not None:
+                try:
+                    accepted = stamp > previous_stamp
+                except TypeError:  # mixed formats, compare as text
+                    accepted = str(stamp) > str(previous_stamp)
+            else:
+                accepted = state is None or state != previous_state
+            if accepted:
+                self._seen[resource_id] = (stamp if stamp is not None else previous_stamp, state)
+                self._stats["accepted"] += 1
+            else:
+                self._stats["suppressed"] += 1
+            return accepted
+
+    def retain(self, resource_ids: Iterable[str]) -> None:
+        """Forget all resources except ``resource_ids``."""
+
+        keep = set(resource_ids)
+        with self._lock:
+            for resource_id in [rid for rid in self._seen if rid not in keep]:
+                del self._seen[resource_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
 class LoxoneSender:
-    """Helper that triggers virtual inputs on the Loxone Miniserver."""
+    """Helper that triggers virtual inputs on the Loxone Miniserver.
+
+    Requests go through one keep-alive session per Miniserver. The session
+    (and its connection pool) is kept across :meth:`update` calls as long as
+    the base URL stays the same. Credentials embedded in the base URL are
+    extracted once and sent as basic auth by the session.
+    """
 
-    def __init__(self, settings: LoxoneSettings | None = None) -> None:
+    def __init__(
+        self,
+        settings: LoxoneSettings | None = None,
+        *,
+        pool_maxsize: int = 4,
+        timeout: float = 5,
+    ) -> None:
         self._lock = threading.Lock()
         self._base_url = ""
+        self._request_base = ""
+        self._auth: Optional[Tuple[str, str]] = None
         self._method = "POST"
+        self._pool_maxsize = max(1, int(pool_maxsize))
+        self._timeout = timeout
+        self._session: Optional[requests.Session] = None
         if settings:
             self.update(settings)
 
@@ -190,38 +665,111 @@ class LoxoneSender:
         method = (settings.event_method or "POST").strip().upper()
         if method not in {"GET", "POST"}:
             method = "POST"
+        stale: Optional[requests.Session] = None
         with self._lock:
-            self._base_url = base_url
+            if base_url != self._base_url:
+                stale, self._session = self._session, None
+                self._base_url = base_url
+                self._request_base, self._auth = _split_credentials(base_url)
             self._method = method
+        if stale is not None:
+            stale.close()
 
     @property
     def available(self) -> bool:
         with self._lock:
             return bool(self._base_url)
 
+    def _session_locked(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.auth = self._auth
+            self._session = session
+        return self._session
+
+    def close(self) -> None:
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
     def send(self, virtual_input: str, value: str) -> None:
         with self._lock:
-            base_url = self._base_url
+            base_url = self._request_base
             method = self._method
-        if not base_url:
+            session = self._session_locked() if base_url else None
+        if session is None:
             raise RuntimeError("Keine Loxone-Basis-URL konfiguriert.")
 
         safe_input = quote(virtual_input, safe="")
         safe_value = quote(value, safe="")
         url = f"{base_url}/dev/sps/io/{safe_input}/{safe_value}"
 
+        started = time.perf_counter()
+        status = "error"
         try:
             if method == "POST":
-                response = requests.post(url, timeout=5)
+                response = session.post(url, timeout=self._timeout)
             else:
-                response = requests.get(url, timeout=5)
+                response = session.get(url, timeout=self._timeout)
             response.raise_for_status()
+            status = "ok"
         except requests_exc.RequestException as exc:
+            if getattr(exc, "response", None) is not None:
+                status = str(exc.response.status_code)
             raise RuntimeError(f"Anfrage an Loxone fehlgeschlagen: {exc}") from exc
+        finally:
+            observe_loxone_request(status, time.perf_counter() - started)
+
+
+def observe_loxone_request(status: str, seconds: float) -> None:
+    """Count one request to the Miniserver (shared with the asyncio sender)."""
+
+    LOXONE_REQUESTS.inc(status=status)
+    LOXONE_REQUEST_SECONDS.observe(seconds)
+
+
+def _split_credentials(base_url: str) -> Tuple[str, Optional[Tuple[str, str]]]:
+    """Split ``user:password@`` from a base URL into a basic auth tuple."""
+
+    if not base_url:
+        return "", None
+    parts = urlsplit(base_url)
+    if parts.username is None:
+        return base_url, None
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"
+    if parts.port is not None:
+        host = f"{host}:{parts.port}"
+    stripped = urlunsplit((parts.scheme, host, parts.path, parts.query, parts.fragment))
+    return stripped, (unquote(parts.username), unquote(parts.password or ""))
 
 
 class BridgeWorker(threading.Thread):
-    """Per-bridge worker that listens for Hue events and forwards them."""
+    """Per-bridge worker that listens for Hue events and forwards them.
+
+    The worker thread only reads the event stream and matches events against
+    the mappings; sending to Loxone and recording the event happen on the
+    :class:`DeliveryQueue`, keyed by mapping so that the values of one
+    virtual input are delivered in order.
+
+    Instead of polling the bridge permanently, the worker reconciles the
+    mapped motion sensors and buttons once after every (re)connection of
+    the stream, so changes missed while it was down are still forwarded.
+
+    Values pass the :class:`DeliveryFilter` of their mapping first; those
+    the Miniserver does not accept are handed to the optional
+    :class:`DeliveryOutbox`, which retries them later.
+
+    With ``clients`` the bridge client comes from a shared
+    :class:`HueClientPool`; ``stream_tap`` (e.g. a
+    :class:`~hue_plugin.resource_mirror.ResourceMirror`) receives every
+    message of the event stream, so no second connection is needed.
+    """
 
     def __init__(
         self,
@@ -229,10 +777,18 @@ class BridgeWorker(threading.Thread):
         sender_provider: Callable[[], LoxoneSender],
         global_stop: threading.Event,
         state_store: EventStateStore,
+        delivery: Optional[DeliveryQueue] = None,
+        timers: Optional[TimerScheduler] = None,
+        outbox: Optional[DeliveryOutbox] = None,
+        *,
+        clients: Optional[HueClientPool] = None,
+        stream_tap: Any = None,
     ) -> None:
         super().__init__(daemon=True, name=f"hue-forwarder-{bridge_config.id}")
         self._bridge_config = bridge_config
-        self._client = HueBridgeClient(bridge_config)
+        self._clients = clients
+        self._stream_tap = stream_tap
+        self._client = clients.get(bridge_config) if clients is not None else HueBridgeClient(bridge_config)
         self._sender_provider = sender_provider
         self._global_stop = global_stop
         self._stop_event = threading.Event()
@@ -240,23 +796,77 @@ class BridgeWorker(threading.Thread):
         self._lookup: Dict[Tuple[str, str], Tuple[VirtualInputConfig, ...]] = {}
         self._state_store = state_store
         self._state_lock = threading.Lock()
-        self._last_motion_states: Dict[str, Optional[bool]] = {}
+        self._sequencer = EventSequencer()
+        self._health: Dict[str, Any] = {
+            "connected": False,
+            "connects": 0,
+            "disconnects": 0,
+            "backoff": 0.0,
+            "reconciliations": 0,
+            "last_connect": None,
+            "last_event": None,
+            "last_heartbeat": None,
+        }
+        self._events: Dict[str, int] = dict.fromkeys(EVENT_OUTCOMES, 0)
+        self._delivery = delivery or DeliveryQueue(name=f"hue-delivery-{bridge_config.id}")
+        self._owns_timers = timers is None
+        self._timers = timers or TimerScheduler()
+        self._payload_filter = ResourceIdFilter()
+        self._payload_stats: Dict[str, int] = {"decoded": 0, "skipped": 0}
+        self._outbox = outbox
+        self._filter = DeliveryFilter()
+        self._latency = LatencyTracker()
 
     @property
     def bridge_id(self) -> str:
         return self._bridge_config.id
 
-    def matches(self, config: HueBridgeConfig) -> bool:
-        return (
-            self._bridge_config.bridge_ip == config.bridge_ip
-            and self._bridge_config.application_key == config.application_key
-            and self._bridge_config.use_https == config.use_https
-            and self._bridge_config.verify_tls == config.verify_tls
-        )
+    def delivery_stats(self) -> Dict[str, Any]:
+        return self._delivery.stats()
+
+    def payload_stats(self) -> Dict[str, int]:
+        """Event stream messages decoded vs. skipped by the resource id filter."""
+
+        return dict(self._payload_stats)
+
+    def stream_health(self) -> Dict[str, Any]:
+        """Connection state of the event stream and times of the last activity."""
+
+        with self._state_lock:
+            return dict(self._health)
+
+    def dedup_stats(self) -> Dict[str, int]:
+        """Transitions accepted vs. suppressed as duplicates by the sequencer."""
+
+        return self._sequencer.stats()
+
+    def event_stats(self) -> Dict[str, int]:
+        """Stream messages received, entries matched and values forwarded or failed."""
+
+        with self._state_lock:
+            return dict(self._events)
+
+    def _count(self, outcome: str, amount: int = 1) -> None:
+        with self._state_lock:
+            self._events[outcome] += amount
+
+    def filter_stats(self) -> Dict[str, Dict[str, int]]:
+        """Forwarded, suppressed and held back values per filtered mapping."""
+
+        return self._filter.stats()
+
+    def latency_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Latency percentiles per trace stage and end-to-end per mapping."""
+
+        return self._latency.stats()
+
+    @property
+    def latency(self) -> LatencyTracker:
+        return self._latency
 
     def update_bridge(self, config: HueBridgeConfig) -> None:
         self._bridge_config = config
-        self._client = HueBridgeClient(config)
+        self._client = self._clients.get(config) if self._clients is not None else HueBridgeClient(config)
 
     def update_mappings(self, mappings: Iterable[VirtualInputConfig]) -> None:
         with self._lock:
@@ -265,14 +875,22 @@ class BridgeWorker(threading.Thread):
                 key = (mapping.resource_id, mapping.resource_type)
                 grouped[key].append(mapping)
             self._lookup = {key: tuple(items) for key, items in grouped.items()}
-        with self._state_lock:
-            active_motion_ids = {resource_id for (resource_id, rtype) in self._lookup if rtype == "motion"}
-            stale_ids = [rid for rid in self._last_motion_states if rid not in active_motion_ids]
-            for rid in stale_ids:
-                del self._last_motion_states[rid]
+            self._payload_filter = ResourceIdFilter(rid for rid, _ in self._lookup)
+        self._sequencer.retain(rid for rid, _ in self._lookup)
+        self._filter.retain(mapping.id for items in self._lookup.values() for mapping in items)
 
     def stop(self) -> None:
         self._stop_event.set()
+        with self._lock:
+            mapping_ids = [mapping.id for mappings in self._lookup.values() for mapping in mappings]
+        # deliver outstanding resets and held back values now so no virtual
+        # input keeps a stale value
+        for mapping_id in mapping_ids:
+            self._timers.fire_now((self.bridge_id, mapping_id))
+            self._timers.fire_now((self.bridge_id, mapping_id, "filter"))
+        if self._owns_timers:
+            self._timers.stop()
+        self._delivery.close(timeout=2.0)
 
     def _active(self) -> bool:
         with self._lock:
@@ -280,12 +898,6 @@ class BridgeWorker(threading.Thread):
 
     def run(self) -> None:  # pragma: no cover - long running thread
         backoff = 5.0
-        poll_thread = threading.Thread(
-            target=self._poll_loop,
-            name=f"hue-forwarder-poll-{self._bridge_config.id}",
-            daemon=True,
-        )
-        poll_thread.start()
         while not self._stop_event.is_set() and not self._global_stop.is_set():
             if not self._active():
                 if self._stop_event.wait(timeout=5.0) or self._global_stop.is_set():
@@ -298,13 +910,27 @@ class BridgeWorker(threading.Thread):
                     break
                 continue
 
+            if self._clients is not None:
+                # held while streaming so the pool does not close it as idle
+                self._client = self._clients.acquire(self._bridge_config)
+            tap = self._stream_tap
             try:
-                for payload in self._client.iter_events():
+                for data in self._client.iter_raw_events(
+                    on_connect=lambda: self._on_stream_connected(sender),
+                    on_disconnect=self._on_stream_closed,
+                    on_heartbeat=lambda: self._mark_stream("last_heartbeat"),
+                ):
                     if self._stop_event.is_set() or self._global_stop.is_set():
-                        poll_thread.join(timeout=5.0)
                         return
-                    self._handle_payload(payload, sender)
+                    self._mark_stream("last_event")
+                    if tap is not None:
+                        tap.stream_message(data)
+                    self._handle_raw_payload(data, sender)
             except HueBridgeError as exc:
+                with self._state_lock:
+                    self._health["backoff"] = backoff
+                if tap is not None:
+                    tap.stream_retry(backoff)
                 _log(
                     f"Event-Stream für Bridge '{self._bridge_config.id}' unterbrochen: {exc}"
                 )
@@ -313,19 +939,72 @@ class BridgeWorker(threading.Thread):
                 backoff = min(backoff * 2, 60.0)
             else:
                 backoff = 5.0
-        poll_thread.join(timeout=5.0)
+            finally:
+                if self._clients is not None:
+                    self._clients.release(self._bridge_config.id)
+
+    def _mark_stream(self, key: str) -> None:
+        with self._state_lock:
+            self._health[key] = time.time()
+
+    def _on_stream_connected(self, sender: LoxoneSender) -> None:
+        with self._state_lock:
+            self._health["connected"] = True
+            self._health["connects"] += 1
+            self._health["backoff"] = 0.0
+            self._health["last_connect"] = time.time()
+        self._reconcile(sender)
+        if self._stream_tap is not None:
+            self._stream_tap.stream_connected()
+
+    def _on_stream_closed(self) -> None:
+        # also runs after a clean close the client reconnects from internally
+        with self._state_lock:
+            self._health["connected"] = False
+            self._health["disconnects"] += 1
+        if self._stream_tap is not None:
+            self._stream_tap.stream_closed()
+
+    def _reconcile(self, sender: LoxoneSender) -> None:
+        """Forward state changes that happened while the stream was down."""
 
-    def _handle_payload(self, payload: Dict[str, object], sender: LoxoneSender) -> None:
-        data = payload.get("data")
-        if not isinstance(data, list):
+        with self._lock:
+            types = {rtype for (_, rtype) in self._lookup}
+        if "motion" in types:
+            self._poll_motion_states(sender)
+        if "button" in types:
+            self._poll_button_states(sender)
+        with self._state_lock:
+            self._health["reconciliations"] += 1
+
+    def _handle_raw_payload(self, data: bytes, sender: LoxoneSender) -> None:
+        received = time.time()
+        self._count("received")
+        with self._lock:
+            payload_filter = self._payload_filter
+        # most messages are light or connectivity updates of unmapped resources
+        if not payload_filter.matches(data):
+            self._payload_stats["skipped"] += 1
+            return
+        try:
+            payload = decode_json(data)
+        except ValueError:
             return
+        self._payload_stats["decoded"] += 1
+        self._handle_payload(payload, sender, received=received)
 
+    def _handle_payload(
+        self,
+        payload: Any,
+        sender: LoxoneSender,
+        *,
+        received: Optional[float] = None,
+    ) -> None:
         with self._lock:
             lookup = self._lookup
 
-        for entry in data:
-            if not isinstance(entry, dict):
-                continue
+        received = received or time.time()
+        for created, entry in iter_timed_event_entries(payload):
             rid = entry.get("id")
             rtype = entry.get("type")
             if not isinstance(rid, str) or not isinstance(rtype, str):
@@ -334,29 +1013,59 @@ class BridgeWorker(threading.Thread):
             mappings = lookup.get(key)
             if not mappings:
                 continue
+            if not self._accept_stream_entry(rid, rtype, entry):
+                continue
+            trace = {"received": received}
+            created_at = parse_creation_time(created)
+            if created_at is not None:
+                trace["created"] = created_at
+            self._count("matched", len(mappings))
             for mapping in mappings:
-                try:
-                    self._dispatch_event(entry, mapping, sender)
-                except RuntimeError as exc:
-                    _log(
-                        f"Weiterleitung für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}"
-                    )
+                self._delivery.submit(
+                    mapping.id,
+                    lambda entry=entry, mapping=mapping, trace=trace: self._deliver(
+                        entry, mapping, sender, trace
+                    ),
+                )
+
+    def _accept_stream_entry(self, resource_id: str, rtype: str, entry: Dict[str, Any]) -> bool:
+        if rtype == "motion":
+            state = extract_motion_state(entry)
+            if state is None:
+                return False
+            return self._sequencer.accept(resource_id, state, extract_report_time(entry))
+        if rtype == "button":
+            # every press is a transition, duplicates are recognised by time
+            return self._sequencer.accept(resource_id, None, extract_report_time(entry))
+        return True
+
+    def _deliver(
+        self,
+        entry: Dict[str, object],
+        mapping: VirtualInputConfig,
+        sender: LoxoneSender,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        trace = {**(trace or {}), "dispatched": time.time()}
+        try:
+            self._dispatch_event(entry, mapping, sender, trace)
+        except RuntimeError as exc:
+            _log(
+                f"Weiterleitung für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}"
+            )
 
     def _dispatch_event(
         self,
         entry: Dict[str, object],
         mapping: VirtualInputConfig,
         sender: LoxoneSender,
+        trace: Optional[Dict[str, float]] = None,
     ) -> None:
         rtype = mapping.resource_type
         if rtype == "button":
-            self._handle_button_event(entry, mapping, sender)
+            self._handle_button_event(entry, mapping, sender, trace)
         elif rtype == "motion":
-            self._handle_motion_event(entry, mapping, sender)
-
-    def _update_motion_state(self, resource_id: str, state: Optional[bool]) -> None:
-        with self._state_lock:
-            self._last_motion_states[resource_id] = state
+            self._handle_motion_event(entry, mapping, sender, trace)
 
     def _record_event(
         self,
@@ -368,6 +1077,7 @@ class BridgeWorker(threading.Thread):
         trigger: Optional[str] = None,
         delivered: bool = True,
         extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
     ) -> None:
         if not self._state_store:
             return
@@ -380,83 +1090,179 @@ class BridgeWorker(threading.Thread):
             trigger=trigger,
             delivered=delivered,
             extra=extra,
+            trace=trace,
         )
 
-    def _handle_button_event(
+    def _forward(
         self,
-        entry: Dict[str, object],
         mapping: VirtualInputConfig,
         sender: LoxoneSender,
+        value: str,
+        state: str,
+        *,
+        event_type: str,
+        trigger: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
     ) -> None:
-        button = entry.get("button")
-        if not isinstance(button, dict):
+        """Send ``value`` and record it unless the delivery filter holds it back.
+
+        Failed sends go to the outbox; without an outbox the
+        :class:`RuntimeError` of the sender is raised.
+        """
+
+        item = (state, event_type, trigger, extra, trace)
+        action, delay = self._filter.offer(mapping, value, item)
+        if action == DEFER:
+            self._timers.schedule(
+                (self.bridge_id, mapping.id, "filter"),
+                delay,
+                lambda: self._delivery.submit(mapping.id, lambda: self._send_held_back(mapping, sender)),
+            )
+        if action != SEND:
             return
-        report = button.get("button_report")
-        if not isinstance(report, dict):
+        self._send_value(
+            mapping, sender, value, state, event_type=event_type, trigger=trigger, extra=extra, trace=trace
+        )
+
+    def _send_held_back(self, mapping: VirtualInputConfig, sender: LoxoneSender) -> None:
+        pending = self._filter.take_pending(mapping)
+        if pending is None:
             return
-        event_name = report.get("event")
-        if not isinstance(event_name, str):
+        value, (state, event_type, trigger, extra, trace) = pending
+        # the time the value was held back counts as queueing
+        trace = {**(trace or {}), "dispatched": time.time()}
+        try:
+            self._send_value(
+                mapping,
+                sender,
+                value,
+                state,
+                event_type=event_type,
+                trigger=trigger,
+                extra=extra,
+                trace=trace,
+            )
+        except RuntimeError as exc:
+            _log(f"Weiterleitung für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}")
+
+    def _send_value(
+        self,
+        mapping: VirtualInputConfig,
+        sender: LoxoneSender,
+        value: str,
+        state: str,
+        *,
+        event_type: str,
+        trigger: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        if filter_enabled(mapping):
+            extra = {**(extra or {}), "filter": self._filter.counters(mapping.id)}
+        trace = {"dispatched": time.time(), **(trace or {})}
+        queued = dict(event_type=event_type, state=state, trigger=trigger, extra=extra, trace=trace)
+        outbox = self._outbox
+        if outbox is not None and outbox.pending_for(mapping.id):
+            # older values are still waiting for a retry: keep the order
+            outbox.put(mapping, value, **queued)
             return
-        if mapping.trigger and mapping.trigger != event_name:
+        try:
+            sender.send(mapping.virtual_input, value)
+        except RuntimeError as exc:
+            self._count("failed")
+            self._filter.send_failed(mapping, value)
+            if outbox is None:
+                raise
+            _log(
+                f"Weiterleitung an '{mapping.virtual_input}' fehlgeschlagen, "
+                f"wird später wiederholt: {exc}"
+            )
+            outbox.put(mapping, value, **queued)
             return
-        sender.send(mapping.virtual_input, mapping.active_value)
+        trace["responded"] = time.time()
+        self._count("forwarded")
         self._record_event(
+            mapping, state, value, event_type=event_type, trigger=trigger, extra=extra, trace=trace
+        )
+        self._latency.observe(mapping.id, trace)
+
+    def _handle_button_event(
+        self,
+        entry: Dict[str, object],
+        mapping: VirtualInputConfig,
+        sender: LoxoneSender,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        event_name = extract_button_event(entry)
+        if event_name is None:
+            return
+        if mapping.trigger and mapping.trigger != event_name:
+            return
+        self._forward(
             mapping,
-            "active",
+            sender,
             mapping.active_value,
+            "active",
             event_type="button",
             trigger=event_name,
+            trace=trace,
         )
         if mapping.reset_value is not None and mapping.reset_delay_ms > 0:
-            timer = threading.Timer(
+            # a new press postpones the pending reset instead of adding one
+            self._timers.schedule(
+                (self.bridge_id, mapping.id),
                 mapping.reset_delay_ms / 1000.0,
-                self._send_reset,
-                args=(mapping, sender),
+                lambda: self._delivery.submit(mapping.id, lambda: self._send_reset(mapping, sender)),
             )
-            timer.daemon = True
-            timer.start()
 
     def _handle_motion_event(
         self,
         entry: Dict[str, object],
         mapping: VirtualInputConfig,
         sender: LoxoneSender,
+        trace: Optional[Dict[str, float]] = None,
     ) -> None:
         state = extract_motion_state(entry)
         if state is True:
-            sender.send(mapping.virtual_input, mapping.active_value)
-            self._update_motion_state(mapping.resource_id, True)
-            self._record_event(
+            self._forward(
                 mapping,
-                "active",
+                sender,
                 mapping.active_value,
+                "active",
                 event_type="motion",
                 extra={"motion_state": True},
+                trace=trace,
             )
         elif state is False:
-            delivered = False
             value = mapping.inactive_value
             if value is not None:
-                sender.send(mapping.virtual_input, value)
-                delivered = True
-            self._update_motion_state(mapping.resource_id, False)
+                self._forward(
+                    mapping,
+                    sender,
+                    value,
+                    "inactive",
+                    event_type="motion",
+                    extra={"motion_state": False},
+                    trace=trace,
+                )
+                return
             self._record_event(
                 mapping,
                 "inactive",
                 value,
                 event_type="motion",
-                delivered=delivered,
+                delivered=False,
                 extra={"motion_state": False},
             )
 
     def _send_reset(self, mapping: VirtualInputConfig, sender: LoxoneSender) -> None:
         try:
-            value = mapping.reset_value or "0"
-            sender.send(mapping.virtual_input, value)
-            self._record_event(
+            self._forward(
                 mapping,
+                sender,
+                mapping.reset_value or "0",
                 "reset",
-                value,
                 event_type=mapping.resource_type,
                 trigger="reset",
             )
@@ -465,25 +1271,6 @@ class BridgeWorker(threading.Thread):
                 f"Reset-Weiterleitung für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}"
             )
 
-    def _poll_loop(self) -> None:
-        while not self._stop_event.is_set() and not self._global_stop.is_set():
-            if not self._active():
-                if self._stop_event.wait(timeout=5.0) or self._global_stop.is_set():
-                    break
-                continue
-
-            sender = self._sender_provider()
-            if not sender.available:
-                if self._stop_event.wait(timeout=5.0) or self._global_stop.is_set():
-                    break
-                continue
-
-            self._poll_motion_states(sender)
-
-            for _ in range(10):
-                if self._stop_event.wait(timeout=1.0) or self._global_stop.is_set():
-                    return
-
     def _poll_motion_states(self, sender: LoxoneSender) -> None:
         try:
             resources = list(self._client.get_motion_sensors())
@@ -492,6 +1279,7 @@ class BridgeWorker(threading.Thread):
                 f"Bewegungsmelder konnten nicht abgefragt werden (Bridge '{self._bridge_config.id}'): {exc}"
             )
             return
+        received = time.time()
 
         with self._lock:
             lookup = self._lookup
@@ -505,167 +1293,547 @@ class BridgeWorker(threading.Thread):
             state = extract_motion_state(resource.data)
             if state is None:
                 continue
+            # an unknown sensor without motion is just the baseline
+            if not self._sequencer.accept(
+                resource.id,
+                state,
+                extract_report_time(resource.data),
+                initial=state is True,
+            ):
+                continue
+
+            # like stream events, deliveries keep the per-mapping order and do
+            # not block the stream thread that runs this reconciliation
+            for mapping in mappings:
+                self._delivery.submit(
+                    mapping.id,
+                    lambda mapping=mapping, state=state: self._send_polled_motion(
+                        mapping, sender, state, received
+                    ),
+                )
+
+    def _send_polled_motion(
+        self,
+        mapping: VirtualInputConfig,
+        sender: LoxoneSender,
+        state: bool,
+        received: float,
+    ) -> None:
+        label = "active" if state else "inactive"
+        extra = {"motion_state": state}
+        value = mapping.active_value if state else mapping.inactive_value
+        if value is not None:
+            try:
+                self._forward(
+                    mapping,
+                    sender,
+                    value,
+                    label,
+                    event_type="motion",
+                    extra=extra,
+                    trace={"received": received},
+                )
+                return
+            except RuntimeError as exc:
+                _log(
+                    "Bewegungsmelder-Weiterleitung "
+                    f"für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}"
+                )
+        self._record_event(
+            mapping,
+            label,
+            value,
+            event_type="motion",
+            delivered=False,
+            extra=extra,
+        )
+
+    def _poll_button_states(self, sender: LoxoneSender) -> None:
+        try:
+            resources = list(self._client.get_buttons())
+        except HueBridgeError as exc:
+            _log(
+                f"Taster konnten nicht abgefragt werden (Bridge '{self._bridge_config.id}'): {exc}"
+            )
+            return
+        received = time.time()
 
-            with self._state_lock:
-                previous = self._last_motion_states.get(resource.id)
-                self._last_motion_states[resource.id] = state
+        with self._lock:
+            lookup = self._lookup
 
-            if previous is None and state is False:
+        for resource in resources:
+            mappings = lookup.get((resource.id, "button"))
+            if not mappings:
                 continue
-            if previous is not None and previous is state:
+            report = extract_button_report(resource.data)
+            reported = extract_report_time(resource.data)
+            if report is None or reported is None:
                 continue
-
+            # without an earlier report there is nothing to compare against
+            if not self._sequencer.accept(resource.id, None, reported, initial=False):
+                continue
+            entry = {"id": resource.id, "type": "button", "button": {"button_report": report}}
+            trace = {"received": received}
             for mapping in mappings:
-                if state is True:
-                    value = mapping.active_value
-                    delivered = False
-                    if value is not None:
-                        try:
-                            sender.send(mapping.virtual_input, value)
-                            delivered = True
-                        except RuntimeError as exc:
-                            _log(
-                                "Bewegungsmelder-Weiterleitung "
-                                f"für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}"
-                            )
-                    self._record_event(
-                        mapping,
-                        "active",
-                        value,
-                        event_type="motion",
-                        delivered=delivered,
-                        extra={"motion_state": True},
-                    )
-                else:
-                    delivered = False
-                    value = mapping.inactive_value
-                    if value is not None:
-                        try:
-                            sender.send(mapping.virtual_input, value)
-                            delivered = True
-                        except RuntimeError as exc:
-                            _log(
-                                "Bewegungsmelder-Weiterleitung "
-                                f"für Bridge '{self._bridge_config.id}' fehlgeschlagen: {exc}"
-                            )
-                    self._record_event(
-                        mapping,
-                        "inactive",
-                        value,
-                        event_type="motion",
-                        delivered=delivered,
-                        extra={"motion_state": False},
-                    )
+                self._delivery.submit(
+                    mapping.id,
+                    lambda entry=entry, mapping=mapping: self._deliver(entry, mapping, sender, trace),
+                )
 
 
 class HueEventForwarder:
-    """Coordinates bridge workers and keeps them in sync with the config."""
+    """Coordinates bridge workers and keeps them in sync with the config.
+
+    Inside the API server the forwarder shares the server's
+    :class:`HueClientPool` (``client_pool``), feeds its resource mirrors from
+    the event streams of the workers (``mirrors``, a
+    :class:`~hue_plugin.resource_mirror.ResourceMirrorRegistry`) and records
+    into a ``state_store`` provided by the server.
+    """
 
-    def __init__(self, reload_interval: float = 30.0) -> None:
+    def __init__(
+        self,
+        reload_interval: float = 30.0,
+        *,
+        delivery_workers: int = 4,
+        delivery_queue_size: int = 256,
+        backpressure: str = "drop_oldest",
+        loxone_pool_size: Optional[int] = None,
+        outbox: bool = True,
+        state_store: Any = None,
+        client_pool: Optional[HueClientPool] = None,
+        mirrors: Any = None,
+    ) -> None:
         self._reload_interval = reload_interval
         self._global_stop = threading.Event()
-        self._sender = LoxoneSender()
+        self._stop_lock = threading.Lock()
+        self._stopped = False
+        self._sender = LoxoneSender(
+            pool_maxsize=loxone_pool_size if loxone_pool_size else delivery_workers,
+        )
         self._sender_lock = threading.Lock()
         self._workers: Dict[str, BridgeWorker] = {}
-        self._state_store = EventStateStore(runtime_state_path())
+        self._state_store = state_store if state_store is not None else open_event_store(write_behind=True)
+        self._client_pool = client_pool
+        self._mirrors = mirrors
+        self._delivery_workers = delivery_workers
+        self._delivery_queue_size = delivery_queue_size
+        if backpressure not in BACKPRESSURE_POLICIES:
+            _log(f"Unbekannte Backpressure-Strategie '{backpressure}', verwende 'drop_oldest'.")
+            backpressure = "drop_oldest"
+        self._backpressure = backpressure
+        self._reported_drops: Dict[str, int] = {}
+        self._timers = TimerScheduler(name="hue-forwarder-timers")
+        self._assignments: BridgeAssignments = {}
+        self._watcher = ConfigWatcher(config_path())
+        self._outbox: Optional[DeliveryOutbox] = None
+        if outbox:
+            self._outbox = DeliveryOutbox(outbox_path(), self._get_sender, self._state_store.record)
+        self._metrics_server: Any = None
+        REGISTRY.register_collector(self.collect_metrics)
 
     def _get_sender(self) -> LoxoneSender:
         with self._sender_lock:
             return self._sender
 
+    def delivery_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue metrics of the delivery queue of each bridge worker."""
+
+        return {bridge_id: worker.delivery_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def payload_stats(self) -> Dict[str, Dict[str, int]]:
+        """Decoded/skipped event stream messages of each bridge worker."""
+
+        return {bridge_id: worker.payload_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def event_stats(self) -> Dict[str, Dict[str, int]]:
+        return {bridge_id: worker.event_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def latency_trackers(self) -> Dict[str, LatencyTracker]:
+        return {bridge_id: worker.latency for bridge_id, worker in list(self._workers.items())}
+
+    def collect_metrics(self) -> List[MetricFamily]:
+        return forwarder_metrics(self)
+
+    def stream_health(self) -> Dict[str, Dict[str, Any]]:
+        """Event stream state of each bridge worker."""
+
+        return {bridge_id: worker.stream_health() for bridge_id, worker in list(self._workers.items())}
+
+    def dedup_stats(self) -> Dict[str, Dict[str, int]]:
+        """Accepted and suppressed duplicate transitions of each bridge worker."""
+
+        return {bridge_id: worker.dedup_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def filter_stats(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Delivery filter counters per mapping of each bridge worker."""
+
+        return {bridge_id: worker.filter_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def latency_stats(self) -> Dict[str, Dict[str, Dict[str, Dict[str, float]]]]:
+        """p50/p95/p99 latencies (ms) per trace stage and mapping of each bridge worker."""
+
+        return {bridge_id: worker.latency_stats() for bridge_id, worker in list(self._workers.items())}
+
+    def event_store_stats(self) -> Dict[str, float]:
+        """Flush counters of the event store (empty without write-behind)."""
+
+        return self._state_store.flush_stats()
+
+    def timer_stats(self) -> Dict[str, int]:
+        """Counters of the shared reset timer scheduler (incl. pending timers)."""
+
+        return self._timers.stats()
+
+    def outbox_stats(self) -> Dict[str, int]:
+        """Queued, delivered, expired and pending values of the outbox."""
+
+        return self._outbox.stats() if self._outbox is not None else {}
+
+    def _report_delivery_stats(self) -> None:
+        for bridge_id, stats in self.delivery_stats().items():
+            dropped = int(stats.get("dropped", 0))
+            if dropped > self._reported_drops.get(bridge_id, 0):
+                _log(
+                    f"Bridge '{bridge_id}': {dropped} Weiterleitung(en) verworfen, "
+                    f"Warteschlange {stats['queue_depth']}/{stats['capacity']} "
+                    f"(max. {stats['max_queue_depth']})."
+                )
+            self._reported_drops[bridge_id] = dropped
+
     def stop(self) -> None:
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
         self._global_stop.set()
+        self._watcher.close()
+        REGISTRY.unregister_collector(self.collect_metrics)
+        stop_metrics_server(self._metrics_server)
+        self._metrics_server = None
         for worker in list(self._workers.values()):
             worker.stop()
             worker.join(timeout=5.0)
         self._workers.clear()
+        self._timers.stop()
+        if self._outbox is not None:
+            # last attempt for values still waiting, the rest stays on disk
+            self._outbox.close()
+        self._sender.close()
+        self._state_store.close()
+
+    def _stop_worker(self, bridge_id: str) -> None:
+        worker = self._workers.pop(bridge_id, None)
+        if worker is not None:
+            worker.stop()
+            worker.join(timeout=5.0)
+        if self._mirrors is not None:
+            # the mirror follows its own stream again on the next read
+            self._mirrors.discard(bridge_id)
 
     def _sync_workers(self, config: PluginConfig) -> None:
         with self._sender_lock:
             self._sender.update(config.loxone)
 
-        mappings_by_bridge: Dict[str, List[VirtualInputConfig]] = defaultdict(list)
-        for mapping in config.virtual_inputs:
-            mappings_by_bridge[mapping.bridge_id].append(mapping)
-
-        # Remove workers for bridges that no longer have mappings
-        for bridge_id, worker in list(self._workers.items()):
-            if bridge_id not in mappings_by_bridge:
-                worker.stop()
-                worker.join(timeout=5.0)
-                del self._workers[bridge_id]
-
-        for bridge in config.bridges:
-            mappings = mappings_by_bridge.get(bridge.id)
-            worker = self._workers.get(bridge.id)
-            if not mappings:
-                if worker:
-                    worker.stop()
-                    worker.join(timeout=5.0)
-                    del self._workers[bridge.id]
-                continue
-
-            if worker and not worker.matches(bridge):
-                worker.stop()
-                worker.join(timeout=5.0)
-                worker = None
-
-            if not worker:
-                worker = BridgeWorker(
-                    bridge,
-                    self._get_sender,
-                    self._global_stop,
-                    self._state_store,
-                )
-                worker.start()
-                self._workers[bridge.id] = worker
-
-            worker.update_bridge(bridge)
+        assignments = bridge_assignments(config)
+        changes = diff_bridge_assignments(self._assignments, assignments)
+        # bridges whose mappings and connection are unchanged keep running untouched
+        for bridge_id in changes.removed + changes.reconnect:
+            self._stop_worker(bridge_id)
+
+        for bridge_id in changes.added + changes.reconnect:
+            bridge, mappings = assignments[bridge_id]
+            worker = BridgeWorker(
+                bridge,
+                self._get_sender,
+                self._global_stop,
+                self._state_store,
+                DeliveryQueue(
+                    workers=self._delivery_workers,
+                    max_pending=self._delivery_queue_size,
+                    policy=self._backpressure,
+                    name=f"hue-delivery-{bridge.id}",
+                ),
+                self._timers,
+                self._outbox,
+                clients=self._client_pool,
+                stream_tap=self._mirrors.feed(bridge) if self._mirrors is not None else None,
+            )
             worker.update_mappings(mappings)
+            worker.start()
+            self._workers[bridge_id] = worker
+
+        for bridge_id in changes.updated:
+            bridge, mappings = assignments[bridge_id]
+            worker = self._workers[bridge_id]
+            if self._assignments[bridge_id][0] != bridge:
+                worker.update_bridge(bridge)
+            if self._assignments[bridge_id][1] != mappings:
+                worker.update_mappings(mappings)
+
+        self._assignments = assignments
+        if changes:
+            _log(
+                "Konfiguration übernommen: "
+                f"{len(changes.added)} neu, {len(changes.removed)} entfernt, "
+                f"{len(changes.reconnect)} neu verbunden, {len(changes.updated)} aktualisiert."
+            )
 
     def run_forever(self) -> None:  # pragma: no cover - integration path
         _log("Starte Hue-Event-Forwarder")
+        self._metrics_server = start_metrics_server()
+        generation: Optional[int] = None
         try:
             while not self._global_stop.is_set():
                 try:
-                    config = load_config()
+                    snapshot = load_config_snapshot()
                 except ConfigError as exc:
                     _log(f"Konfiguration konnte nicht geladen werden: {exc}")
                 else:
-                    self._sync_workers(config)
-                if self._global_stop.wait(timeout=self._reload_interval):
+                    if snapshot.generation != generation:
+                        self._sync_workers(snapshot.config)
+                        if generation is None and self._outbox is not None:
+                            # values left over from the last run, now that the sender is configured
+                            self._outbox.start()
+                        generation = snapshot.generation
+                self._report_delivery_stats()
+                if self._global_stop.is_set() or _yield_to_embedded_forwarder():
                     break
+                # returns right after a save; the interval only bounds the stats report
+                self._watcher.wait(self._reload_interval)
         finally:
             self.stop()
 
 
-def load_event_state(path: str | Path | None = None) -> Dict[str, Any]:
-    """Load the persisted event state file."""
+def forwarder_metrics(forwarder: Any) -> List[MetricFamily]:
+    """Metric families built from the stats methods of a (thread or asyncio) forwarder."""
+
+    connected = Gauge(
+        "hue_event_stream_connected", "Event-Stream der Bridge verbunden (1) oder nicht (0).", ("bridge",)
+    )
+    connects = Counter(
+        "hue_event_stream_connects_total", "Verbindungsaufbauten des Event-Streams.", ("bridge",)
+    )
+    disconnects = Counter("hue_event_stream_disconnects_total", "Abbrüche des Event-Streams.", ("bridge",))
+    backoff = Gauge(
+        "hue_event_stream_backoff_seconds",
+        "Wartezeit bis zum nächsten Verbindungsversuch, 0 bei bestehender Verbindung.",
+        ("bridge",),
+    )
+    for bridge_id, health in forwarder.stream_health().items():
+        connected.set(1 if health.get("connected") else 0, bridge=bridge_id)
+        connects.inc(health.get("connects", 0), bridge=bridge_id)
+        disconnects.inc(health.get("disconnects", 0), bridge=bridge_id)
+        backoff.set(health.get("backoff", 0.0), bridge=bridge_id)
+
+    events = Counter(
+        "hue_forwarder_events_total",
+        "Empfangene Stream-Nachrichten, zugeordnete Einträge, weitergeleitete und fehlgeschlagene Werte.",
+        ("bridge", "outcome"),
+    )
+    for bridge_id, counts in forwarder.event_stats().items():
+        for outcome in EVENT_OUTCOMES:
+            events.inc(counts.get(outcome, 0), bridge=bridge_id, outcome=outcome)
+
+    queue_depth = Gauge("hue_forwarder_queue_depth", "Wartende Weiterleitungen je Bridge.", ("bridge",))
+    dropped = Counter(
+        "hue_forwarder_queue_dropped_total",
+        "Wegen voller Warteschlange verworfene Weiterleitungen.",
+        ("bridge",),
+    )
+    for bridge_id, stats in forwarder.delivery_stats().items():
+        queue_depth.set(stats.get("queue_depth", 0), bridge=bridge_id)
+        dropped.inc(stats.get("dropped", 0), bridge=bridge_id)
+
+    families: List[MetricFamily] = [connected, connects, disconnects, backoff, events, queue_depth, dropped]
+    outbox = forwarder.outbox_stats()
+    if outbox:
+        pending = Gauge("hue_outbox_pending", "Werte in der Outbox, die auf eine Wiederholung warten.")
+        pending.set(outbox.get("pending", 0))
+        outcomes = Counter("hue_outbox_events_total", "Outbox-Werte nach Ergebnis.", ("outcome",))
+        for outcome in ("queued", "delivered", "expired", "retries"):
+            outcomes.inc(outbox.get(outcome, 0), outcome=outcome)
+        families += [pending, outcomes]
+
+    buckets = [bound / 1000.0 for bound in BUCKET_BOUNDS_MS]
+    stages = Histogram(
+        "hue_forwarder_latency_seconds",
+        "Dauer der Abschnitte vom Hue-Ereignis bis zur Antwort des Miniservers.",
+        ("bridge", "stage"),
+        buckets=buckets,
+    )
+    mappings = Histogram(
+        "hue_forwarder_mapping_latency_seconds",
+        "Ende-zu-Ende-Latenz je Zuordnung.",
+        ("bridge", "mapping"),
+        buckets=buckets,
+    )
+    for bridge_id, tracker in forwarder.latency_trackers().items():
+        stage_histograms, mapping_histograms = tracker.histograms()
+        for stage, histogram in stage_histograms.items():
+            stages.load(histogram.counts, histogram.total_ms / 1000.0, bridge=bridge_id, stage=stage)
+        for mapping_id, histogram in mapping_histograms.items():
+            mappings.load(histogram.counts, histogram.total_ms / 1000.0, bridge=bridge_id, mapping=mapping_id)
+    return families + [stages, mappings]
+
+
+def start_metrics_server() -> Any:
+    """Serve the metrics of this process if ``HUE_PLUGIN_METRICS_PORT`` is set."""
+
+    port = int(env_number("HUE_PLUGIN_METRICS_PORT", 0))
+    if port <= 0:
+        return None
+    host = os.getenv("HUE_PLUGIN_METRICS_HOST", "0.0.0.0").strip() or "0.0.0.0"
+    try:
+        server = serve_metrics(port, host)
+    except OSError as exc:
+        _log(f"Metriken können nicht auf {host}:{port} bereitgestellt werden: {exc}")
+        return None
+    _log(f"Metriken unter http://{host}:{port}/metrics")
+    return server
+
+
+def stop_metrics_server(server: Any) -> None:
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+ENV_EVENT_STORE = "HUE_PLUGIN_EVENT_STORE"
+EVENT_STORE_BACKENDS = ("json", "sqlite")
+
+
+def event_store_backend(state_path: str | Path | None = None) -> str:
+    """Return the configured event store backend (``json`` or ``sqlite``).
+
+    ``HUE_PLUGIN_EVENT_STORE`` selects the backend explicitly; without it an
+    existing SQLite database next to the state file is used.
+    """
+
+    configured = os.getenv(ENV_EVENT_STORE, "").strip().lower()
+    if configured in EVENT_STORE_BACKENDS:
+        return configured
+    from .event_database import event_database_path
+
+    resolved = Path(state_path) if state_path is not None else runtime_state_path()
+    return "sqlite" if event_database_path(resolved).exists() else "json"
+
+
+def open_event_store(
+    path: str | Path | None = None,
+    *,
+    backend: Optional[str] = None,
+    write_behind: bool = False,
+) -> Any:
+    """Open the event store for ``path`` with the configured backend.
+
+    ``write_behind`` enables group commit as configured by
+    ``HUE_PLUGIN_EVENT_FLUSH_MS`` and ``HUE_PLUGIN_EVENT_FLUSH_BATCH``.
+    """
 
     resolved = Path(path) if path is not None else runtime_state_path()
-    try:
-        raw = resolved.read_text(encoding="utf-8")
-    except FileNotFoundError:
-        return {"events": [], "states": {}}
-    except OSError:  # pragma: no cover - unexpected I/O errors
-        return {"events": [], "states": {}}
+    flush_options: Dict[str, Any] = {}
+    if write_behind:
+        flush_options = {
+            "flush_interval_ms": env_number("HUE_PLUGIN_EVENT_FLUSH_MS", 250),
+            "flush_batch": int(env_number("HUE_PLUGIN_EVENT_FLUSH_BATCH", 50)),
+        }
+    if (backend or event_store_backend(resolved)) == "sqlite":
+        from .event_database import SQLiteEventStore, event_database_path
+
+        return SQLiteEventStore(
+            event_database_path(resolved),
+            max_events=int(env_number("HUE_PLUGIN_EVENT_RETENTION", 100_000)),
+            **flush_options,
+        )
+    return EventStateStore(resolved, **flush_options)
+
+
+def load_event_state(path: str | Path | None = None, *, max_events: int = 200) -> Dict[str, Any]:
+    """Load the persisted event state.
+
+    Both backends return at most the newest ``max_events`` events; for the
+    JSON backend they come from the snapshot plus journal tail.
+    """
+
+    resolved = Path(path) if path is not None else runtime_state_path()
+    if event_store_backend(resolved) == "sqlite":
+        store = open_event_store(resolved, backend="sqlite")
+        try:
+            events = store.query_events(limit=max_events)["events"]
+            return {"events": list(reversed(events)), "states": store.states()}
+        finally:
+            store.close()
+    data = _read_snapshot(resolved)
+    _replay_journal(data, event_journal_path(resolved))
+    events = data["events"]
+    if len(events) > max_events:
+        events = events[-max_events:]
+    return {"events": events, "states": data["states"]}
+
+
+FORWARDER_MODES = ("thread", "async")
+
+
+def embedded_forwarder_pid(path: str | Path | None = None) -> Optional[int]:
+    """Pid of another process (the API server) that runs the event forwarder, if any."""
 
     try:
-        data = json.loads(raw)
-    except ValueError:
-        return {"events": [], "states": {}}
+        pid = int(embedded_forwarder_marker_path(path).read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        return None
+    if pid <= 0 or pid == os.getpid():
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:  # running under another user
+        return pid
+    return pid
 
-    events = data.get("events")
-    states = data.get("states")
-    if not isinstance(events, list):
-        events = []
-    if not isinstance(states, dict):
-        states = {}
-    return {"events": events, "states": states}
+
+def _yield_to_embedded_forwarder() -> bool:
+    # a second forwarder would open a second event stream per bridge and
+    # deliver every value twice
+    pid = embedded_forwarder_pid()
+    if pid is None:
+        return False
+    _log(f"Der Event-Forwarder läuft bereits im API-Server (PID {pid}), beende diesen Prozess.")
+    return True
+
+
+def forwarder_options() -> Dict[str, Any]:
+    """Keyword arguments for the forwarder from the ``HUE_PLUGIN_*`` variables."""
+
+    return {
+        "delivery_workers": int(env_number("HUE_PLUGIN_DELIVERY_WORKERS", 4)),
+        "delivery_queue_size": int(env_number("HUE_PLUGIN_DELIVERY_QUEUE_SIZE", 256)),
+        "backpressure": os.getenv("HUE_PLUGIN_DELIVERY_BACKPRESSURE", "drop_oldest").strip() or "drop_oldest",
+        "loxone_pool_size": int(env_number("HUE_PLUGIN_LOXONE_POOL_SIZE", 0)) or None,
+        "outbox": bool(env_number("HUE_PLUGIN_OUTBOX", 1)),
+    }
 
 
 def main() -> int:  # pragma: no cover - CLI wrapper
-    forwarder = HueEventForwarder()
+    if _yield_to_embedded_forwarder():
+        return 0
+    options = forwarder_options()
+    mode = os.getenv("HUE_PLUGIN_FORWARDER_MODE", "thread").strip().lower() or "thread"
+    if mode not in FORWARDER_MODES:
+        _log(f"Unbekannter Forwarder-Modus '{mode}', verwende 'thread'.")
+        mode = "thread"
+    forwarder: Any
+    if mode == "async":
+        from .async_forwarder import AsyncHueEventForwarder, async_available
+
+        if async_available():
+            forwarder = AsyncHueEventForwarder(**options)
+        else:
+            _log("asyncio-Modus benötigt das Paket 'httpx', verwende 'thread'.")
+            forwarder = HueEventForwarder(**options)
+    else:
+        forwarder = HueEventForwarder(**options)
     try:
         forwarder.run_forever()
     except KeyboardInterrupt:
@@ -2,17 +2,114 @@
 from __future__ import annotations
 
 import json
+import re
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 from requests import Response
 from requests import exceptions as requests_exc
+from requests.adapters import HTTPAdapter
 
 from .config import HueBridgeConfig
+from .metrics import REGISTRY
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle only needed for typing
+    from .topology import ResourceTopology
+
+try:  # pragma: no cover - optional, faster JSON decoder
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - fall back to the standard library
+    _orjson = None
 
 _JSON = Dict[str, Any]
 
+BRIDGE_REQUESTS = REGISTRY.counter(
+    "hue_bridge_requests_total",
+    "Anfragen an die Hue Bridge nach Ressourcentyp und Status.",
+    ("bridge", "method", "resource", "status"),
+)
+BRIDGE_REQUEST_SECONDS = REGISTRY.histogram(
+    "hue_bridge_request_duration_seconds",
+    "Antwortzeit der Hue Bridge in Sekunden.",
+    ("bridge", "method", "resource"),
+)
+
+
+def decode_json(data: bytes) -> Any:
+    """Decode a JSON document from bytes, using ``orjson`` when installed."""
+
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+class SSEParser:
+    """Incremental Server-Sent-Events parser working on raw bytes.
+
+    :meth:`feed` accepts arbitrary network chunks and returns the ``data``
+    of every message completed by the chunk. Lines are only split, never
+    decoded or stripped; multi-line ``data:`` fields are joined with
+    ``\n`` and the ``id:`` field of the latest message is kept in
+    :attr:`last_event_id`. Comment lines (the bridge's ``: hi`` heartbeat)
+    are counted in :attr:`comments`.
+    """
+
+    def __init__(self) -> None:
+        self._tail = b""
+        self._data: List[bytes] = []
+        self.last_event_id: Optional[str] = None
+        self.comments = 0
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        if self._tail:
+            chunk = self._tail + chunk
+        lines = chunk.split(b"\n")
+        # the last element is an incomplete line (or empty after a newline)
+        self._tail = lines.pop()
+        messages: List[bytes] = []
+        data = self._data
+        for line in lines:
+            if line[-1:] == b"\r":
+                line = line[:-1]
+            if not line:
+                if data:
+                    messages.append(data[0] if len(data) == 1 else b"\n".join(data))
+                    data = self._data = []
+                continue
+            if line[:5] == b"data:":
+                data.append(line[6:] if line[5:6] == b" " else line[5:])
+                continue
+            if line[:1] == b":":  # comment / keep-alive
+                self.comments += 1
+                continue
+            field, _, value = line.partition(b":")
+            if field == b"id":
+                self.last_event_id = (value[1:] if value[:1] == b" " else value).decode("utf-8", "replace")
+        return messages
+
+
+class ResourceIdFilter:
+    """Pre-filter for raw event payloads by resource id.
+
+    Checks the undecoded bytes of a message for any of the given ids with
+    one precompiled pattern, so messages about unmapped resources can be
+    dropped without decoding them. A match only means that an id occurs
+    somewhere in the message; the decoded entries still have to be
+    checked.
+    """
+
+    def __init__(self, resource_ids: Iterable[str] = ()) -> None:
+        ids = sorted({rid for rid in resource_ids if rid}, key=len, reverse=True)
+        self._pattern = (
+            re.compile(b"|".join(re.escape(rid.encode("utf-8")) for rid in ids)) if ids else None
+        )
+
+    def matches(self, data: bytes) -> bool:
+        return self._pattern is not None and self._pattern.search(data) is not None
+
 
 @dataclass
 class HueResource:
@@ -36,9 +133,12 @@ class HueResource:
 class HueBridgeClient:
     """Wrapper around the Hue REST API v2."""
 
-    def __init__(self, config: HueBridgeConfig) -> None:
+    def __init__(self, config: HueBridgeConfig, *, pool_maxsize: int = 10) -> None:
         self._config = config
         self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_maxsize))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
         self._session.headers.update({"hue-application-key": config.application_key})
         if config.client_key:
             self._session.headers.update({"hue-client-key": config.client_key})
@@ -50,6 +150,15 @@ class HueBridgeClient:
             except Exception:
                 pass
 
+    @property
+    def config(self) -> HueBridgeConfig:
+        return self._config
+
+    def close(self) -> None:
+        """Close all pooled connections of the underlying session."""
+
+        self._session.close()
+
     # -- high level resource helpers -------------------------------------------------
     def get_lights(self) -> Iterable[HueResource]:
         return self._list_resources("light")
@@ -85,6 +194,20 @@ class HueBridgeClient:
 
         return self._list_resources("device")
 
+    def get_all_resources(self) -> Iterable[HueResource]:
+        """Return every resource of the bridge with a single request."""
+
+        return self._list_resources("")
+
+    def get_resource(self, rtype: str, rid: str) -> Optional[HueResource]:
+        """Return a single resource or ``None`` if the bridge has no data for it."""
+
+        payload = self._get(f"{rtype}/{rid}")
+        data = payload.get("data", [])
+        if not isinstance(data, list) or not data:
+            return None
+        return HueResource.from_api(data[0])
+
     def get_scene(self, scene_id: str) -> HueResource:
         """Return a single scene resource."""
 
@@ -103,14 +226,12 @@ class HueBridgeClient:
         target_rtype: Optional[str] = None,
         dynamics_duration: Optional[int] = None,
     ) -> None:
-        body: _JSON = {"recall": {"action": "active"}}
-        if target_rid and target_rtype:
-            body["recall"]["target"] = {"rid": target_rid, "rtype": target_rtype}
-        if dynamics_duration is not None:
-            duration = max(0, min(int(dynamics_duration), 600000))
-            if duration > 0:
-                body["recall"]["dynamics"] = {"duration": duration}
-        self._put(f"scene/{scene_id}", json=body)
+        body = scene_recall_body(
+            target_rid=target_rid,
+            target_rtype=target_rtype,
+            dynamics_duration=dynamics_duration,
+        )
+        self.update_resource("scene", scene_id, body)
 
     def deactivate_scene(
         self,
@@ -118,13 +239,40 @@ class HueBridgeClient:
         *,
         target_rid: Optional[str] = None,
         target_rtype: Optional[str] = None,
+        topology: Optional["ResourceTopology"] = None,
     ) -> None:
+        """Switch off the grouped_light of the scene's room/zone.
+
+        With a ``topology`` the scene group and grouped_light are resolved
+        from the index instead of two extra bridge requests.
+        """
+
+        grouped_light_id = self.scene_grouped_light_id(
+            scene_id,
+            target_rid=target_rid,
+            target_rtype=target_rtype,
+            topology=topology,
+        )
+        self.set_grouped_light_state(grouped_light_id, on=False)
+
+    def scene_grouped_light_id(
+        self,
+        scene_id: str,
+        *,
+        target_rid: Optional[str] = None,
+        target_rtype: Optional[str] = None,
+        topology: Optional["ResourceTopology"] = None,
+    ) -> str:
+        """Resolve the grouped_light that :meth:`deactivate_scene` switches off."""
+
         group_rid = target_rid
         group_rtype = target_rtype
 
         if not group_rid:
-            scene = self.get_scene(scene_id)
-            group = scene.data.get("group")
+            if topology is not None:
+                group = topology.scene_group(scene_id)
+            else:
+                group = self.get_scene(scene_id).data.get("group")
             if isinstance(group, dict):
                 group_rid = group.get("rid")
                 group_rtype = group.get("rtype")
@@ -134,13 +282,15 @@ class HueBridgeClient:
                 "Die Szene enthält keine Gruppeninformation. Bitte ein Ziel angeben."
             )
 
-        grouped_light_id = self._resolve_grouped_light_id(group_rid, group_rtype)
+        if topology is not None:
+            grouped_light_id = topology.grouped_light_for(group_rid, group_rtype)
+        else:
+            grouped_light_id = self._resolve_grouped_light_id(group_rid, group_rtype)
         if not grouped_light_id:
             raise HueBridgeError(
                 "Für das Ziel wurde kein grouped_light gefunden. Prüfe die Hue-Konfiguration."
             )
-
-        self.set_grouped_light_state(grouped_light_id, on=False)
+        return grouped_light_id
 
     def set_light_state(
         self,
@@ -152,32 +302,19 @@ class HueBridgeClient:
         temperature_mirek: Optional[int] = None,
         transition_ms: Optional[int] = None,
     ) -> None:
-        body: _JSON = {}
-        if on is not None:
-            body.setdefault("on", {})["on"] = on
-        if brightness is not None:
-            if not 0 <= brightness <= 100:
-                raise ValueError("Brightness must be between 0 and 100")
-            body.setdefault("dimming", {})["brightness"] = brightness
-        if color_xy is not None:
-            x, y = color_xy
-            if not 0 <= x <= 1 or not 0 <= y <= 1:
-                raise ValueError("xy-Farbwerte müssen zwischen 0 und 1 liegen")
-            body.setdefault("color", {}).setdefault("xy", {})
-            body["color"]["xy"]["x"] = round(x, 4)
-            body["color"]["xy"]["y"] = round(y, 4)
-        if temperature_mirek is not None:
-            mirek = int(temperature_mirek)
-            if not 153 <= mirek <= 500:
-                raise ValueError("Mirek muss zwischen 153 und 500 liegen")
-            body.setdefault("color_temperature", {})["mirek"] = mirek
-        if transition_ms is not None:
-            body.setdefault("dynamics", {})["duration"] = max(0, int(transition_ms))
-
-        if not body:
-            raise ValueError("At least one state value must be provided")
-
-        self._put(f"light/{light_id}", json=body)
+        body = light_state_body(
+            on=on,
+            brightness=brightness,
+            color_xy=color_xy,
+            temperature_mirek=temperature_mirek,
+            transition_ms=transition_ms,
+        )
+        self.update_resource("light", light_id, body)
+
+    def update_resource(self, rtype: str, rid: str, body: _JSON) -> None:
+        """Send a prepared state body to a single resource."""
+
+        self._put(f"{rtype}/{rid}", json=body)
 
     def set_grouped_light_state(
         self,
@@ -185,14 +322,7 @@ class HueBridgeClient:
         *,
         on: Optional[bool] = None,
     ) -> None:
-        body: _JSON = {}
-        if on is not None:
-            body.setdefault("on", {})["on"] = on
-
-        if not body:
-            raise ValueError("At least one state value must be provided")
-
-        self._put(f"grouped_light/{grouped_light_id}", json=body)
+        self.update_resource("grouped_light", grouped_light_id, grouped_light_state_body(on=on))
 
     # -- low level helpers -----------------------------------------------------------
     def _list_resources(self, resource: str) -> Iterable[HueResource]:
@@ -226,16 +356,22 @@ class HueBridgeClient:
         return self._handle_response(response)
 
     def _request(self, method: str, path: str, *, json: Optional[_JSON] = None) -> Response:
-        url = f"{self._config.base_url}/{path}"
+        url = f"{self._config.base_url}/{path}" if path else self._config.base_url
+        labels = {"bridge": self._config.id, "method": method, "resource": path.split("/", 1)[0] or "all"}
+        started = time.perf_counter()
+        status = "error"
         try:
-            return self._session.request(
+            response = self._session.request(
                 method,
                 url,
                 json=json,
                 verify=self._config.verify_tls,
                 timeout=10,
             )
+            status = str(response.status_code)
+            return response
         except requests_exc.SSLError as exc:
+            status = "tls_error"
             if self._config.verify_tls:
                 hint = (
                     "TLS-Handshake mit der Hue Bridge ist fehlgeschlagen: "
@@ -248,10 +384,35 @@ class HueBridgeClient:
             raise HueBridgeError(hint) from exc
         except requests_exc.RequestException as exc:  # pragma: no cover - defensive
             raise HueBridgeError(f"Verbindung zur Hue Bridge fehlgeschlagen: {exc}") from exc
+        finally:
+            BRIDGE_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+            BRIDGE_REQUESTS.inc(status=status, **labels)
 
     def iter_events(self) -> Iterator[_JSON]:
         """Yield raw event payloads from the Hue event stream."""
 
+        for data in self.iter_raw_events():
+            try:
+                payload = decode_json(data)
+            except ValueError:
+                continue
+            yield payload
+
+    def iter_raw_events(
+        self,
+        *,
+        on_connect: Optional[Callable[[], None]] = None,
+        on_disconnect: Optional[Callable[[], None]] = None,
+        on_heartbeat: Optional[Callable[[], None]] = None,
+    ) -> Iterator[bytes]:
+        """Yield the undecoded ``data`` of every event stream message.
+
+        ``on_connect`` runs after every (re)connection before the first
+        message is read, ``on_disconnect`` whenever such a connection ended
+        (closed by the bridge, failed or abandoned by the caller) and
+        ``on_heartbeat`` whenever a chunk contained a heartbeat comment.
+        """
+
         protocol = "https" if self._config.use_https else "http"
         url = f"{protocol}://{self._config.bridge_ip}/eventstream/clip/v2"
         headers = {"Accept": "text/event-stream"}
@@ -266,29 +427,21 @@ class HueBridgeClient:
                     timeout=60,
                 ) as response:
                     response.raise_for_status()
-                    data_lines: List[str] = []
-                    for raw_line in response.iter_lines(decode_unicode=True):
-                        if raw_line is None:
-                            continue
-                        line = raw_line.strip()
-                        if line == "":
-                            if not data_lines:
-                                continue
-                            payload_str = "\n".join(data_lines)
-                            data_lines = []
-                            if not payload_str:
-                                continue
-                            try:
-                                payload = json.loads(payload_str)
-                            except ValueError:
-                                continue
-                            yield payload
-                            continue
-                        if line.startswith(":"):
-                            continue
-                        if line.startswith("data:"):
-                            data_lines.append(line[5:].strip())
-                    # Connection closed, loop again to reconnect
+                    if on_connect is not None:
+                        on_connect()
+                    try:
+                        parser = SSEParser()
+                        # chunked streams deliver every network chunk as it arrives
+                        chunk_size = None if getattr(response.raw, "chunked", False) else 512
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            comments = parser.comments
+                            yield from parser.feed(chunk)
+                            if on_heartbeat is not None and parser.comments != comments:
+                                on_heartbeat()
+                        # Connection closed, loop again to reconnect
+                    finally:
+                        if on_disconnect is not None:
+                            on_disconnect()
             except requests_exc.RequestException as exc:
                 raise HueBridgeError(
                     f"Event-Stream konnte nicht aufgebaut werden: {exc}"
@@ -306,6 +459,251 @@ class HueBridgeClient:
         return data
 
 
+def merge_resource_data(base: _JSON, update: _JSON) -> _JSON:
+    """Return a new dict with ``update`` merged recursively into ``base``.
+
+    ``base`` is never modified, so holders of the previous version keep a
+    consistent view.
+    """
+
+    merged = dict(base)
+    for key, value in update.items():
+        current = merged.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            merged[key] = merge_resource_data(current, value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def scene_recall_body(
+    *,
+    target_rid: Optional[str] = None,
+    target_rtype: Optional[str] = None,
+    dynamics_duration: Optional[int] = None,
+) -> _JSON:
+    """Build the body that recalls (activates) a scene."""
+
+    body: _JSON = {"recall": {"action": "active"}}
+    if target_rid and target_rtype:
+        body["recall"]["target"] = {"rid": target_rid, "rtype": target_rtype}
+    if dynamics_duration is not None:
+        duration = max(0, min(int(dynamics_duration), 600000))
+        if duration > 0:
+            body["recall"]["dynamics"] = {"duration": duration}
+    return body
+
+
+def grouped_light_state_body(*, on: Optional[bool] = None) -> _JSON:
+    """Build and validate the body of a grouped_light state update."""
+
+    body: _JSON = {}
+    if on is not None:
+        body.setdefault("on", {})["on"] = on
+
+    if not body:
+        raise ValueError("At least one state value must be provided")
+    return body
+
+
+def light_state_body(
+    *,
+    on: Optional[bool] = None,
+    brightness: Optional[int] = None,
+    color_xy: Optional[Tuple[float, float]] = None,
+    temperature_mirek: Optional[int] = None,
+    transition_ms: Optional[int] = None,
+) -> _JSON:
+    """Build and validate the body of a light state update."""
+
+    body: _JSON = {}
+    if on is not None:
+        body.setdefault("on", {})["on"] = on
+    if brightness is not None:
+        if not 0 <= brightness <= 100:
+            raise ValueError("Brightness must be between 0 and 100")
+        body.setdefault("dimming", {})["brightness"] = brightness
+    if color_xy is not None:
+        x, y = color_xy
+        if not 0 <= x <= 1 or not 0 <= y <= 1:
+            raise ValueError("xy-Farbwerte müssen zwischen 0 und 1 liegen")
+        body.setdefault("color", {}).setdefault("xy", {})
+        body["color"]["xy"]["x"] = round(x, 4)
+        body["color"]["xy"]["y"] = round(y, 4)
+    if temperature_mirek is not None:
+        mirek = int(temperature_mirek)
+        if not 153 <= mirek <= 500:
+            raise ValueError("Mirek muss zwischen 153 und 500 liegen")
+        body.setdefault("color_temperature", {})["mirek"] = mirek
+    if transition_ms is not None:
+        body.setdefault("dynamics", {})["duration"] = max(0, int(transition_ms))
+
+    if not body:
+        raise ValueError("At least one state value must be provided")
+    return body
+
+
+def iter_event_entries(payload: Any) -> Iterator[Tuple[str, _JSON]]:
+    """Yield ``(event_type, resource)`` pairs of an event stream message.
+
+    The bridge sends a JSON array of event containers per message; a single
+    container object is accepted as well.
+    """
+
+    for event_type, _, entry in _iter_containers(payload):
+        yield (event_type, entry)
+
+
+def iter_timed_event_entries(payload: Any) -> Iterator[Tuple[Optional[str], _JSON]]:
+    """Like :func:`iter_event_entries`, but yield the ``creationtime`` of the
+    container instead of the event type."""
+
+    for _, created, entry in _iter_containers(payload):
+        yield (created, entry)
+
+
+def _iter_containers(payload: Any) -> Iterator[Tuple[str, Optional[str], _JSON]]:
+    containers = payload if isinstance(payload, list) else [payload]
+    for container in containers:
+        if not isinstance(container, dict):
+            continue
+        event_type = container.get("type")
+        created = container.get("creationtime")
+        data = container.get("data")
+        if not isinstance(data, list):
+            continue
+        for entry in data:
+            if isinstance(entry, dict):
+                yield (
+                    event_type if isinstance(event_type, str) else "update",
+                    created if isinstance(created, str) else None,
+                    entry,
+                )
+
+
+def bridge_fingerprint(config: HueBridgeConfig) -> Tuple[Any, ...]:
+    """Return the connection-relevant settings of a bridge configuration."""
+
+    return (
+        config.bridge_ip,
+        config.application_key,
+        config.client_key,
+        config.use_https,
+        config.verify_tls,
+    )
+
+
+class HueClientPool:
+    """Process-wide registry of :class:`HueBridgeClient` instances.
+
+    Clients are keyed by bridge id and reused as long as the connection
+    settings of the bridge stay the same, so requests share the keep-alive
+    connections of one session. Clients that were not used for
+    ``idle_timeout`` seconds are closed and rebuilt on the next access,
+    unless they are held with :meth:`acquire` (e.g. for an event stream).
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_maxsize: int = 10,
+        idle_timeout: Optional[float] = 300.0,
+        factory: Optional[Callable[..., HueBridgeClient]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._pool_maxsize = max(1, int(pool_maxsize))
+        self._idle_timeout = idle_timeout if idle_timeout and idle_timeout > 0 else None
+        self._factory = factory
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple[Any, ...], HueBridgeClient, float]] = {}
+        self._held: Dict[str, int] = {}
+
+    def get(self, config: HueBridgeConfig) -> HueBridgeClient:
+        """Return a warm client for ``config``, creating one if necessary."""
+
+        fingerprint = bridge_fingerprint(config)
+        now = self._clock()
+        stale: List[HueBridgeClient] = []
+        with self._lock:
+            self._collect_idle_locked(now, stale)
+            entry = self._entries.get(config.id)
+            if entry is not None and entry[0] == fingerprint:
+                client = entry[1]
+            else:
+                if entry is not None:
+                    stale.append(entry[1])
+                client = self._create(config)
+            self._entries[config.id] = (fingerprint, client, now)
+        for old in stale:
+            _close_quietly(old)
+        return client
+
+    def acquire(self, config: HueBridgeConfig) -> HueBridgeClient:
+        """Like :meth:`get`, but keep the client open until :meth:`release`."""
+
+        client = self.get(config)
+        with self._lock:
+            self._held[config.id] = self._held.get(config.id, 0) + 1
+        return client
+
+    def release(self, bridge_id: str) -> None:
+        with self._lock:
+            count = self._held.get(bridge_id, 0) - 1
+            if count > 0:
+                self._held[bridge_id] = count
+            else:
+                self._held.pop(bridge_id, None)
+            entry = self._entries.get(bridge_id)
+            if entry is not None:
+                # idle time starts when the last holder is done
+                self._entries[bridge_id] = (entry[0], entry[1], self._clock())
+
+    def discard(self, bridge_id: str) -> None:
+        """Drop and close the client of a bridge, e.g. after it was removed."""
+
+        with self._lock:
+            entry = self._entries.pop(bridge_id, None)
+        if entry is not None:
+            _close_quietly(entry[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            _close_quietly(entry[1])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _create(self, config: HueBridgeConfig) -> HueBridgeClient:
+        if self._factory is not None:
+            return self._factory(config)
+        return HueBridgeClient(config, pool_maxsize=self._pool_maxsize)
+
+    def _collect_idle_locked(self, now: float, stale: List[HueBridgeClient]) -> None:
+        if self._idle_timeout is None:
+            return
+        expired = [
+            bridge_id
+            for bridge_id, (_, _, last_used) in self._entries.items()
+            if now - last_used > self._idle_timeout and bridge_id not in self._held
+        ]
+        for bridge_id in expired:
+            stale.append(self._entries.pop(bridge_id)[1])
+
+
+def _close_quietly(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:  # pragma: no cover - best effort cleanup
+            pass
+
+
 class HueBridgeError(RuntimeError):
     """Raised when the Hue Bridge returns an error."""
 
@@ -333,4 +731,19 @@ class HueBridgeError(RuntimeError):
         return cls(message or "Hue bridge request returned errors", errors=errors_list)
 
 
-__all__ = ["HueBridgeClient", "HueResource", "HueBridgeError"]
+__all__ = [
+    "HueBridgeClient",
+    "HueClientPool",
+    "HueResource",
+    "HueBridgeError",
+    "ResourceIdFilter",
+    "SSEParser",
+    "bridge_fingerprint",
+    "decode_json",
+    "grouped_light_state_body",
+    "iter_event_entries",
+    "iter_timed_event_entries",
+    "light_state_body",
+    "merge_resource_data",
+    "scene_recall_body",
+]
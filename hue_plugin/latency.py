@@ -0,0 +1,173 @@
+"""Latency tracing of forwarded events.
+
+Every delivery carries a *trace*: wall clock timestamps (seconds since the
+epoch) of the stages an event passes on its way from the bridge to the
+Miniserver:
+
+``created``
+    ``creationtime`` of the Hue event stream message (bridge clock)
+``received``
+    the message was read from the event stream (or the bridge was polled)
+``dispatched``
+    a delivery worker picked the value up
+``responded``
+    the Miniserver answered the request
+``persisted``
+    the event was handed to the event store
+
+Traces are stored with the event record. :class:`LatencyTracker` aggregates
+them into histograms per stage and per mapping. The bridge clock is not
+synchronised with the LoxBerry, so stages starting at ``created`` may be
+off by the clock difference.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# upper bounds in milliseconds (1-2-5 series), the last bucket is unbounded
+BUCKET_BOUNDS_MS: Tuple[float, ...] = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000,
+)
+
+TRACE_STAGES = ("created", "received", "dispatched", "responded", "persisted")
+
+# (name, start, end); ``end_to_end`` starts at ``received`` if ``created`` is unknown
+_SPANS = (
+    ("bridge_to_stream", "created", "received"),
+    ("queue", "received", "dispatched"),
+    ("loxone", "dispatched", "responded"),
+    ("store", "responded", "persisted"),
+)
+
+
+def parse_creation_time(value: Any) -> Optional[float]:
+    """Epoch seconds of an ISO ``creationtime`` of the bridge, ``None`` if invalid."""
+
+    if not isinstance(value, str) or not value:
+        return None
+    candidate = value.strip()
+    if candidate.endswith("Z"):
+        candidate = candidate[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(candidate)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return None
+    return parsed.timestamp()
+
+
+def trace_spans(trace: Dict[str, float]) -> Dict[str, float]:
+    """Durations in milliseconds between the recorded stages of ``trace``."""
+
+    spans: Dict[str, float] = {}
+    for name, start, end in _SPANS:
+        if start in trace and end in trace:
+            spans[name] = (trace[end] - trace[start]) * 1000.0
+    origin = trace.get("created", trace.get("received"))
+    if origin is not None and "responded" in trace:
+        spans["end_to_end"] = (trace["responded"] - origin) * 1000.0
+    return spans
+
+
+class LatencyHistogram:
+    """Bucketed latency distribution with interpolated percentiles."""
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        value_ms = max(0.0, value_ms)
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            if not bucket:
+                continue
+            if seen + bucket >= rank:
+                lower = BUCKET_BOUNDS_MS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+                upper = min(upper, self.max_ms)
+                lower = min(lower, upper)
+                return lower + (upper - lower) * (rank - seen) / bucket
+            seen += bucket
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(0.50), 3),
+            "p95": round(self.percentile(0.95), 3),
+            "p99": round(self.percentile(0.99), 3),
+            "max": round(self.max_ms, 3),
+            "avg": round(self.total_ms / self.count, 3) if self.count else 0.0,
+        }
+
+
+class LatencyTracker:
+    """Histograms of the trace spans of one bridge, per stage and per mapping."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, LatencyHistogram] = {}
+        self._mappings: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, mapping_id: str, trace: Dict[str, float]) -> None:
+        spans = trace_spans(trace)
+        if not spans:
+            return
+        with self._lock:
+            for name, value in spans.items():
+                self._stages.setdefault(name, LatencyHistogram()).observe(value)
+            if "end_to_end" in spans:
+                self._mappings.setdefault(mapping_id, LatencyHistogram()).observe(spans["end_to_end"])
+
+    def histograms(self) -> Tuple[Dict[str, LatencyHistogram], Dict[str, LatencyHistogram]]:
+        """Copies of the stage and mapping histograms (e.g. for an exporter)."""
+
+        with self._lock:
+            return (
+                {name: _copy(histogram) for name, histogram in self._stages.items()},
+                {name: _copy(histogram) for name, histogram in self._mappings.items()},
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """p50/p95/p99 in milliseconds per stage and end-to-end per mapping."""
+
+        with self._lock:
+            return {
+                "stages": {name: histogram.summary() for name, histogram in self._stages.items()},
+                "mappings": {name: histogram.summary() for name, histogram in self._mappings.items()},
+            }
+
+
+def _copy(histogram: LatencyHistogram) -> LatencyHistogram:
+    clone = LatencyHistogram()
+    clone.counts = list(histogram.counts)
+    clone.count = histogram.count
+    clone.total_ms = histogram.total_ms
+    clone.max_ms = histogram.max_ms
+    return clone
+
+
+__all__ = [
+    "BUCKET_BOUNDS_MS",
+    "LatencyHistogram",
+    "LatencyTracker",
+    "TRACE_STAGES",
+    "parse_creation_time",
+    "trace_spans",
+]
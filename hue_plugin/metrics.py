@@ -0,0 +1,358 @@
+"""Runtime metrics in the Prometheus text exposition format.
+
+Instrumented code updates :class:`Counter`, :class:`Gauge` and
+:class:`Histogram` instances of the process-wide :data:`REGISTRY`
+directly. Values that already live elsewhere (stream health, queue depths,
+latency histograms of the forwarder) are exported by *collectors*:
+callables registered with :meth:`MetricsRegistry.register_collector` that
+build fresh metric families on every scrape.
+
+The FastAPI app serves the registry at ``/metrics``; the forwarder process
+serves it with :func:`serve_metrics` when ``HUE_PLUGIN_METRICS_PORT`` is
+set.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; covers LAN round trips up to the request timeouts
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_LabelValues = Tuple[str, ...]
+
+
+def _log(message: str) -> None:
+    print(f"[hue-metrics] {message}", flush=True)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class MetricFamily:
+    """A named metric with a fixed set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> _LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metrik '{self.name}' erwartet die Labels {', '.join(self.label_names) or '-'}."
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """``(name, label names, label values, value)`` of every sample."""
+
+        return iter(())
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation.replace(chr(10), ' ')}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for name, label_names, label_values, value in self.samples():
+            yield f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}"
+
+
+class _ValueFamily(MetricFamily):
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[_LabelValues, float] = {}
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            yield self.name, self.label_names, label_values, value
+
+
+class Counter(_ValueFamily):
+    """Monotonically increasing total."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("Zähler können nur steigen.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ValueFamily):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(MetricFamily):
+    """Bucketed distribution with ``_bucket``, ``_sum`` and ``_count`` samples."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        if "le" in labels:
+            raise ValueError("Das Label 'le' ist für Histogramm-Grenzen reserviert.")
+        super().__init__(name, documentation, labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(float(bound) for bound in buckets))
+        self._values: Dict[_LabelValues, _HistogramValue] = {}
+
+    def _slot_locked(self, key: _LabelValues) -> _HistogramValue:
+        slot = self._values.get(key)
+        if slot is None:
+            slot = self._values[key] = _HistogramValue(len(self.buckets) + 1)
+        return slot
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            slot = self._slot_locked(key)
+            slot.counts[bisect.bisect_left(self.buckets, value)] += 1
+            slot.total += value
+            slot.count += 1
+
+    def load(self, counts: Sequence[int], total: float, **labels: object) -> None:
+        """Set the state of one label set from per-bucket (not cumulative) counts.
+
+        ``counts`` has one entry per bucket plus the overflow bucket; used by
+        collectors exporting histograms kept elsewhere.
+        """
+
+        if len(counts) != len(self.buckets) + 1:
+            raise ValueError(f"Histogramm '{self.name}' erwartet {len(self.buckets) + 1} Zählwerte.")
+        key = self._key(labels)
+        with self._lock:
+            slot = self._slot_locked(key)
+            slot.counts = list(counts)
+            slot.total = float(total)
+            slot.count = sum(counts)
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            slot = self._values.get(self._key(labels))
+            return slot.count if slot is not None else 0
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Sequence[str], float]]:
+        with self._lock:
+            values = sorted(
+                (key, list(slot.counts), slot.total, slot.count) for key, slot in self._values.items()
+            )
+        bucket_labels = self.label_names + ("le",)
+        for label_values, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket
+                yield (
+                    f"{self.name}_bucket",
+                    bucket_labels,
+                    label_values + (_format_value(bound),),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", self.label_names, label_values, total
+            yield f"{self.name}_count", self.label_names, label_values, count
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """Metric families and collectors rendered together on every scrape."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: List[Collector] = []
+
+    def _add(self, family: MetricFamily) -> MetricFamily:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                if type(existing) is not type(family) or existing.label_names != family.label_names:
+                    raise ValueError(f"Metrik '{family.name}' ist bereits anders registriert.")
+                return existing
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labels))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        family = Histogram(name, documentation, labels, buckets=buckets)
+        return self._add(family)  # type: ignore[return-value]
+
+    def register_collector(self, collector: Collector) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Collector) -> None:
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        """All families: the registered ones and those built by collectors."""
+
+        with self._lock:
+            families = list(self._families.values())
+            collectors = list(self._collectors)
+        merged: Dict[str, MetricFamily] = {family.name: family for family in families}
+        for collector in collectors:
+            try:
+                collected = list(collector())
+            except Exception as exc:  # pragma: no cover - one broken collector must not break the scrape
+                _log(f"Metriken konnten nicht gesammelt werden: {exc}")
+                continue
+            for family in collected:
+                merged.setdefault(family.name, family)
+        return [merged[name] for name in sorted(merged)]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.collect():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def collect_process_metrics() -> Iterable[MetricFamily]:
+    """Thread count of the process, grouped by thread name prefix."""
+
+    threads = Gauge("hue_process_threads", "Laufende Threads des Prozesses.", ("kind",))
+    counts: Dict[str, int] = {}
+    for thread in threading.enumerate():
+        # hue-forwarder-<bridge>, hue-delivery-<bridge>-3 → hue-forwarder, hue-delivery
+        parts = thread.name.split("-")
+        kind = "-".join(parts[:2]) if parts[0] == "hue" and len(parts) > 1 else "other"
+        counts[kind] = counts.get(kind, 0) + 1
+    for kind, count in counts.items():
+        threads.set(count, kind=kind)
+    return [threads]
+
+
+REGISTRY.register_collector(collect_process_metrics)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] not in {"/", "/metrics"}:
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - scrapes are not logged
+        return
+
+
+def serve_metrics(
+    port: int,
+    host: str = "0.0.0.0",
+    registry: Optional[MetricsRegistry] = None,
+) -> ThreadingHTTPServer:
+    """Serve ``registry`` at ``http://host:port/metrics`` from a daemon thread.
+
+    Stop it with ``shutdown()`` followed by ``server_close()``.
+    """
+
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or REGISTRY})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="hue-metrics-http", daemon=True)
+    thread.start()
+    return server
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "DEFAULT_BUCKETS",
+    "Gauge",
+    "Histogram",
+    "MetricFamily",
+    "MetricsRegistry",
+    "REGISTRY",
+    "collect_process_metrics",
+    "serve_metrics",
+]
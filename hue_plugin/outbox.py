@@ -0,0 +1,356 @@
+"""Durable outbox for deliveries the Miniserver did not accept.
+
+When a value cannot be sent to Loxone (Miniserver rebooting, network
+down), the forwarder hands it to :class:`DeliveryOutbox` instead of
+dropping it. Entries are appended to a JSONL file next to the runtime
+state, retried with exponential backoff in the order they were queued per
+mapping - the same lanes the delivery queue uses - and discarded once they are older than the maximum age of
+their mapping - a motion value from ten minutes ago must not be replayed.
+Pending entries survive a restart and are retried right after startup.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .config import VirtualInputConfig, runtime_state_path
+
+# seconds after which an undelivered value is dropped, unless the mapping
+# sets ``max_age_ms``
+DEFAULT_MAX_AGE = {"motion": 30.0, "button": 300.0}
+_FALLBACK_MAX_AGE = 300.0
+_COMPACT_AFTER = 200
+
+_MAPPING_FIELDS = {item.name for item in fields(VirtualInputConfig)}
+
+
+def _log(message: str) -> None:
+    print(f"[hue-outbox] {message}", flush=True)
+
+
+def outbox_path(state_path: str | Path | None = None) -> Path:
+    """Return the outbox file that belongs to a runtime state file."""
+
+    resolved = Path(state_path) if state_path is not None else runtime_state_path()
+    return resolved.with_suffix(".outbox")
+
+
+def mapping_max_age(mapping: VirtualInputConfig) -> float:
+    """Maximum age in seconds of an undelivered value of ``mapping``."""
+
+    if mapping.max_age_ms is not None:
+        return mapping.max_age_ms / 1000.0
+    return DEFAULT_MAX_AGE.get(mapping.resource_type, _FALLBACK_MAX_AGE)
+
+
+def _lane_key(entry: Dict[str, Any]) -> str:
+    # older files carry the mapping id only in the stored mapping
+    return entry.get("mapping_id") or entry["mapping"]["id"]
+
+
+class DeliveryOutbox:
+    """Persistent per-mapping retry queue served by one thread.
+
+    ``sender_provider`` returns the current :class:`LoxoneSender`;
+    ``record`` has the signature of the event store's ``record`` and is
+    called once per entry when it is finally delivered or expires.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        sender_provider: Callable[[], Any],
+        record: Optional[Callable[..., None]] = None,
+        *,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._path = Path(path)
+        self._sender_provider = sender_provider
+        self._record = record
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._lanes: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._due: Dict[str, float] = {}
+        self._next_id = 1
+        self._done_records = 0
+        self._handle: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats: Dict[str, int] = {"queued": 0, "delivered": 0, "expired": 0, "retries": 0}
+        self._load()
+
+    # -- persistence -----------------------------------------------------------------
+    def _load(self) -> None:
+        entries: Dict[int, Dict[str, Any]] = {}
+        try:
+            with self._path.open("r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if not isinstance(record, dict) or not isinstance(record.get("id"), int):
+                        continue
+                    if record.get("op") == "done":
+                        entries.pop(record["id"], None)
+                    elif record.get("op") == "add":
+                        entries[record["id"]] = record
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            _log(f"Outbox konnte nicht gelesen werden: {exc}")
+        now = self._clock()
+        for entry_id in sorted(entries):
+            entry = entries[entry_id]
+            entry["attempts"] = 0
+            lane_key = _lane_key(entry)
+            self._lanes.setdefault(lane_key, deque()).append(entry)
+            self._due[lane_key] = now
+        if entries:
+            self._next_id = max(entries) + 1
+            _log(f"{len(entries)} ausstehende Weiterleitung(en) aus der Outbox geladen.")
+        with self._condition:
+            self._compact_locked()
+
+    def _write_locked(self, records: List[Dict[str, Any]]) -> None:
+        if self._handle is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self._path.open("a", encoding="utf-8")
+        for record in records:
+            self._handle.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def _compact_locked(self) -> None:
+        """Rewrite the file with the pending entries only."""
+
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        pending = [entry for lane in self._lanes.values() for entry in lane]
+        if not pending:
+            try:
+                self._path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                _log(f"Outbox konnte nicht geleert werden: {exc}")
+            self._done_records = 0
+            return
+        pending.sort(key=lambda entry: entry["id"])
+        tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as handle:
+                for entry in pending:
+                    stored = {key: value for key, value in entry.items() if key != "attempts"}
+                    handle.write(json.dumps(stored, ensure_ascii=False, separators=(",", ":")) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, self._path)
+        except OSError as exc:
+            _log(f"Outbox konnte nicht geschrieben werden: {exc}")
+            return
+        self._done_records = 0
+
+    # -- producer side ---------------------------------------------------------------
+    def pending_for(self, mapping_id: str) -> bool:
+        """Whether values of mapping ``mapping_id`` are still waiting in the outbox."""
+
+        with self._condition:
+            return bool(self._lanes.get(mapping_id))
+
+    def pending(self) -> int:
+        with self._condition:
+            return sum(len(lane) for lane in self._lanes.values())
+
+    def put(
+        self,
+        mapping: VirtualInputConfig,
+        value: str,
+        *,
+        event_type: str,
+        state: str,
+        trigger: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Queue ``value`` behind all pending values of the same mapping."""
+
+        with self._condition:
+            if self._closed:
+                return
+            entry: Dict[str, Any] = {
+                "op": "add",
+                "id": self._next_id,
+                "mapping_id": mapping.id,
+                "virtual_input": mapping.virtual_input,
+                "value": value,
+                "mapping": mapping.to_dict(),
+                "event_type": event_type,
+                "state": state,
+                "trigger": trigger,
+                "extra": extra,
+                "trace": trace,
+                "created": self._clock(),
+                "max_age": mapping_max_age(mapping),
+            }
+            self._next_id += 1
+            self._write_locked([entry])
+            entry["attempts"] = 0
+            lane = self._lanes.get(mapping.id)
+            if lane is None:
+                lane = self._lanes[mapping.id] = deque()
+                self._due[mapping.id] = self._clock() + self._base_delay
+            lane.append(entry)
+            self._stats["queued"] += 1
+            self._ensure_thread_locked()
+            self._condition.notify()
+
+    # -- delivery --------------------------------------------------------------------
+    def start(self) -> None:
+        """Start retrying entries loaded from disk."""
+
+        with self._condition:
+            if self._lanes:
+                self._ensure_thread_locked()
+
+    def _ensure_thread_locked(self) -> None:
+        if self._thread is not None or self._closed:
+            return
+        self._thread = threading.Thread(target=self._run, name="hue-outbox", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    now = self._clock()
+                    due = [key for key, when in self._due.items() if when <= now]
+                    if due:
+                        break
+                    wait = min(self._due.values()) - now if self._due else None
+                    self._condition.wait(timeout=wait)
+            for lane_key in due:
+                self._attempt_lane(lane_key)
+
+    def _attempt_lane(self, lane_key: str, *, final: bool = False) -> bool:
+        """Deliver the lane in order until it is empty or a send fails."""
+
+        with self._send_lock:
+            while True:
+                with self._condition:
+                    lane = self._lanes.get(lane_key)
+                    if not lane:
+                        self._lanes.pop(lane_key, None)
+                        self._due.pop(lane_key, None)
+                        return True
+                    entry = lane[0]
+                virtual_input = entry["virtual_input"]
+                age = self._clock() - entry["created"]
+                if age > entry["max_age"]:
+                    _log(
+                        f"Weiterleitung an '{virtual_input}' nach {age:.0f} s verworfen "
+                        f"(maximales Alter {entry['max_age']:.0f} s)."
+                    )
+                    self._finish(lane_key, entry, delivered=False, extra={"outbox": "expired"})
+                    continue
+                dispatched = time.time()
+                try:
+                    sender = self._sender_provider()
+                    sender.send(virtual_input, entry["value"])
+                except RuntimeError as exc:
+                    with self._condition:
+                        entry["attempts"] += 1
+                        self._stats["retries"] += 1
+                        delay = min(self._max_delay, self._base_delay * 2 ** (entry["attempts"] - 1))
+                        self._due[lane_key] = self._clock() + delay
+                    if not final:
+                        _log(
+                            f"Weiterleitung an '{virtual_input}' fehlgeschlagen "
+                            f"(Versuch {entry['attempts']}, nächster in {delay:.0f} s): {exc}"
+                        )
+                    return False
+                # ``received`` stays, so end-to-end includes the time in the outbox
+                entry["trace"] = {
+                    **(entry.get("trace") or {}),
+                    "dispatched": dispatched,
+                    "responded": time.time(),
+                }
+                self._finish(
+                    lane_key,
+                    entry,
+                    delivered=True,
+                    extra={"outbox": "delivered", "attempts": entry["attempts"] + 1},
+                )
+
+    def _finish(self, lane_key: str, entry: Dict[str, Any], *, delivered: bool, extra: Dict[str, Any]) -> None:
+        with self._condition:
+            lane = self._lanes.get(lane_key)
+            if lane and lane[0] is entry:
+                lane.popleft()
+            self._stats["delivered" if delivered else "expired"] += 1
+            self._write_locked([{"op": "done", "id": entry["id"]}])
+            self._done_records += 1
+            if self._done_records >= _COMPACT_AFTER:
+                self._compact_locked()
+        if self._record is None:
+            return
+        mapping_data = {key: value for key, value in entry["mapping"].items() if key in _MAPPING_FIELDS}
+        try:
+            self._record(
+                VirtualInputConfig(**mapping_data),
+                event_type=entry["event_type"],
+                state=entry["state"],
+                value=entry["value"],
+                trigger=entry.get("trigger"),
+                delivered=delivered,
+                extra={**(entry.get("extra") or {}), **extra},
+                trace=entry.get("trace"),
+            )
+        except Exception as exc:  # pragma: no cover - recording must not stop retries
+            _log(f"Outbox-Ereignis konnte nicht gespeichert werden: {exc}")
+
+    def drain(self) -> bool:
+        """Try every pending entry once, ignoring the backoff; ``True`` if empty."""
+
+        with self._condition:
+            lanes = list(self._lanes)
+        for lane_key in lanes:
+            self._attempt_lane(lane_key, final=True)
+        return self.pending() == 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            payload = dict(self._stats)
+            payload["pending"] = sum(len(lane) for lane in self._lanes.values())
+        return payload
+
+    def close(self) -> None:
+        """Stop the retry thread after a last delivery attempt; keep the rest on disk."""
+
+        with self._condition:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout=5.0)
+        if not self.drain():
+            _log(f"{self.pending()} Weiterleitung(en) bleiben in der Outbox für den nächsten Start.")
+        with self._condition:
+            self._compact_locked()
+
+
+__all__ = ["DEFAULT_MAX_AGE", "DeliveryOutbox", "mapping_max_age", "outbox_path"]
@@ -0,0 +1,320 @@
+"""In-memory mirror of Hue bridge resources kept current by the event stream."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import HueBridgeConfig
+from .hue_client import (
+    HueBridgeClient,
+    HueBridgeError,
+    HueClientPool,
+    HueResource,
+    bridge_fingerprint,
+    decode_json,
+    iter_event_entries,
+    merge_resource_data,
+)
+
+_JSON = Dict[str, Any]
+
+
+def _log(message: str) -> None:
+    print(f"[hue-resource-mirror] {message}", flush=True)
+
+
+class ResourceMirror:
+    """Bridge resources held in memory and updated from the event stream.
+
+    The mirror bootstraps itself with one full fetch and afterwards applies
+    ``add``/``update``/``delete`` events. Reads are answered from memory as
+    long as the data is within the staleness bound: ``max_staleness`` while
+    the event stream is connected, ``degraded_staleness`` while it is not.
+    The getters mirror those of :class:`HueBridgeClient`, so both can be
+    used interchangeably for read access. Returned resources are shared and
+    must not be modified.
+
+    Instead of following the stream itself (:meth:`start`), the mirror can
+    be fed by another reader of the same stream through
+    :meth:`stream_connected`, :meth:`stream_message`, :meth:`stream_closed`
+    and :meth:`stream_retry`, so a process keeps one connection per bridge.
+    """
+
+    def __init__(
+        self,
+        client: HueBridgeClient,
+        *,
+        max_staleness: float = 300.0,
+        degraded_staleness: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._client = client
+        self._max_staleness = max_staleness
+        self._degraded_staleness = degraded_staleness
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._resources: Dict[str, Dict[str, _JSON]] = {}
+        self._last_sync: Optional[float] = None
+        self._stream_live = False
+        self._stream_stats: Dict[str, Any] = {"connects": 0, "disconnects": 0, "backoff": 0.0}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -- lifecycle -------------------------------------------------------------------
+    def start(self) -> None:
+        """Start following the event stream in a background thread."""
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._stream_loop,
+                name="hue-resource-mirror",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    @property
+    def stream_live(self) -> bool:
+        with self._lock:
+            return self._stream_live
+
+    def stream_stats(self) -> Dict[str, Any]:
+        """Connection state, (re)connects and current backoff of the event stream."""
+
+        with self._lock:
+            return {"connected": self._stream_live, **self._stream_stats}
+
+    # -- synchronisation -------------------------------------------------------------
+    def bootstrap(self) -> None:
+        """Replace the mirrored state with a full fetch from the bridge."""
+
+        resources = self._client.get_all_resources()
+        grouped: Dict[str, Dict[str, _JSON]] = defaultdict(dict)
+        for resource in resources:
+            if not resource.id or not resource.type:
+                continue
+            payload: _JSON = {"id": resource.id, "type": resource.type, "metadata": resource.metadata}
+            payload.update(resource.data)
+            grouped[resource.type][resource.id] = payload
+        with self._lock:
+            self._resources = dict(grouped)
+            self._last_sync = self._clock()
+
+    def apply_event(self, payload: Any) -> None:
+        """Apply one event stream message to the mirrored state."""
+
+        with self._lock:
+            for event_type, entry in iter_event_entries(payload):
+                rid = entry.get("id")
+                rtype = entry.get("type")
+                if not isinstance(rid, str) or not isinstance(rtype, str):
+                    continue
+                bucket = self._resources.setdefault(rtype, {})
+                if event_type == "delete":
+                    bucket.pop(rid, None)
+                elif event_type == "add":
+                    bucket[rid] = dict(entry)
+                else:
+                    current = bucket.get(rid)
+                    if current is not None:
+                        bucket[rid] = merge_resource_data(current, entry)
+            if self._stream_live:
+                self._last_sync = self._clock()
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            last_sync = self._last_sync
+            bound = self._max_staleness if self._stream_live else self._degraded_staleness
+        if last_sync is not None and self._clock() - last_sync <= bound:
+            return
+        with self._refresh_lock:
+            with self._lock:
+                if self._last_sync is not None and self._last_sync != last_sync:
+                    return
+            self.bootstrap()
+
+    # -- fed by another reader of the event stream ------------------------------------
+    def stream_connected(self) -> None:
+        try:
+            self.bootstrap()
+        except HueBridgeError as exc:
+            # reads bootstrap on demand as long as no full fetch succeeded
+            _log(f"Ressourcen konnten nicht geladen werden: {exc}")
+        with self._lock:
+            self._stream_live = True
+            self._stream_stats["connects"] += 1
+            self._stream_stats["backoff"] = 0.0
+
+    def stream_message(self, data: bytes) -> None:
+        try:
+            payload = decode_json(data)
+        except ValueError:
+            return
+        self.apply_event(payload)
+
+    def stream_closed(self, backoff: float = 0.0) -> None:
+        with self._lock:
+            self._stream_live = False
+            self._stream_stats["disconnects"] += 1
+            self._stream_stats["backoff"] = backoff
+
+    def stream_retry(self, backoff: float) -> None:
+        """Record the wait before the next connection attempt."""
+
+        with self._lock:
+            self._stream_stats["backoff"] = backoff
+
+    def _stream_loop(self) -> None:
+        backoff = 5.0
+        while not self._stop_event.is_set():
+
+            def on_connect() -> None:
+                # bootstrap once the stream is up so no change between the full
+                # fetch and the (re)connect is lost; runs again on every reconnect
+                nonlocal backoff
+                backoff = 5.0
+                self.stream_connected()
+
+            try:
+                events = self._client.iter_raw_events(on_connect=on_connect, on_disconnect=self.stream_closed)
+                for data in events:
+                    if self._stop_event.is_set():
+                        return
+                    self.stream_message(data)
+            except HueBridgeError as exc:
+                _log(f"Event-Stream unterbrochen: {exc}")
+            self.stream_retry(backoff)
+            if self._stop_event.wait(timeout=backoff):
+                return
+            backoff = min(backoff * 2, 60.0)
+
+    # -- read access -----------------------------------------------------------------
+    def list(self, rtype: str) -> List[HueResource]:
+        self._ensure_fresh()
+        with self._lock:
+            items = list(self._resources.get(rtype, {}).values())
+        return [HueResource.from_api(item) for item in items]
+
+    def get_resource(self, rtype: str, rid: str) -> Optional[HueResource]:
+        self._ensure_fresh()
+        with self._lock:
+            item = self._resources.get(rtype, {}).get(rid)
+        return HueResource.from_api(item) if item is not None else None
+
+    def get_all_resources(self) -> Iterable[HueResource]:
+        self._ensure_fresh()
+        with self._lock:
+            items = [item for bucket in self._resources.values() for item in bucket.values()]
+        return [HueResource.from_api(item) for item in items]
+
+    def get_lights(self) -> Iterable[HueResource]:
+        return self.list("light")
+
+    def get_scenes(self) -> Iterable[HueResource]:
+        return self.list("scene")
+
+    def get_rooms(self) -> Iterable[HueResource]:
+        return self.list("room")
+
+    def get_zones(self) -> Iterable[HueResource]:
+        return self.list("zone")
+
+    def get_grouped_lights(self) -> Iterable[HueResource]:
+        return self.list("grouped_light")
+
+    def get_buttons(self) -> Iterable[HueResource]:
+        return self.list("button")
+
+    def get_motion_sensors(self) -> Iterable[HueResource]:
+        return self.list("motion")
+
+    def get_devices(self) -> Iterable[HueResource]:
+        return self.list("device")
+
+
+class ResourceMirrorRegistry:
+    """One :class:`ResourceMirror` per bridge, backed by a client pool."""
+
+    def __init__(
+        self,
+        pool: HueClientPool,
+        *,
+        max_staleness: float = 300.0,
+        follow_events: bool = True,
+    ) -> None:
+        self._pool = pool
+        self._max_staleness = max_staleness
+        self._follow_events = follow_events
+        self._lock = threading.Lock()
+        self._mirrors: Dict[str, Tuple[Tuple[Any, ...], ResourceMirror]] = {}
+        self._fed: Set[str] = set()
+
+    def get(self, config: HueBridgeConfig) -> ResourceMirror:
+        fingerprint = bridge_fingerprint(config)
+        with self._lock:
+            entry = self._mirrors.get(config.id)
+            if entry is not None and entry[0] == fingerprint:
+                return entry[1]
+            if entry is not None:
+                entry[1].stop()
+            mirror = ResourceMirror(self._pool.get(config), max_staleness=self._max_staleness)
+            self._mirrors[config.id] = (fingerprint, mirror)
+            # a fed bridge whose connection changed waits for its feeder to
+            # reconnect instead of opening a second stream
+            fed = config.id in self._fed
+        if self._follow_events and not fed:
+            mirror.start()
+        return mirror
+
+    def feed(self, config: HueBridgeConfig) -> ResourceMirror:
+        """Mirror of a bridge that is fed by the caller's event stream.
+
+        Replaces a mirror following its own stream; :meth:`discard` hands the
+        bridge back to a self-following mirror on the next :meth:`get`.
+        """
+
+        fingerprint = bridge_fingerprint(config)
+        with self._lock:
+            entry = self._mirrors.get(config.id)
+            if entry is not None and entry[0] == fingerprint and config.id in self._fed:
+                return entry[1]
+            if entry is not None:
+                entry[1].stop()
+            mirror = ResourceMirror(self._pool.get(config), max_staleness=self._max_staleness)
+            self._mirrors[config.id] = (fingerprint, mirror)
+            self._fed.add(config.id)
+        return mirror
+
+    def discard(self, bridge_id: str, *, keep_fed: bool = False) -> None:
+        """Drop the mirror of a bridge; with ``keep_fed`` a fed mirror is left to its feeder."""
+
+        with self._lock:
+            if keep_fed and bridge_id in self._fed:
+                return
+            self._fed.discard(bridge_id)
+            entry = self._mirrors.pop(bridge_id, None)
+        if entry is not None:
+            entry[1].stop()
+
+    def stream_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            mirrors = {bridge_id: entry[1] for bridge_id, entry in self._mirrors.items()}
+        return {bridge_id: mirror.stream_stats() for bridge_id, mirror in mirrors.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._mirrors.values())
+            self._mirrors.clear()
+            self._fed.clear()
+        for _, mirror in entries:
+            mirror.stop()
+
+
+__all__ = ["ResourceMirror", "ResourceMirrorRegistry"]
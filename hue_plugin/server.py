@@ -2,21 +2,48 @@
 from __future__ import annotations
 
 import os
-from typing import Dict, Iterable, Optional
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
-from fastapi import Body, Depends, FastAPI, HTTPException, Query, status
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
+from .color import kelvin_to_mirek, parse_rgb_string, rgb_to_xy
+from .command_scheduler import CommandScheduler, CommandSchedulerRegistry
 from .config import (
     ConfigError,
     HueBridgeConfig,
     PluginConfig,
+    embedded_forwarder_marker_path,
     ensure_bridge_id,
+    env_number,
     load_config,
+    load_config_snapshot,
+    runtime_state_path,
     save_config,
 )
-from .hue_client import HueBridgeClient, HueBridgeError, HueResource
+from .event_feed import EventFeed, StoreFeedFollower, aiter_sse_messages
+from .event_forwarder import (
+    HueEventForwarder,
+    PublishingEventStore,
+    forwarder_options,
+    open_event_store,
+)
+from .hue_client import (
+    HueBridgeClient,
+    HueBridgeError,
+    HueClientPool,
+    HueResource,
+    grouped_light_state_body,
+    light_state_body,
+    scene_recall_body,
+)
+from .metrics import CONTENT_TYPE, REGISTRY, Counter, Gauge, MetricFamily
+from .resource_mirror import ResourceMirror, ResourceMirrorRegistry
+from .topology import ResourceTopology
 
 app = FastAPI(title="LoxBerry Hue API v2 bridge")
 
@@ -35,6 +62,155 @@ app.add_middleware(
 )
 
 
+client_pool = HueClientPool(
+    pool_maxsize=int(env_number("HUE_PLUGIN_POOL_SIZE", 10)),
+    idle_timeout=env_number("HUE_PLUGIN_POOL_IDLE_TIMEOUT", 300.0),
+)
+
+scheduler_registry = CommandSchedulerRegistry(
+    client_pool,
+    light_rate=env_number("HUE_PLUGIN_LIGHT_RATE", 10.0),
+    group_rate=env_number("HUE_PLUGIN_GROUP_RATE", 1.0),
+)
+_COMMAND_TIMEOUT = 15.0
+
+mirror_registry: Optional[ResourceMirrorRegistry] = None
+if os.getenv("HUE_PLUGIN_RESOURCE_MIRROR", "1").strip().lower() not in {"0", "false", "no", "off"}:
+    mirror_registry = ResourceMirrorRegistry(
+        client_pool,
+        max_staleness=env_number("HUE_PLUGIN_RESOURCE_MIRROR_MAX_AGE", 300.0),
+    )
+
+
+event_feed = EventFeed(capacity=int(env_number("HUE_PLUGIN_EVENT_FEED_SIZE", 500)))
+_feed_follower: Optional[StoreFeedFollower] = None
+_feed_lock = threading.Lock()
+
+_forwarder: Optional[HueEventForwarder] = None
+_forwarder_thread: Optional[threading.Thread] = None
+
+
+def _log(message: str) -> None:
+    print(f"[hue-server] {message}", flush=True)
+
+
+def embedded_forwarder_enabled() -> bool:
+    value = os.getenv("HUE_PLUGIN_EMBEDDED_FORWARDER", "0").strip().lower()
+    return value in {"1", "true", "yes", "on"}
+
+
+def _server_metrics() -> List[MetricFamily]:
+    """Command schedulers, client pool and event streams of the resource mirrors."""
+
+    commands = Counter(
+        "hue_command_scheduler_commands_total",
+        "Befehle der Befehlswarteschlangen nach Ergebnis.",
+        ("bridge", "outcome"),
+    )
+    queue_depth = Gauge("hue_command_scheduler_queue_depth", "Wartende Befehle je Bridge.", ("bridge",))
+    for bridge_id, stats in scheduler_registry.stats().items():
+        for outcome in ("submitted", "coalesced", "sent", "failed"):
+            commands.inc(stats.get(outcome, 0), bridge=bridge_id, outcome=outcome)
+        queue_depth.set(stats.get("queue_depth", 0), bridge=bridge_id)
+    clients = Gauge("hue_client_pool_clients", "Bridge-Clients im Verbindungspool.")
+    clients.set(len(client_pool))
+    families: List[MetricFamily] = [commands, queue_depth, clients]
+    if mirror_registry is not None:
+        connected = Gauge(
+            "hue_mirror_stream_connected", "Event-Stream des Ressourcenspiegels verbunden.", ("bridge",)
+        )
+        connects = Counter(
+            "hue_mirror_stream_connects_total", "Verbindungsaufbauten des Ressourcenspiegels.", ("bridge",)
+        )
+        disconnects = Counter(
+            "hue_mirror_stream_disconnects_total",
+            "Abbrüche des Event-Streams des Ressourcenspiegels.",
+            ("bridge",),
+        )
+        backoff = Gauge(
+            "hue_mirror_stream_backoff_seconds",
+            "Wartezeit des Ressourcenspiegels bis zum nächsten Verbindungsversuch.",
+            ("bridge",),
+        )
+        for bridge_id, stats in mirror_registry.stream_stats().items():
+            connected.set(1 if stats["connected"] else 0, bridge=bridge_id)
+            connects.inc(stats["connects"], bridge=bridge_id)
+            disconnects.inc(stats["disconnects"], bridge=bridge_id)
+            backoff.set(stats["backoff"], bridge=bridge_id)
+        families += [connected, connects, disconnects, backoff]
+    return families
+
+
+REGISTRY.register_collector(_server_metrics)
+
+
+@app.on_event("startup")
+def _startup() -> None:
+    """Run the event forwarder in this process if ``HUE_PLUGIN_EMBEDDED_FORWARDER`` is set.
+
+    The forwarder shares the client pool, the configuration snapshot and the
+    resource mirrors with the API and publishes its events straight into
+    :data:`event_feed`. A marker file with the server's pid tells the web
+    frontend and standalone forwarders that no second forwarder may run.
+    """
+
+    global _forwarder, _forwarder_thread
+    if not embedded_forwarder_enabled():
+        return
+    # events of earlier runs; new ones arrive through the store wrapper
+    history = StoreFeedFollower(event_feed, runtime_state_path())
+    history.poll()
+    history.stop()
+    _forwarder = HueEventForwarder(
+        **forwarder_options(),
+        state_store=PublishingEventStore(open_event_store(write_behind=True), event_feed.publish),
+        client_pool=client_pool,
+        mirrors=mirror_registry,
+    )
+    _forwarder_thread = threading.Thread(
+        target=_forwarder.run_forever,
+        name="hue-event-forwarder",
+        daemon=True,
+    )
+    _write_forwarder_marker()
+    _forwarder_thread.start()
+
+
+def _write_forwarder_marker() -> None:
+    marker = embedded_forwarder_marker_path()
+    try:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.write_text(f"{os.getpid()}\n", encoding="utf-8")
+    except OSError as exc:  # pragma: no cover - the frontend falls back to /forwarder/stats
+        _log(f"Markierungsdatei konnte nicht geschrieben werden: {exc}")
+
+
+def _remove_forwarder_marker() -> None:
+    marker = embedded_forwarder_marker_path()
+    try:
+        if marker.read_text(encoding="utf-8").strip() == str(os.getpid()):
+            marker.unlink()
+    except OSError:
+        pass
+
+
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    global _forwarder, _forwarder_thread
+    if _forwarder is not None:
+        _forwarder.stop()
+        if _forwarder_thread is not None:
+            _forwarder_thread.join(timeout=10.0)
+        _forwarder, _forwarder_thread = None, None
+        _remove_forwarder_marker()
+    if _feed_follower is not None:
+        _feed_follower.stop()
+    scheduler_registry.clear()
+    if mirror_registry is not None:
+        mirror_registry.clear()
+    client_pool.clear()
+
+
 class LightStateRequest(BaseModel):
     on: Optional[bool] = Field(default=None, description="Switch the light on/off")
     brightness: Optional[int] = Field(
@@ -43,11 +219,42 @@ class LightStateRequest(BaseModel):
         le=100,
         description="Brightness percentage (0-100)"
     )
+    rgb: Optional[str] = Field(
+        default=None,
+        description="RGB colour as #RRGGBB or R,G,B (0-255)",
+    )
+    xy: Optional[List[float]] = Field(
+        default=None,
+        min_items=2,
+        max_items=2,
+        description="CIE xy colour coordinates",
+    )
+    temperature: Optional[int] = Field(
+        default=None,
+        gt=0,
+        description="Colour temperature in Kelvin",
+    )
+    mirek: Optional[int] = Field(default=None, description="Colour temperature in mirek")
+    transition: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Transition time in milliseconds",
+    )
 
 
 class SceneActivationRequest(BaseModel):
     target_rid: Optional[str] = Field(default=None, description="Target resource id")
     target_rtype: Optional[str] = Field(default=None, description="Target resource type")
+    transition: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Dynamics duration in milliseconds",
+    )
+
+
+class SceneDeactivationRequest(BaseModel):
+    target_rid: Optional[str] = Field(default=None, description="Target resource id")
+    target_rtype: Optional[str] = Field(default=None, description="Target resource type")
 
 
 class HueResourceResponse(BaseModel):
@@ -113,6 +320,14 @@ class BridgeUpdateRequest(BaseModel):
     verify_tls: bool = Field(default=False, description="Verify TLS certificates")
 
 
+def _discard_bridge(bridge_id: str) -> None:
+    scheduler_registry.discard(bridge_id)
+    if mirror_registry is not None:
+        # the embedded forwarder replaces the mirrors it feeds when it picks up the change
+        mirror_registry.discard(bridge_id, keep_fed=_forwarder is not None)
+    client_pool.discard(bridge_id)
+
+
 def _load_plugin_config(*, allow_missing: bool = False) -> PluginConfig:
     try:
         return load_config()
@@ -122,52 +337,197 @@ def _load_plugin_config(*, allow_missing: bool = False) -> PluginConfig:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
-def get_client(bridge_id: Optional[str] = Query(default=None)) -> HueBridgeClient:
+def _bridge_config(bridge_id: Optional[str]) -> HueBridgeConfig:
     try:
-        plugin_config = load_config()
-        bridge_config = plugin_config.get_bridge(bridge_id)
+        plugin_config = load_config_snapshot().config
+        return plugin_config.get_bridge(bridge_id)
     except ConfigError as exc:
         status_code = 404 if bridge_id else 500
         raise HTTPException(status_code=status_code, detail=str(exc)) from exc
 
-    return HueBridgeClient(bridge_config)
+
+def get_client(bridge_id: Optional[str] = Query(default=None)) -> HueBridgeClient:
+    return client_pool.get(_bridge_config(bridge_id))
+
+
+def get_scheduler(bridge_id: Optional[str] = Query(default=None)) -> CommandScheduler:
+    return scheduler_registry.get(_bridge_config(bridge_id))
+
+
+ResourceReader = Union[HueBridgeClient, ResourceMirror]
+
+
+def get_reader(bridge_id: Optional[str] = Query(default=None)) -> ResourceReader:
+    """Return the in-memory mirror of a bridge, or its client if disabled."""
+
+    bridge_config = _bridge_config(bridge_id)
+    if mirror_registry is None:
+        return client_pool.get(bridge_config)
+    return mirror_registry.get(bridge_config)
 
 
 @app.get("/lights", response_model=list[HueResourceResponse])
 def list_lights(
-    client: HueBridgeClient = Depends(get_client),
+    reader: ResourceReader = Depends(get_reader),
 ) -> Iterable[HueResourceResponse]:
     try:
-        lights = client.get_lights()
+        lights = reader.get_lights()
         return [HueResourceResponse.from_resource(light) for light in lights]
     except HueBridgeError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
 
+@app.get("/lights/{light_id}", response_model=HueResourceResponse)
+def get_light(
+    light_id: str,
+    reader: ResourceReader = Depends(get_reader),
+) -> HueResourceResponse:
+    try:
+        light = reader.get_resource("light", light_id)
+    except HueBridgeError as exc:
+        raise HTTPException(status_code=502, detail=str(exc)) from exc
+    if light is not None:
+        return HueResourceResponse.from_resource(light)
+    raise HTTPException(status_code=404, detail=f"Lampe '{light_id}' wurde nicht gefunden.")
+
+
 @app.post("/lights/{light_id}/state", status_code=204)
 def update_light_state(
     light_id: str,
     payload: LightStateRequest,
-    client: HueBridgeClient = Depends(get_client),
+    scheduler: CommandScheduler = Depends(get_scheduler),
 ) -> None:
+    color_xy: Optional[Tuple[float, float]] = None
+    if payload.xy is not None:
+        color_xy = (payload.xy[0], payload.xy[1])
+    if payload.rgb:
+        parsed = parse_rgb_string(payload.rgb)
+        if parsed is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Ungültiger RGB-Wert. Verwende #RRGGBB oder R,G,B mit 0-255.",
+            )
+        color_xy = rgb_to_xy(parsed)
+
+    temperature_mirek = payload.mirek
+    if temperature_mirek is None and payload.temperature is not None:
+        temperature_mirek = kelvin_to_mirek(payload.temperature)
+
     try:
-        client.set_light_state(
-            light_id,
+        body = light_state_body(
             on=payload.on,
             brightness=payload.brightness,
+            color_xy=color_xy,
+            temperature_mirek=temperature_mirek,
+            transition_ms=payload.transition,
         )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    _submit_command(scheduler, "light", light_id, body)
+
+
+def _submit_command(scheduler: CommandScheduler, rtype: str, rid: str, body: Dict[str, Any]) -> None:
+    """Send a state update through the bridge's rate-limited scheduler and wait for it."""
+
+    try:
+        scheduler.submit(rtype, rid, body).result(timeout=_COMMAND_TIMEOUT)
+    except FutureTimeoutError as exc:
+        raise HTTPException(
+            status_code=504,
+            detail="Der Befehl wurde nicht rechtzeitig an die Bridge übertragen.",
+        ) from exc
     except HueBridgeError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Runtime metrics of this process in the Prometheus text format."""
+
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/scheduler/stats")
+def scheduler_stats() -> Dict[str, Dict[str, int]]:
+    """Queue depth and coalescing counters of the per-bridge schedulers."""
+
+    return scheduler_registry.stats()
+
+
+def get_event_feed() -> EventFeed:
+    """Return the event feed, following the forwarder's event store on first use."""
+
+    global _feed_follower
+    if _forwarder is not None:
+        return event_feed  # fed directly by the embedded forwarder
+    with _feed_lock:
+        if _feed_follower is None:
+            _feed_follower = StoreFeedFollower(
+                event_feed,
+                runtime_state_path(),
+                interval=env_number("HUE_PLUGIN_EVENT_FEED_INTERVAL", 0.5),
+            )
+            _feed_follower.start()
+    return event_feed
+
+
+@app.get("/forwarder/stats")
+def forwarder_stats() -> Dict[str, object]:
+    """Stream health and counters of the embedded event forwarder."""
+
+    if _forwarder is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Der Event-Forwarder läuft nicht im API-Server (HUE_PLUGIN_EMBEDDED_FORWARDER).",
+        )
+    return {
+        "streams": _forwarder.stream_health(),
+        "events": _forwarder.event_stats(),
+        "delivery": _forwarder.delivery_stats(),
+        "outbox": _forwarder.outbox_stats(),
+        "latency": _forwarder.latency_stats(),
+    }
+
+
+# Both event endpoints are async: a waiting client must not hold one of the
+# threadpool threads that serve the synchronous endpoints.
+@app.get("/events")
+async def list_events(
+    after: Optional[int] = Query(default=None, description="Only events with a larger event_id"),
+    timeout: float = Query(default=0.0, ge=0.0, le=60.0, description="Long-poll wait in seconds"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    feed: EventFeed = Depends(get_event_feed),
+) -> Dict[str, object]:
+    if after is not None and timeout > 0:
+        events = await feed.wait_for_events_async(after, timeout, limit)
+    else:
+        events = feed.events_after(after, limit)
+    return {"events": events, "latest_event_id": feed.latest_id}
+
+
+@app.get("/events/stream")
+async def stream_events(
+    after: Optional[int] = Query(default=None, description="Only events with a larger event_id"),
+    last_event_id: Optional[str] = Header(default=None),
+    feed: EventFeed = Depends(get_event_feed),
+) -> StreamingResponse:
+    cursor = after
+    if last_event_id and last_event_id.strip().isdigit():
+        cursor = int(last_event_id.strip())
+    return StreamingResponse(
+        aiter_sse_messages(feed, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/scenes", response_model=list[HueResourceResponse])
 def list_scenes(
-    client: HueBridgeClient = Depends(get_client),
+    reader: ResourceReader = Depends(get_reader),
 ) -> Iterable[HueResourceResponse]:
     try:
-        scenes = client.get_scenes()
+        scenes = reader.get_scenes()
         return [HueResourceResponse.from_resource(scene) for scene in scenes]
     except HueBridgeError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
@@ -177,24 +537,48 @@ def list_scenes(
 def activate_scene(
     scene_id: str,
     payload: SceneActivationRequest,
+    scheduler: CommandScheduler = Depends(get_scheduler),
+) -> None:
+    body = scene_recall_body(
+        target_rid=payload.target_rid,
+        target_rtype=payload.target_rtype,
+        dynamics_duration=payload.transition or None,
+    )
+    _submit_command(scheduler, "scene", scene_id, body)
+
+
+@app.post("/scenes/{scene_id}/deactivate", status_code=204)
+def deactivate_scene(
+    scene_id: str,
+    payload: Optional[SceneDeactivationRequest] = Body(default=None),
     client: HueBridgeClient = Depends(get_client),
+    reader: ResourceReader = Depends(get_reader),
+    scheduler: CommandScheduler = Depends(get_scheduler),
 ) -> None:
+    payload = payload or SceneDeactivationRequest()
     try:
-        client.activate_scene(
+        topology = (
+            ResourceTopology(reader.get_all_resources())
+            if isinstance(reader, ResourceMirror) and not payload.target_rid
+            else None
+        )
+        grouped_light_id = client.scene_grouped_light_id(
             scene_id,
             target_rid=payload.target_rid,
             target_rtype=payload.target_rtype,
+            topology=topology,
         )
     except HueBridgeError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
+    _submit_command(scheduler, "grouped_light", grouped_light_id, grouped_light_state_body(on=False))
 
 
 @app.get("/rooms", response_model=list[HueResourceResponse])
 def list_rooms(
-    client: HueBridgeClient = Depends(get_client),
+    reader: ResourceReader = Depends(get_reader),
 ) -> Iterable[HueResourceResponse]:
     try:
-        rooms = client.get_rooms()
+        rooms = reader.get_rooms()
         return [HueResourceResponse.from_resource(room) for room in rooms]
     except HueBridgeError as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
@@ -260,6 +644,7 @@ def update_bridge_config(
             )
             plugin_config.bridges[index] = updated
             save_config(plugin_config)
+            _discard_bridge(bridge.id)
             return BridgeConfigResponse.from_config(updated)
 
     raise HTTPException(status_code=404, detail=f"Bridge '{bridge_id}' wurde nicht gefunden.")
@@ -281,3 +666,4 @@ def delete_bridge_config(bridge_id: str) -> None:
 
     plugin_config.bridges = remaining
     save_config(plugin_config)
+    _discard_bridge(bridge_id)
@@ -0,0 +1,144 @@
+"""Single-threaded timer scheduler for delayed deliveries.
+
+Replaces one ``threading.Timer`` (and thus one OS thread) per button press
+with a heap of deadlines served by one thread. Timers are identified by a
+key; scheduling a key that is still pending replaces the earlier timer.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def _log(message: str) -> None:
+    print(f"[hue-timer-scheduler] {message}", flush=True)
+
+
+class TimerScheduler:
+    """Heap-based one-shot timers executed on a shared background thread.
+
+    Callbacks run on the scheduler thread and must return quickly; the
+    forwarder only uses them to enqueue work on a delivery queue.
+    """
+
+    def __init__(
+        self,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        name: str = "hue-timer-scheduler",
+    ) -> None:
+        self._clock = clock
+        self._name = name
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._timers: Dict[Hashable, Tuple[int, float, Callable[[], None]]] = {}
+        self._sequence = itertools.count()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, int] = {
+            "scheduled": 0,
+            "rescheduled": 0,
+            "cancelled": 0,
+            "fired": 0,
+        }
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], None]) -> None:
+        """Run ``callback`` after ``delay`` seconds, replacing a pending ``key``."""
+
+        with self._condition:
+            if self._stopped:
+                return
+            if key in self._timers:
+                self._stats["rescheduled"] += 1
+            self._stats["scheduled"] += 1
+            sequence = next(self._sequence)
+            due = self._clock() + max(0.0, delay)
+            self._timers[key] = (sequence, due, callback)
+            heapq.heappush(self._heap, (due, sequence, key))
+            self._ensure_thread_locked()
+            self._condition.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Drop the pending timer of ``key``; ``False`` if none was pending."""
+
+        with self._condition:
+            if self._timers.pop(key, None) is None:
+                return False
+            self._stats["cancelled"] += 1
+            return True
+
+    def fire_now(self, key: Hashable) -> bool:
+        """Run the pending timer of ``key`` immediately in the calling thread."""
+
+        with self._condition:
+            current = self._timers.pop(key, None)
+            if current is None:
+                return False
+            self._stats["fired"] += 1
+        current[2]()
+        return True
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._timers)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            payload = dict(self._stats)
+            payload["pending"] = len(self._timers)
+        return payload
+
+    def stop(self) -> None:
+        """Stop the thread; pending timers are discarded."""
+
+        with self._condition:
+            self._stopped = True
+            self._timers.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+
+    def _ensure_thread_locked(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def _pop_due_locked(self) -> Tuple[List[Callable[[], None]], Optional[float]]:
+        now = self._clock()
+        due: List[Callable[[], None]] = []
+        while self._heap:
+            deadline, sequence, key = self._heap[0]
+            current = self._timers.get(key)
+            if current is None or current[0] != sequence:
+                # cancelled or rescheduled; drop the stale heap entry
+                heapq.heappop(self._heap)
+                continue
+            if deadline > now:
+                return due, deadline - now
+            heapq.heappop(self._heap)
+            del self._timers[key]
+            due.append(current[2])
+        return due, None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    callbacks, wait = self._pop_due_locked()
+                    if callbacks:
+                        self._stats["fired"] += len(callbacks)
+                        break
+                    self._condition.wait(timeout=wait)
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as exc:  # pragma: no cover - defensive, keeps thread alive
+                    _log(f"Zeitgesteuerte Aktion fehlgeschlagen: {exc}")
+
+
+__all__ = ["TimerScheduler"]
@@ -0,0 +1,154 @@
+"""Relationship index over a complete Hue resource listing."""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .hue_client import HueResource
+
+_GroupInfo = Dict[str, Optional[str]]
+
+
+def _references(value: Any) -> Iterable[Tuple[str, Optional[str]]]:
+    """Yield ``(rid, rtype)`` pairs from a Hue resource identifier list."""
+
+    if not isinstance(value, list):
+        return
+    for item in value:
+        if not isinstance(item, dict):
+            continue
+        rid = item.get("rid")
+        if isinstance(rid, str):
+            rtype = item.get("rtype")
+            yield rid, rtype if isinstance(rtype, str) else None
+
+
+def _add_unique(
+    index: Dict[str, List[_GroupInfo]],
+    seen: set[Tuple[str, str]],
+    key: str,
+    info: _GroupInfo,
+) -> None:
+    marker = (key, str(info["id"]))
+    if marker in seen:
+        return
+    seen.add(marker)
+    index[key].append(info)
+
+
+class ResourceTopology:
+    """Adjacency index built from one ``GET /clip/v2/resource`` response.
+
+    Resolves light ↔ room/zone membership, the lights used by scenes, the
+    group of a scene, the owning device of a service and the grouped_light
+    of a room or zone with dictionary lookups only.
+    """
+
+    def __init__(self, resources: Iterable[HueResource]) -> None:
+        self._by_id: Dict[str, HueResource] = {}
+        self._by_type: Dict[str, List[HueResource]] = defaultdict(list)
+        for resource in resources:
+            if not resource.id:
+                continue
+            self._by_id[resource.id] = resource
+            self._by_type[resource.type].append(resource)
+
+        self._light_groups: Dict[str, Dict[str, List[_GroupInfo]]] = {
+            "room": defaultdict(list),
+            "zone": defaultdict(list),
+        }
+        self._light_scenes: Dict[str, List[_GroupInfo]] = defaultdict(list)
+        self._grouped_lights: Dict[str, List[Tuple[Optional[str], str]]] = defaultdict(list)
+        self._build()
+
+    def _build(self) -> None:
+        seen: set[Tuple[str, str]] = set()
+        for group_type, index in self._light_groups.items():
+            for group in self._by_type.get(group_type, []):
+                info = {"id": group.id, "name": self.name(group.id)}
+                for rid, rtype in [
+                    *_references(group.data.get("children")),
+                    *_references(group.data.get("services")),
+                ]:
+                    if rtype == "light":
+                        _add_unique(index, seen, rid, info)
+                    elif rtype == "device":
+                        device = self._by_id.get(rid)
+                        if device is None:
+                            continue
+                        for service_rid, service_rtype in _references(device.data.get("services")):
+                            if service_rtype == "light":
+                                _add_unique(index, seen, service_rid, info)
+
+        for scene in self._by_type.get("scene", []):
+            info = {"id": scene.id, "name": self.name(scene.id)}
+            actions = scene.data.get("actions")
+            if not isinstance(actions, list):
+                continue
+            targets = (action.get("target") for action in actions if isinstance(action, dict))
+            for rid, rtype in _references(list(targets)):
+                if rtype == "light":
+                    _add_unique(self._light_scenes, seen, rid, info)
+
+        for grouped in self._by_type.get("grouped_light", []):
+            owner = grouped.data.get("owner")
+            for rid, rtype in _references([owner]):
+                self._grouped_lights[rid].append((rtype, grouped.id))
+
+    # -- lookups ---------------------------------------------------------------------
+    def resources(self, rtype: str) -> List[HueResource]:
+        return list(self._by_type.get(rtype, []))
+
+    def get(self, rid: str) -> Optional[HueResource]:
+        return self._by_id.get(rid)
+
+    def name(self, rid: str) -> Optional[str]:
+        resource = self._by_id.get(rid)
+        if resource is None:
+            return None
+        name = resource.metadata.get("name")
+        return name if isinstance(name, str) else None
+
+    def rooms_for_light(self, light_id: str) -> List[_GroupInfo]:
+        return list(self._light_groups["room"].get(light_id, []))
+
+    def zones_for_light(self, light_id: str) -> List[_GroupInfo]:
+        return list(self._light_groups["zone"].get(light_id, []))
+
+    def scenes_for_light(self, light_id: str) -> List[_GroupInfo]:
+        return list(self._light_scenes.get(light_id, []))
+
+    def scene_group(self, scene_id: str) -> Optional[Dict[str, Any]]:
+        """Return ``rid``/``rtype``/``name`` of the room or zone of a scene."""
+
+        scene = self._by_id.get(scene_id)
+        if scene is None:
+            return None
+        for rid, rtype in _references([scene.data.get("group")]):
+            group = self._by_id.get(rid)
+            return {
+                "rid": rid,
+                "rtype": group.type if group is not None else rtype,
+                "name": self.name(rid),
+            }
+        return None
+
+    def owner(self, rid: str) -> Optional[HueResource]:
+        """Return the owning resource (usually the device) of a service."""
+
+        resource = self._by_id.get(rid)
+        if resource is None:
+            return None
+        for owner_rid, _ in _references([resource.data.get("owner")]):
+            return self._by_id.get(owner_rid)
+        return None
+
+    def grouped_light_for(self, owner_rid: str, owner_rtype: Optional[str] = None) -> Optional[str]:
+        for rtype, grouped_id in self._grouped_lights.get(owner_rid, []):
+            if owner_rtype and rtype != owner_rtype:
+                continue
+            return grouped_id
+        return None
+
+
+__all__ = ["ResourceTopology"]
@@ -5,6 +5,7 @@ from argparse import Namespace
 import pytest
 
 from hue_plugin import cli
+from hue_plugin.color import rgb_to_xy
 from hue_plugin.hue_client import HueResource
 
 
@@ -76,6 +77,9 @@ def test_cli_list_lights_includes_relationships(monkeypatch, tmp_path, capsys):
         def get_motion_sensors(self):  # pragma: no cover - not used in this test
             return []
 
+        def get_all_resources(self):
+            return [*self.get_lights(), *self.get_rooms(), *self.get_scenes()]
+
     monkeypatch.setattr(cli, "HueBridgeClient", DummyClient)
 
     exit_code = cli.main([
@@ -136,6 +140,9 @@ def test_cli_list_scenes_includes_group(monkeypatch, tmp_path, capsys):
         def get_motion_sensors(self):  # pragma: no cover - not used in this test
             return []
 
+        def get_all_resources(self):
+            return [*self.get_scenes(), *self.get_rooms(), *self.get_zones()]
+
     monkeypatch.setattr(cli, "HueBridgeClient", DummyClient)
 
     exit_code = cli.main([
@@ -200,6 +207,9 @@ def test_cli_list_buttons_includes_device(monkeypatch, tmp_path, capsys):
         def get_motion_sensors(self):  # pragma: no cover - not used in this test
             return []
 
+        def get_all_resources(self):
+            return [*self.get_buttons(), *self.get_devices()]
+
     monkeypatch.setattr(cli, "HueBridgeClient", DummyClient)
 
     exit_code = cli.main([
@@ -256,6 +266,9 @@ def test_cli_list_motions_reports_state(monkeypatch, tmp_path, capsys):
         def get_buttons(self):  # pragma: no cover - not used in this test
             return []
 
+        def get_all_resources(self):
+            return self.get_motion_sensors()
+
     monkeypatch.setattr(cli, "HueBridgeClient", DummyClient)
 
     exit_code = cli.main([
@@ -351,7 +364,7 @@ def test_cli_light_command_with_color(monkeypatch, tmp_path):
     assert brightness_value is None
     assert transition_ms == 150
     assert temperature_mirek == pytest.approx(int(round(1_000_000 / 2700)))
-    assert color_xy == pytest.approx(cli._rgb_to_xy((255, 0, 0)))
+    assert color_xy == pytest.approx(rgb_to_xy((255, 0, 0)))
 
 
 def test_cli_scene_command(monkeypatch, tmp_path):
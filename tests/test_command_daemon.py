@@ -0,0 +1,147 @@
+import json
+import threading
+
+import pytest
+
+from hue_plugin import cli, command_daemon
+
+
+def write_config(tmp_path):
+    data = {
+        "bridges": [
+            {
+                "id": "bridge-1",
+                "name": "Bridge",
+                "bridge_ip": "1.2.3.4",
+                "application_key": "key",
+                "use_https": False,
+                "verify_tls": False,
+            }
+        ]
+    }
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+@pytest.fixture()
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_client_pool", None)
+    monkeypatch.setattr(cli, "_mirror_registry", None)
+    monkeypatch.setattr(cli, "_scheduler_registry", None)
+    server = command_daemon.CommandDaemon(tmp_path / "hue.sock")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5.0)
+
+
+def test_daemon_reuses_client_between_commands(monkeypatch, tmp_path, daemon):
+    config_path = write_config(tmp_path)
+    created = []
+    calls = []
+
+    class DummyClient:
+        def __init__(self, config):
+            created.append(config.id)
+
+        def update_resource(self, rtype, rid, body):
+            calls.append((rid, body["dimming"]["brightness"]))
+
+    monkeypatch.setattr(cli, "HueBridgeClient", DummyClient)
+
+    for brightness in (10, 20):
+        result = command_daemon.send_command(
+            [
+                "--config",
+                str(config_path),
+                "light-command",
+                "--light-id",
+                "light-1",
+                "--brightness",
+                str(brightness),
+            ],
+            daemon.socket_path,
+        )
+        assert result == {"ok": True}
+
+    assert calls == [("light-1", 10), ("light-1", 20)]
+    assert created == ["bridge-1"]
+
+
+def test_daemon_reports_command_errors(tmp_path, daemon):
+    config_path = write_config(tmp_path)
+
+    with pytest.raises(SystemExit) as excinfo:
+        command_daemon.send_command(
+            ["--config", str(config_path), "test-connection", "--bridge-id", "missing"],
+            daemon.socket_path,
+        )
+
+    assert "missing" in str(excinfo.value)
+
+
+def test_daemon_rejects_invalid_arguments(daemon):
+    response = command_daemon.execute_command(["light-command"])
+    assert response["ok"] is False
+    assert "--light-id" in response["error"]
+
+
+def test_send_command_without_daemon(tmp_path):
+    with pytest.raises(command_daemon.CommandDaemonUnavailable):
+        command_daemon.send_command(["clear-virtual-events"], tmp_path / "missing.sock")
+
+
+def test_cli_via_daemon_falls_back_to_local(monkeypatch, tmp_path, capsys):
+    config_path = write_config(tmp_path)
+    monkeypatch.setenv("HUE_PLUGIN_COMMAND_SOCKET", str(tmp_path / "missing.sock"))
+    calls = []
+
+    class DummyClient:
+        def __init__(self, config):
+            pass
+
+        def set_light_state(self, light_id, **kwargs):
+            calls.append(light_id)
+
+    monkeypatch.setattr(cli, "HueBridgeClient", DummyClient)
+
+    exit_code = cli.main(
+        ["--config", str(config_path), "--via-daemon", "light-command", "--light-id", "l1", "--on"]
+    )
+
+    assert exit_code == 0
+    assert json.loads(capsys.readouterr().out) == {"ok": True}
+    assert calls == ["l1"]
+
+
+def test_daemon_uses_socket_and_config_of_its_config_file(monkeypatch, tmp_path):
+    from hue_plugin.config import command_socket_path
+
+    config_path = write_config(tmp_path)
+    monkeypatch.delenv("HUE_PLUGIN_COMMAND_SOCKET", raising=False)
+    monkeypatch.delenv("HUE_PLUGIN_CONFIG", raising=False)
+    monkeypatch.setattr(cli, "_client_pool", None)
+    monkeypatch.setattr(cli, "_mirror_registry", None)
+    monkeypatch.setattr(cli, "_scheduler_registry", None)
+    server = command_daemon.CommandDaemon(command_socket_path(config_path), config=config_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # the client resolves the socket from --config like the daemon does
+        with pytest.raises(SystemExit) as excinfo:
+            command_daemon.send_command(
+                ["test-connection", "--bridge-id", "missing"], command_socket_path(config_path)
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5.0)
+
+    # the daemon's configuration was used although argv named none
+    assert "missing" in str(excinfo.value)
+    assert server.socket_path == tmp_path / "hue_commands.sock"
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from hue_plugin.command_scheduler import CommandScheduler, TokenBucket, merge_state_body
+from hue_plugin.hue_client import HueBridgeError
+
+
+class BlockingClient:
+    def __init__(self) -> None:
+        self.sent = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def update_resource(self, rtype, rid, body):
+        self.started.set()
+        self.release.wait(timeout=5.0)
+        self.sent.append((rtype, rid, body))
+
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    bucket = TokenBucket(2.0, burst=1.0, clock=lambda: now[0])
+
+    assert bucket.delay() == 0.0
+    bucket.take()
+    assert bucket.delay() == pytest.approx(0.5)
+
+    now[0] = 0.5
+    assert bucket.delay() == 0.0
+
+
+def test_scheduler_coalesces_pending_updates():
+    client = BlockingClient()
+    scheduler = CommandScheduler(client, light_rate=100.0)
+    try:
+        first = scheduler.submit("light", "light-1", {"on": {"on": True}})
+        assert client.started.wait(timeout=5.0)
+
+        second = scheduler.submit("light", "light-1", {"dimming": {"brightness": 10}})
+        third = scheduler.submit("light", "light-1", {"dimming": {"brightness": 40}})
+        assert second is third
+        assert scheduler.stats()["queue_depth"] == 1
+
+        client.release.set()
+        first.result(timeout=5.0)
+        third.result(timeout=5.0)
+    finally:
+        scheduler.stop()
+
+    assert client.sent == [
+        ("light", "light-1", {"on": {"on": True}}),
+        ("light", "light-1", {"dimming": {"brightness": 40}}),
+    ]
+    stats = scheduler.stats()
+    assert stats["coalesced"] == 1
+    assert stats["sent"] == 2
+    assert stats["submitted"] == 3
+
+
+def test_scheduler_propagates_bridge_errors():
+    class FailingClient:
+        def update_resource(self, rtype, rid, body):
+            raise HueBridgeError("boom")
+
+    scheduler = CommandScheduler(FailingClient())
+    try:
+        future = scheduler.submit("grouped_light", "group-1", {"on": {"on": False}})
+        with pytest.raises(HueBridgeError):
+            future.result(timeout=5.0)
+    finally:
+        scheduler.stop()
+
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_scheduler_keeps_submission_order_across_buckets():
+    class RecordingClient:
+        def __init__(self) -> None:
+            self.sent = []
+
+        def update_resource(self, rtype, rid, body):
+            self.sent.append((rtype, rid, body))
+
+    now = [0.0]
+    client = RecordingClient()
+    scheduler = CommandScheduler(client, light_rate=10.0, group_rate=1.0, clock=lambda: now[0])
+    try:
+        scheduler.submit("scene", "scene-0", {"recall": {"action": "active"}}).result(timeout=5.0)
+        before = scheduler.submit("light", "light-1", {"on": {"on": False}})
+        scene = scheduler.submit("scene", "scene-1", {"recall": {"action": "active"}})
+        light = scheduler.submit("light", "light-1", {"on": {"on": True}})
+        before.result(timeout=5.0)
+
+        # the scene waits for the group bucket and the later light waits behind it
+        assert not scene.done()
+        assert not light.done()
+
+        now[0] = 1.0
+        light.result(timeout=5.0)
+    finally:
+        scheduler.stop()
+
+    # the light update after the scene is neither merged into the earlier one nor overtakes the scene
+    assert [entry[:2] for entry in client.sent] == [
+        ("scene", "scene-0"),
+        ("light", "light-1"),
+        ("scene", "scene-1"),
+        ("light", "light-1"),
+    ]
+    assert client.sent[-1][2] == {"on": {"on": True}}
+
+
+def test_merge_state_body_keeps_newest_colour_mode():
+    colour = {"color": {"xy": {"x": 0.3, "y": 0.3}}, "dimming": {"brightness": 50}}
+    temperature = {"color_temperature": {"mirek": 300}}
+
+    assert merge_state_body(colour, temperature) == {
+        "color_temperature": {"mirek": 300},
+        "dimming": {"brightness": 50},
+    }
+    assert merge_state_body(temperature, colour) == colour
+    assert merge_state_body(colour, {"dimming": {"brightness": 10}}) == {
+        "color": {"xy": {"x": 0.3, "y": 0.3}},
+        "dimming": {"brightness": 10},
+    }
@@ -1,5 +1,7 @@
+from dataclasses import FrozenInstanceError
 from pathlib import Path
 import json
+import os
 
 import pytest
 
@@ -12,6 +14,7 @@ from hue_plugin.config import (
     ensure_bridge_id,
     ensure_virtual_input_id,
     load_config,
+    load_config_snapshot,
     save_config,
 )
 
@@ -198,6 +201,71 @@ def test_save_config_roundtrip(tmp_path: Path) -> None:
     assert loaded.virtual_inputs[0].virtual_input == "VirtInput"
 
 
+def test_config_snapshot_is_cached_until_file_changes(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.1", "application_key": "k"}]})
+
+    first = load_config_snapshot(config_path)
+    assert load_config_snapshot(config_path) is first
+
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.2", "application_key": "k"}]})
+    second = load_config_snapshot(config_path)
+    assert second.generation != first.generation
+    assert second.config.default_bridge.bridge_ip == "10.0.0.2"
+
+
+def test_config_snapshot_detects_same_size_rewrite(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.1", "application_key": "k"}]})
+    first = load_config_snapshot(config_path)
+
+    stat_before = config_path.stat()
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.9", "application_key": "k"}]})
+    os.utime(config_path, ns=(stat_before.st_atime_ns, stat_before.st_mtime_ns))
+
+    second = load_config_snapshot(config_path)
+    assert second.generation != first.generation
+    assert second.config.default_bridge.bridge_ip == "10.0.0.9"
+
+
+def test_load_config_returns_private_copy(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.1", "application_key": "k"}]})
+
+    config = load_config(config_path)
+    config.bridges.clear()
+
+    assert load_config_snapshot(config_path).config.bridges
+
+
+def test_config_snapshot_is_frozen(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.1", "application_key": "k"}]})
+
+    snapshot = load_config_snapshot(config_path)
+    with pytest.raises(FrozenInstanceError):
+        snapshot.config.default_bridge.bridge_ip = "10.0.0.2"
+    with pytest.raises(AttributeError):
+        snapshot.config.bridges.append(snapshot.config.default_bridge)
+    assert isinstance(snapshot.config.bridges, tuple)
+    assert load_config(config_path) == snapshot.config
+
+
+def test_save_config_updates_snapshot(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.json"
+    _write(config_path, {"bridges": [{"id": "a", "bridge_ip": "10.0.0.1", "application_key": "k"}]})
+    before = load_config_snapshot(config_path)
+
+    config = load_config(config_path)
+    config.bridges[0].bridge_ip = "10.0.0.3"
+    save_config(config, config_path)
+    config.bridges[0].bridge_ip = "changed-after-save"
+
+    after = load_config_snapshot(config_path)
+    assert after.generation > before.generation
+    assert after.config.default_bridge.bridge_ip == "10.0.0.3"
+
+
 def test_ensure_bridge_id_generates_unique_values() -> None:
     existing = {"default", "default-1"}
     new_id = ensure_bridge_id("Default", existing_ids=existing)
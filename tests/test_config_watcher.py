@@ -0,0 +1,126 @@
+from dataclasses import replace
+from pathlib import Path
+import threading
+import time
+
+import pytest
+
+from hue_plugin import event_forwarder
+from hue_plugin.config import HueBridgeConfig, PluginConfig, VirtualInputConfig, save_config
+from hue_plugin.config_watcher import ConfigWatcher, bridge_assignments, diff_bridge_assignments
+
+
+def _config(*bridges: HueBridgeConfig, mappings=()) -> PluginConfig:
+    return PluginConfig(bridges=list(bridges), virtual_inputs=list(mappings))
+
+
+def _bridge(bridge_id: str, ip: str = "192.0.2.1", name=None) -> HueBridgeConfig:
+    return HueBridgeConfig(id=bridge_id, bridge_ip=ip, application_key="abc", name=name)
+
+
+def _mapping(mapping_id: str, bridge_id: str, virtual_input: str = "VI") -> VirtualInputConfig:
+    return VirtualInputConfig(
+        id=mapping_id,
+        bridge_id=bridge_id,
+        resource_id=f"rid-{mapping_id}",
+        resource_type="button",
+        virtual_input=virtual_input,
+    )
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_wakes_up_after_save(tmp_path: Path, use_inotify: bool) -> None:
+    path = tmp_path / "config.json"
+    save_config(_config(_bridge("a")), path)
+    watcher = ConfigWatcher(path, poll_interval=0.02, use_inotify=use_inotify)
+    if use_inotify and watcher.mode != "inotify":
+        pytest.skip("inotify not available")
+
+    (tmp_path / "other.json").write_text("{}")
+    assert not watcher.wait(0.1)
+
+    timer = threading.Timer(0.05, save_config, args=(_config(_bridge("b")), path))
+    timer.start()
+    started = time.monotonic()
+    assert watcher.wait(5.0)
+    assert time.monotonic() - started < 1.0
+    timer.join()
+    watcher.close()
+
+
+def test_watcher_close_ends_wait(tmp_path: Path) -> None:
+    watcher = ConfigWatcher(tmp_path / "config.json")
+    threading.Timer(0.05, watcher.close).start()
+    started = time.monotonic()
+
+    assert not watcher.wait(5.0)
+    assert time.monotonic() - started < 1.0
+
+
+def test_diff_bridge_assignments() -> None:
+    previous = bridge_assignments(
+        _config(
+            _bridge("keep"),
+            _bridge("move"),
+            _bridge("rename"),
+            _bridge("remap"),
+            _bridge("drop"),
+            mappings=[_mapping(name, name) for name in ("keep", "move", "rename", "remap", "drop")],
+        )
+    )
+    current = bridge_assignments(
+        _config(
+            _bridge("keep"),
+            _bridge("move", ip="192.0.2.99"),
+            _bridge("rename", name="Wohnzimmer"),
+            _bridge("remap"),
+            _bridge("drop"),
+            _bridge("new"),
+            mappings=[
+                _mapping("keep", "keep"),
+                _mapping("move", "move"),
+                _mapping("rename", "rename"),
+                _mapping("remap", "remap", virtual_input="VI.Other"),
+                _mapping("new", "new"),
+            ],
+        )
+    )
+
+    changes = diff_bridge_assignments(previous, current)
+
+    assert changes.added == ("new",)
+    assert changes.removed == ("drop",)
+    assert changes.reconnect == ("move",)
+    assert changes.updated == ("rename", "remap")
+    assert not diff_bridge_assignments(current, current)
+
+
+def test_forwarder_only_touches_changed_bridges(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("HUE_PLUGIN_CONFIG", str(tmp_path / "config.json"))
+    monkeypatch.setattr(event_forwarder.BridgeWorker, "start", lambda self: None)
+    monkeypatch.setattr(event_forwarder.BridgeWorker, "join", lambda self, timeout=None: None)
+    updates: list[str] = []
+    original = event_forwarder.BridgeWorker.update_mappings
+
+    def recording_update(self, mappings):
+        updates.append(self.bridge_id)
+        original(self, mappings)
+
+    monkeypatch.setattr(event_forwarder.BridgeWorker, "update_mappings", recording_update)
+    forwarder = event_forwarder.HueEventForwarder(outbox=False)
+    config = _config(_bridge("a"), _bridge("b"), mappings=[_mapping("a1", "a"), _mapping("b1", "b")])
+    try:
+        forwarder._sync_workers(config)
+        workers = dict(forwarder._workers)
+        assert sorted(updates) == ["a", "b"]
+
+        updates.clear()
+        forwarder._sync_workers(replace(config))
+        assert updates == []
+
+        changed = replace(config, virtual_inputs=[_mapping("a1", "a"), _mapping("b1", "b", "VI.New")])
+        forwarder._sync_workers(changed)
+        assert updates == ["b"]
+        assert forwarder._workers == workers
+    finally:
+        forwarder.stop()
@@ -0,0 +1,59 @@
+import pytest
+
+from hue_plugin.config import VirtualInputConfig
+from hue_plugin.delivery_filter import DEFER, DROP, HOLD, SEND, DeliveryFilter
+
+
+def motion_mapping(**overrides):
+    values = dict(
+        id="motion-1",
+        bridge_id="bridge-1",
+        resource_id="rid-motion",
+        resource_type="motion",
+        virtual_input="VI.Motion",
+        inactive_value="0",
+    )
+    values.update(overrides)
+    return VirtualInputConfig(**values)
+
+
+def test_delivery_filter_suppresses_duplicates_and_limits_rate():
+    now = [0.0]
+    delivery_filter = DeliveryFilter(clock=lambda: now[0])
+    mapping = motion_mapping(dedup_window_ms=1000, min_interval_ms=200)
+
+    assert delivery_filter.offer(mapping, "1") == (SEND, 0.0)
+    now[0] = 0.1
+    assert delivery_filter.offer(mapping, "1") == (DROP, 0.0)
+    action, delay = delivery_filter.offer(mapping, "0", "first")
+    assert action == DEFER and delay == pytest.approx(0.1)
+    # only the latest value is sent on the trailing edge
+    assert delivery_filter.offer(mapping, "1", "second") == (HOLD, 0.0)
+    assert delivery_filter.offer(mapping, "0", "third") == (HOLD, 0.0)
+    now[0] = 0.2
+    assert delivery_filter.take_pending(mapping) == ("0", "third")
+    assert delivery_filter.take_pending(mapping) is None
+    now[0] = 1.5
+    assert delivery_filter.offer(motion_mapping(), "1") == (SEND, 0.0)
+    assert delivery_filter.offer(mapping, "0") == (SEND, 0.0)
+
+    assert delivery_filter.counters("motion-1") == {"forwarded": 3, "suppressed": 3}
+    assert delivery_filter.stats() == {"motion-1": {"forwarded": 3, "suppressed": 3, "pending": 0}}
+
+
+def test_delivery_filter_forgets_failed_send():
+    now = [0.0]
+    delivery_filter = DeliveryFilter(clock=lambda: now[0])
+    mapping = motion_mapping(dedup_window_ms=1000, min_interval_ms=200)
+
+    assert delivery_filter.offer(mapping, "1") == (SEND, 0.0)
+    now[0] = 1.5
+    assert delivery_filter.offer(mapping, "0") == (SEND, 0.0)
+    delivery_filter.send_failed(mapping, "0")
+    now[0] = 1.6
+    # neither the dedup window nor the interval holds back the retry
+    assert delivery_filter.offer(mapping, "0") == (SEND, 0.0)
+    now[0] = 1.7
+    assert delivery_filter.offer(mapping, "0") == (DROP, 0.0)
+
+    assert delivery_filter.counters("motion-1") == {"forwarded": 2, "suppressed": 1}
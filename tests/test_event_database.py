@@ -0,0 +1,119 @@
+from argparse import Namespace
+from datetime import date
+
+from hue_plugin import cli, event_database
+from hue_plugin.config import VirtualInputConfig
+from hue_plugin.event_database import SQLiteEventStore, event_database_path
+from hue_plugin.event_forwarder import load_event_state, open_event_store
+
+
+def _mapping(mapping_id: str = "vi-1") -> VirtualInputConfig:
+    return VirtualInputConfig(
+        id=mapping_id,
+        bridge_id="bridge-1",
+        resource_id="rid-1",
+        resource_type="button",
+        virtual_input="VI.Button",
+    )
+
+
+def _insert(store: SQLiteEventStore, event_id: int, timestamp: str, mapping_id: str = "vi-1") -> None:
+    event = {
+        "event_id": event_id,
+        "timestamp": timestamp,
+        "mapping_id": mapping_id,
+        "state": "active",
+        "value": str(event_id),
+    }
+    with store._lock:
+        store._insert_locked([event])
+
+
+def test_sqlite_store_queries_with_filters(tmp_path):
+    store = SQLiteEventStore(tmp_path / "events.sqlite3")
+    _insert(store, 1, "2023-01-01T12:00:00+00:00")
+    _insert(store, 2, "2023-02-01T12:00:00+00:00")
+    _insert(store, 3, "2023-02-01T13:00:00+00:00", mapping_id="vi-2")
+    _insert(store, 4, "2023-02-02T12:00:00+00:00")
+
+    result = store.query_events(on_date=date(2023, 2, 1))
+    assert [event["event_id"] for event in result["events"]] == [3, 2]
+    assert result["total_filtered"] == 2
+    assert result["latest_event_id"] == 3
+
+    page = store.query_events(before=4, limit=2)
+    assert [event["event_id"] for event in page["events"]] == [3, 2]
+    assert page["total_filtered"] == 3
+
+    assert [event["event_id"] for event in store.query_events(after=2)["events"]] == [4, 3]
+    assert store.available_dates() == ["2023-02-02", "2023-02-01", "2023-01-01"]
+    assert store.states()["vi-1"]["event_id"] == 4
+    assert store.states()["vi-2"]["event_id"] == 3
+    store.close()
+
+
+def test_sqlite_store_records_and_trims(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_database, "_TRIM_INTERVAL", 1)
+    store = SQLiteEventStore(tmp_path / "events.sqlite3", max_events=2)
+    for value in ("1", "0", "1"):
+        store.record(_mapping(), event_type="button", state="active", value=value)
+
+    result = store.query_events()
+    assert [event["value"] for event in result["events"]] == ["1", "0"]
+    ids = [event["event_id"] for event in result["events"]]
+    assert ids == sorted(ids, reverse=True)
+
+    store.clear()
+    assert store.query_events()["total_filtered"] == 0
+    assert store.states() == {}
+    store.close()
+
+
+def test_cli_reads_events_from_database(tmp_path, monkeypatch):
+    monkeypatch.setenv("HUE_PLUGIN_EVENT_STORE", "sqlite")
+    config_path = tmp_path / "config.json"
+    config_path.write_text("{}")
+    state_path = tmp_path / "runtime_state.json"
+
+    store = open_event_store(state_path)
+    assert isinstance(store, SQLiteEventStore)
+    _insert(store, 1, "2023-01-01T12:00:00+00:00")
+    _insert(store, 2, "2023-02-01T12:00:00+00:00")
+    _insert(store, 3, "2023-02-01T13:00:00+00:00")
+    store.close()
+    assert event_database_path(state_path).exists()
+
+    args = Namespace(config=str(config_path), limit=1, date="2023-02-01", before=None, after=None)
+    result = cli.command_virtual_input_events(args)
+
+    assert [event["event_id"] for event in result["events"]] == [3]
+    assert result["states"]["vi-1"]["event_id"] == 3
+    metadata = result["metadata"]
+    assert metadata["has_more"] is True
+    assert metadata["next_before"] == 3
+    assert metadata["total_filtered"] == 2
+    assert metadata["latest_event_id"] == 3
+    assert metadata["available_dates"] == ["2023-02-01", "2023-01-01"]
+
+    assert [event["event_id"] for event in load_event_state(state_path)["events"]] == [1, 2, 3]
+
+    assert cli.command_clear_virtual_events(Namespace(config=str(config_path))) == {"ok": True}
+    assert load_event_state(state_path) == {"events": [], "states": {}}
+
+
+def test_sqlite_store_write_behind(tmp_path):
+    store = SQLiteEventStore(tmp_path / "events.sqlite3", flush_interval_ms=60_000, flush_batch=100)
+    for value in ("1", "0"):
+        store.record(_mapping(), event_type="button", state="active", value=value)
+    assert store.query_events()["total_filtered"] == 0
+
+    store.flush()
+    assert store.query_events()["total_filtered"] == 2
+    assert store.flush_stats()["last_batch_size"] == 2
+
+    store.record(_mapping(), event_type="button", state="active", value="1")
+    store.close()
+
+    reopened = SQLiteEventStore(tmp_path / "events.sqlite3")
+    assert reopened.query_events()["total_filtered"] == 3
+    reopened.close()
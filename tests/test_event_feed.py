@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from hue_plugin.config import VirtualInputConfig
+from hue_plugin.event_feed import EventFeed, StoreFeedFollower, aiter_sse_messages, iter_sse_messages
+from hue_plugin.event_forwarder import EventStateStore
+
+
+def _mapping() -> VirtualInputConfig:
+    return VirtualInputConfig(
+        id="button-1",
+        bridge_id="bridge-1",
+        resource_id="rid-1",
+        resource_type="button",
+        virtual_input="VI.Button",
+    )
+
+
+def test_feed_waits_for_newer_events():
+    feed = EventFeed(capacity=3)
+    feed.publish([{"event_id": 1}])
+
+    timer = threading.Timer(0.05, feed.publish, args=([{"event_id": 2}, {"event_id": 1}],))
+    timer.start()
+    events = feed.wait_for_events(1, timeout=5.0)
+    timer.join()
+
+    assert events == [{"event_id": 2}]
+    assert feed.wait_for_events(2, timeout=0.01) == []
+    feed.publish([{"event_id": 3}, {"event_id": 4}])
+    assert [event["event_id"] for event in feed.events_after(None)] == [2, 3, 4]
+    assert [event["event_id"] for event in feed.events_after(None, limit=1)] == [4]
+
+
+def test_follower_tails_journal_across_compaction(tmp_path):
+    path = tmp_path / "state.json"
+    store = EventStateStore(path, compact_every=3)
+    feed = EventFeed()
+    follower = StoreFeedFollower(feed, path)
+
+    store.record(_mapping(), event_type="button", state="active", value="1")
+    follower.poll()
+    assert [event["value"] for event in feed.events_after(None)] == ["1"]
+
+    for value in ("2", "3", "4"):
+        store.record(_mapping(), event_type="button", state="active", value=value)
+        follower.poll()
+    store.record(_mapping(), event_type="button", state="active", value="5")
+    follower.poll()
+
+    assert [event["value"] for event in feed.events_after(None)] == ["1", "2", "3", "4", "5"]
+    follower.stop()
+
+
+def test_sse_messages_use_event_id_cursor():
+    feed = EventFeed()
+    feed.publish([{"event_id": 5, "value": "1"}, {"event_id": 6, "value": "0"}])
+
+    messages = iter_sse_messages(feed, 5, heartbeat=0.01)
+    assert next(messages).startswith("retry:")
+    assert next(messages) == 'id: 6\nevent: virtual-input\ndata: {"event_id":6,"value":"0"}\n\n'
+    assert next(messages) == ": keep-alive\n\n"
+
+
+def test_feed_async_wait_is_woken_from_other_threads():
+    feed = EventFeed()
+    feed.publish([{"event_id": 1}])
+
+    async def scenario():
+        timer = threading.Timer(0.05, feed.publish, args=([{"event_id": 2}],))
+        timer.start()
+        events = await feed.wait_for_events_async(1, timeout=5.0)
+        timer.join()
+        empty = await feed.wait_for_events_async(2, timeout=0.01)
+        messages = aiter_sse_messages(feed, 1, heartbeat=0.01)
+        streamed = [await messages.__anext__() for _ in range(3)]
+        await messages.aclose()
+        return events, empty, streamed
+
+    events, empty, streamed = asyncio.run(scenario())
+
+    assert events == [{"event_id": 2}]
+    assert empty == []
+    assert streamed[0].startswith("retry:")
+    assert streamed[1] == 'id: 2\nevent: virtual-input\ndata: {"event_id":2}\n\n'
+    assert streamed[2] == ": keep-alive\n\n"
+    assert feed._waiters == []
@@ -6,7 +6,7 @@ import responses
 import requests
 
 from hue_plugin.config import HueBridgeConfig
-from hue_plugin.hue_client import HueBridgeClient, HueBridgeError
+from hue_plugin.hue_client import HueBridgeClient, HueBridgeError, HueClientPool, ResourceIdFilter, SSEParser
 
 
 @pytest.fixture()
@@ -262,3 +262,150 @@ def test_get_lights_request_error(monkeypatch: pytest.MonkeyPatch, client: HueBr
         list(client.get_lights())
 
     assert "Verbindung zur Hue Bridge" in str(excinfo.value)
+
+
+def test_client_pool_reuses_and_rebuilds_clients() -> None:
+    created = []
+
+    class DummyClient:
+        def __init__(self, config: HueBridgeConfig) -> None:
+            self.config = config
+            self.closed = False
+            created.append(self)
+
+        def close(self) -> None:
+            self.closed = True
+
+    now = [0.0]
+    pool = HueClientPool(factory=DummyClient, idle_timeout=60.0, clock=lambda: now[0])
+    config = HueBridgeConfig(id="b1", bridge_ip="1.2.3.4", application_key="key")
+
+    first = pool.get(config)
+    assert pool.get(HueBridgeConfig(id="b1", bridge_ip="1.2.3.4", application_key="key")) is first
+
+    changed = pool.get(HueBridgeConfig(id="b1", bridge_ip="1.2.3.5", application_key="key"))
+    assert changed is not first
+    assert first.closed is True
+
+    now[0] = 120.0
+    rebuilt = pool.get(HueBridgeConfig(id="b1", bridge_ip="1.2.3.5", application_key="key"))
+    assert rebuilt is not changed
+    assert changed.closed is True
+
+    pool.discard("b1")
+    assert rebuilt.closed is True
+    assert len(pool) == 0
+    assert len(created) == 3
+
+
+def test_client_pool_keeps_acquired_clients_open() -> None:
+    class DummyClient:
+        def __init__(self, config: HueBridgeConfig) -> None:
+            self.closed = False
+
+        def close(self) -> None:
+            self.closed = True
+
+    now = [0.0]
+    pool = HueClientPool(factory=DummyClient, idle_timeout=60.0, clock=lambda: now[0])
+    config = HueBridgeConfig(id="b1", bridge_ip="1.2.3.4", application_key="key")
+
+    streaming = pool.acquire(config)
+    now[0] = 600.0
+    assert pool.get(config) is streaming
+    assert not streaming.closed
+
+    pool.release("b1")
+    now[0] = 650.0
+    assert pool.get(config) is streaming
+    now[0] = 800.0
+    assert pool.get(config) is not streaming
+    assert streaming.closed
+
+
+@responses.activate
+def test_get_all_resources_uses_single_request(client: HueBridgeClient) -> None:
+    responses.add(
+        responses.GET,
+        "http://1.2.3.4/clip/v2/resource",
+        json={
+            "data": [
+                {"id": "1", "type": "light", "metadata": {"name": "Lamp"}},
+                {"id": "2", "type": "room", "metadata": {"name": "Room"}},
+            ]
+        },
+        status=200,
+    )
+
+    resources = list(client.get_all_resources())
+
+    assert [(item.id, item.type) for item in resources] == [("1", "light"), ("2", "room")]
+    assert len(responses.calls) == 1
+
+
+def test_sse_parser_handles_split_chunks_and_fields() -> None:
+    stream = (
+        b": hi\r\n\r\n"
+        b"id: 1:0\r\ndata: [{\"a\":\r\ndata:1}]\r\n\r\n"
+        b"id: 2:0\ndata: [2]\n\n"
+        b"data: [3]\n"
+    )
+    parser = SSEParser()
+    messages = []
+    for index in range(0, len(stream), 7):
+        messages.extend(parser.feed(stream[index : index + 7]))
+
+    assert messages == [b'[{"a":\n1}]', b"[2]"]
+    assert parser.last_event_id == "2:0"
+    # the incomplete message is kept until its terminating blank line
+    assert parser.feed(b"\n") == [b"[3]"]
+
+
+@responses.activate
+def test_iter_events_yields_decoded_payloads(client: HueBridgeClient) -> None:
+    responses.add(
+        responses.GET,
+        "http://1.2.3.4/eventstream/clip/v2",
+        body=b": hi\n\nid: 1:0\ndata: [{\"type\": \"update\", \"data\": []}]\n\ndata: not json\n\ndata: [1]\n\n",
+        status=200,
+        stream=True,
+    )
+
+    events = client.iter_events()
+
+    assert next(events) == [{"type": "update", "data": []}]
+    assert next(events) == [1]
+
+
+def test_resource_id_filter_matches_raw_payloads() -> None:
+    payload_filter = ResourceIdFilter(["rid-1", "rid-10", ""])
+
+    assert payload_filter.matches(b'[{"data":[{"id":"rid-10"}]}]')
+    assert payload_filter.matches(b'[{"data":[{"id":"rid-1"}]}]')
+    assert not payload_filter.matches(b'[{"data":[{"id":"rid-2"}]}]')
+    assert not ResourceIdFilter().matches(b'[{"data":[{"id":"rid-1"}]}]')
+
+
+@responses.activate
+def test_iter_raw_events_reports_connects_and_heartbeats(client: HueBridgeClient) -> None:
+    responses.add(
+        responses.GET,
+        "http://1.2.3.4/eventstream/clip/v2",
+        body=b": hi\n\ndata: [1]\n\n",
+        status=200,
+        stream=True,
+    )
+    calls = []
+
+    events = client.iter_raw_events(
+        on_connect=lambda: calls.append("connect"),
+        on_disconnect=lambda: calls.append("disconnect"),
+        on_heartbeat=lambda: calls.append("heartbeat"),
+    )
+
+    assert next(events) == b"[1]"
+    assert calls == ["connect"]
+    assert next(events) == b"[1]"
+    assert calls == ["connect", "heartbeat", "disconnect", "connect"]
+    events.close()
+    assert calls[-1] == "disconnect"
@@ -0,0 +1,19 @@
+import pytest
+
+from hue_plugin.latency import LatencyHistogram, parse_creation_time
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for value in [3.0] * 90 + [40.0] * 8 + [900.0] * 2:
+        histogram.observe(value)
+
+    summary = histogram.summary()
+
+    assert summary["count"] == 100
+    assert 2.0 < summary["p50"] <= 5.0
+    assert 20.0 < summary["p95"] <= 50.0
+    assert 500.0 < summary["p99"] <= 900.0
+    assert summary["max"] == 900.0
+    assert parse_creation_time("2024-01-01T12:00:00.250Z") == pytest.approx(1704110400.25)
+    assert parse_creation_time("gestern") is None
@@ -0,0 +1,68 @@
+import urllib.request
+
+import pytest
+
+from hue_plugin.metrics import CONTENT_TYPE, Gauge, MetricsRegistry, serve_metrics
+
+
+def test_registry_renders_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Requests.", ("bridge", "status"))
+    depth = registry.gauge("demo_queue_depth", "Queue depth.")
+    latency = registry.histogram("demo_seconds", "Latency.", ("bridge",), buckets=(0.1, 1.0))
+    requests.inc(bridge='og "1"', status="200")
+    requests.inc(2, bridge='og "1"', status="200")
+    depth.set(4)
+    for value in (0.05, 0.5, 3.0):
+        latency.observe(value, bridge="a")
+
+    text = registry.render()
+
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{bridge="og \\"1\\"",status="200"} 3' in text
+    assert "demo_queue_depth 4" in text
+    assert 'demo_seconds_bucket{bridge="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{bridge="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{bridge="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{bridge="a"} 3.55' in text
+    assert 'demo_seconds_count{bridge="a"} 3' in text
+    assert registry.counter("demo_requests_total", "Requests.", ("bridge", "status")) is requests
+    with pytest.raises(ValueError):
+        requests.inc(bridge="a")
+    with pytest.raises(ValueError):
+        registry.gauge("demo_requests_total", "Requests.")
+
+
+def test_collectors_are_rendered_on_every_scrape():
+    registry = MetricsRegistry()
+    calls = []
+
+    def collect():
+        calls.append(1)
+        scrapes = Gauge("demo_scrapes", "Scrapes.")
+        scrapes.set(len(calls))
+        return [scrapes]
+
+    registry.register_collector(collect)
+    registry.render()
+    assert "demo_scrapes 2" in registry.render()
+    registry.unregister_collector(collect)
+    assert "demo_scrapes" not in registry.render()
+    assert len(calls) == 2
+
+
+def test_serve_metrics_over_http():
+    registry = MetricsRegistry()
+    registry.counter("demo_total", "Demo.").inc()
+    server = serve_metrics(0, "127.0.0.1", registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode()
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert content_type == CONTENT_TYPE
+    assert "demo_total 1" in body
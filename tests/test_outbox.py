@@ -0,0 +1,136 @@
+import threading
+
+from hue_plugin.config import HueBridgeConfig, VirtualInputConfig
+from hue_plugin.event_forwarder import BridgeWorker, EventStateStore, load_event_state
+from hue_plugin.outbox import DeliveryOutbox, mapping_max_age
+
+
+class FlakySender:
+    available = True
+
+    def __init__(self) -> None:
+        self.online = False
+        self.events: list[tuple[str, str]] = []
+
+    def send(self, virtual_input: str, value: str) -> None:
+        if not self.online:
+            raise RuntimeError("Miniserver nicht erreichbar")
+        self.events.append((virtual_input, value))
+
+
+def motion_mapping(**overrides):
+    values = dict(
+        id="motion-1",
+        bridge_id="bridge-1",
+        resource_id="rid-motion",
+        resource_type="motion",
+        virtual_input="VI.Motion",
+        inactive_value="0",
+    )
+    values.update(overrides)
+    return VirtualInputConfig(**values)
+
+
+def test_outbox_retries_failed_deliveries_in_order(tmp_path):
+    config = HueBridgeConfig(id="bridge-1", bridge_ip="192.0.2.1", application_key="abc")
+    store = EventStateStore(tmp_path / "state.json")
+    sender = FlakySender()
+    outbox = DeliveryOutbox(tmp_path / "state.outbox", lambda: sender, store.record, base_delay=60.0)
+    worker = BridgeWorker(
+        config,
+        sender_provider=lambda: sender,
+        global_stop=threading.Event(),
+        state_store=store,
+        outbox=outbox,
+    )
+    worker.update_mappings([motion_mapping()])
+
+    def payload(motion: bool):
+        return [{"type": "update", "data": [{"id": "rid-motion", "type": "motion", "motion": {"motion": motion}}]}]
+
+    worker._handle_payload(payload(True), sender)
+    worker._delivery.join(timeout=2.0)
+    sender.online = True
+    # queued behind the failed value instead of overtaking it
+    worker._handle_payload(payload(False), sender)
+    worker._delivery.join(timeout=2.0)
+    assert sender.events == []
+    assert outbox.stats()["pending"] == 2
+
+    assert outbox.drain()
+    worker.stop()
+    outbox.close()
+
+    assert sender.events == [("VI.Motion", "1"), ("VI.Motion", "0")]
+    assert outbox.stats() == {"queued": 2, "delivered": 2, "expired": 0, "retries": 0, "pending": 0}
+    events = load_event_state(tmp_path / "state.json")["events"]
+    assert [(event["state"], event["delivered"], event["extra"]["outbox"]) for event in events] == [
+        ("active", True, "delivered"),
+        ("inactive", True, "delivered"),
+    ]
+    assert not (tmp_path / "state.outbox").exists()
+
+
+def test_outbox_drops_values_older_than_max_age(tmp_path):
+    now = [1000.0]
+    recorded = []
+    sender = FlakySender()
+    outbox = DeliveryOutbox(
+        tmp_path / "state.outbox",
+        lambda: sender,
+        lambda mapping, **kwargs: recorded.append(kwargs),
+        clock=lambda: now[0],
+    )
+    outbox.put(motion_mapping(), "1", event_type="motion", state="active")
+    outbox.put(motion_mapping(id="motion-2", virtual_input="VI.Other", max_age_ms=120_000), "1",
+               event_type="motion", state="active")
+
+    now[0] += 31.0
+    sender.online = True
+    assert outbox.drain()
+    outbox.close()
+
+    assert mapping_max_age(motion_mapping()) == 30.0
+    assert sender.events == [("VI.Other", "1")]
+    assert [(item["delivered"], item["extra"]["outbox"]) for item in recorded] == [
+        (False, "expired"),
+        (True, "delivered"),
+    ]
+
+
+def test_outbox_keeps_pending_values_across_restarts(tmp_path):
+    path = tmp_path / "state.outbox"
+    sender = FlakySender()
+    outbox = DeliveryOutbox(path, lambda: sender)
+    outbox.put(motion_mapping(), "1", event_type="motion", state="active")
+    outbox.put(motion_mapping(), "0", event_type="motion", state="inactive")
+    outbox.close()
+    assert path.exists()
+
+    sender.online = True
+    reopened = DeliveryOutbox(path, lambda: sender)
+    assert reopened.pending() == 2
+    reopened.start()
+    reopened.close()
+
+    assert sender.events == [("VI.Motion", "1"), ("VI.Motion", "0")]
+    assert not path.exists()
+
+
+def test_outbox_lanes_follow_the_delivery_lanes_of_mappings(tmp_path):
+    path = tmp_path / "state.outbox"
+    sender = FlakySender()
+    outbox = DeliveryOutbox(path, lambda: sender)
+    outbox.put(motion_mapping(), "1", event_type="motion", state="active")
+
+    # another mapping on the same virtual input is ordered by its own lane
+    assert outbox.pending_for("motion-1")
+    assert not outbox.pending_for("motion-2")
+    outbox.close()
+
+    reopened = DeliveryOutbox(path, lambda: sender)
+    assert reopened.pending_for("motion-1")
+    sender.online = True
+    reopened.close()
+
+    assert sender.events == [("VI.Motion", "1")]
@@ -0,0 +1,168 @@
+import json
+import threading
+
+from hue_plugin.config import HueBridgeConfig
+from hue_plugin.hue_client import HueBridgeError, HueClientPool, HueResource
+from hue_plugin.resource_mirror import ResourceMirror, ResourceMirrorRegistry
+
+
+class DummyClient:
+    def __init__(self) -> None:
+        self.fetches = 0
+        self.resources = [
+            HueResource(
+                id="light-1",
+                type="light",
+                metadata={"name": "Desk"},
+                data={"on": {"on": False}, "dimming": {"brightness": 10.0}},
+            ),
+            HueResource(id="room-1", type="room", metadata={"name": "Office"}, data={}),
+        ]
+
+    def get_all_resources(self):
+        self.fetches += 1
+        return list(self.resources)
+
+
+def make_mirror(now):
+    client = DummyClient()
+    mirror = ResourceMirror(client, max_staleness=60.0, degraded_staleness=5.0, clock=lambda: now[0])
+    return client, mirror
+
+
+def test_mirror_bootstraps_once_and_serves_from_memory():
+    now = [0.0]
+    client, mirror = make_mirror(now)
+
+    lights = mirror.get_lights()
+    rooms = mirror.get_rooms()
+
+    assert [light.metadata["name"] for light in lights] == ["Desk"]
+    assert [room.id for room in rooms] == ["room-1"]
+    assert client.fetches == 1
+
+
+def test_mirror_applies_stream_events():
+    now = [0.0]
+    client, mirror = make_mirror(now)
+    mirror.bootstrap()
+    previous = mirror.get_resource("light", "light-1")
+
+    mirror.apply_event(
+        [
+            {
+                "type": "update",
+                "data": [{"id": "light-1", "type": "light", "on": {"on": True}}],
+            },
+            {
+                "type": "add",
+                "data": [{"id": "light-2", "type": "light", "metadata": {"name": "New"}}],
+            },
+            {"type": "delete", "data": [{"id": "room-1", "type": "room"}]},
+        ]
+    )
+
+    light = mirror.get_resource("light", "light-1")
+    assert light.data["on"] == {"on": True}
+    assert light.data["dimming"] == {"brightness": 10.0}
+    assert previous.data["on"] == {"on": False}
+    assert mirror.get_resource("light", "light-2").metadata["name"] == "New"
+    assert mirror.get_rooms() == []
+    assert client.fetches == 1
+
+
+def test_mirror_refetches_when_stale():
+    now = [0.0]
+    client, mirror = make_mirror(now)
+    mirror.get_lights()
+
+    now[0] = 4.0
+    mirror.get_lights()
+    assert client.fetches == 1
+
+    now[0] = 10.0
+    mirror.get_lights()
+    assert client.fetches == 2
+
+
+def test_registry_feeds_mirror_from_external_stream():
+    client = DummyClient()
+    registry = ResourceMirrorRegistry(HueClientPool(factory=lambda config: client), follow_events=False)
+    config = HueBridgeConfig(id="b", bridge_ip="192.0.2.1", application_key="k")
+
+    mirror = registry.feed(config)
+    mirror.stream_connected()
+    mirror.stream_message(
+        json.dumps([{"type": "update", "data": [{"id": "light-1", "type": "light", "on": {"on": True}}]}]).encode()
+    )
+
+    assert registry.feed(config) is mirror
+    assert registry.get(config) is mirror
+    assert mirror.stream_live
+    assert mirror.get_resource("light", "light-1").data["on"] == {"on": True}
+    assert client.fetches == 1
+    mirror.stream_closed(5.0)
+    assert registry.stream_stats()["b"] == {"connected": False, "connects": 1, "disconnects": 1, "backoff": 5.0}
+    registry.discard("b")
+    assert registry.get(config) is not mirror
+
+
+def test_registry_leaves_fed_mirror_to_its_feeder():
+    client = DummyClient()
+    registry = ResourceMirrorRegistry(HueClientPool(factory=lambda config: client))
+    config = HueBridgeConfig(id="b", bridge_ip="192.0.2.1", application_key="k")
+    mirror = registry.feed(config)
+
+    registry.discard("b", keep_fed=True)
+    assert registry.get(config) is mirror
+
+    # the connection changed: reads are answered without a second stream
+    moved = HueBridgeConfig(id="b", bridge_ip="192.0.2.2", application_key="k")
+    replacement = registry.get(moved)
+    assert replacement is not mirror
+    assert replacement._thread is None
+    assert registry.feed(moved) is replacement
+    registry.clear()
+
+
+class StreamingClient(DummyClient):
+    """Event stream that reconnects once after a clean close, then fails."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.mirror = None
+        self.done = threading.Event()
+
+    def iter_raw_events(self, *, on_connect=None, on_disconnect=None, on_heartbeat=None):
+        for name in ("First", "Second"):
+            # changed on the bridge while the stream was down
+            self.resources[0] = HueResource(id="light-1", type="light", metadata={"name": name}, data={})
+            assert not self.mirror.stream_live
+            on_connect()
+            assert self.mirror.stream_live
+            yield json.dumps(
+                [{"type": "update", "data": [{"id": "light-1", "type": "light", "on": {"on": True}}]}]
+            ).encode()
+            on_disconnect()  # clean close; the client reconnects internally
+            assert not self.mirror.stream_live
+        self.mirror.stop()
+        self.done.set()
+        raise HueBridgeError("stream closed")
+
+
+def test_mirror_stream_bootstraps_after_every_connect():
+    client = StreamingClient()
+    mirror = ResourceMirror(client)
+    client.mirror = mirror
+
+    mirror.start()
+    assert client.done.wait(timeout=5)
+    mirror._thread.join(timeout=5)
+
+    assert client.fetches == 2
+    light = mirror.get_resource("light", "light-1")
+    assert light.metadata["name"] == "Second"
+    assert light.data["on"] == {"on": True}
+    assert mirror.stream_stats()["connects"] == 2
+    assert mirror.stream_stats()["disconnects"] == 2
+    assert not mirror.stream_live
@@ -0,0 +1,194 @@
+from concurrent.futures import Future
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from hue_plugin import server
+from hue_plugin.color import rgb_to_xy
+
+
+class RecordingClient:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def scene_grouped_light_id(self, scene_id, **kwargs):
+        self.calls.append(("resolve", scene_id, kwargs))
+        return "grouped-1"
+
+
+class RecordingScheduler:
+    def __init__(self, calls) -> None:
+        self.calls = calls
+
+    def submit(self, rtype, rid, body):
+        self.calls.append((rtype, rid, body))
+        future = Future()
+        future.set_result(None)
+        return future
+
+
+@pytest.fixture()
+def hue_client():
+    client = RecordingClient()
+    scheduler = RecordingScheduler(client.calls)
+    server.app.dependency_overrides[server.get_client] = lambda: client
+    server.app.dependency_overrides[server.get_reader] = lambda: client
+    server.app.dependency_overrides[server.get_scheduler] = lambda: scheduler
+    try:
+        yield client
+    finally:
+        server.app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def http() -> TestClient:
+    return TestClient(server.app)
+
+
+def test_light_state_supports_color_and_temperature(hue_client, http):
+    response = http.post(
+        "/lights/light-1/state",
+        json={"on": True, "rgb": "#ff0000", "temperature": 2700, "transition": 400},
+    )
+
+    assert response.status_code == 204
+    kind, light_id, body = hue_client.calls[0]
+    assert (kind, light_id) == ("light", "light-1")
+    assert body["on"] == {"on": True}
+    x, y = rgb_to_xy((255, 0, 0))
+    assert body["color"]["xy"] == {"x": pytest.approx(x), "y": pytest.approx(y)}
+    assert body["color_temperature"] == {"mirek": int(round(1_000_000 / 2700))}
+    assert body["dynamics"] == {"duration": 400}
+
+
+def test_light_state_accepts_xy_and_mirek(hue_client, http):
+    response = http.post(
+        "/lights/light-1/state",
+        json={"xy": [0.3, 0.4], "mirek": 300},
+    )
+
+    assert response.status_code == 204
+    _, _, body = hue_client.calls[0]
+    assert body["color"]["xy"] == {"x": 0.3, "y": 0.4}
+    assert body["color_temperature"] == {"mirek": 300}
+
+
+def test_light_state_rejects_invalid_rgb(hue_client, http):
+    response = http.post("/lights/light-1/state", json={"rgb": "nope"})
+
+    assert response.status_code == 400
+    assert hue_client.calls == []
+
+
+def test_scene_activation_with_transition(hue_client, http):
+    response = http.post(
+        "/scenes/scene-1/activate",
+        json={"target_rid": "room-1", "target_rtype": "room", "transition": 1500},
+    )
+
+    assert response.status_code == 204
+    assert hue_client.calls == [
+        (
+            "scene",
+            "scene-1",
+            {
+                "recall": {
+                    "action": "active",
+                    "target": {"rid": "room-1", "rtype": "room"},
+                    "dynamics": {"duration": 1500},
+                }
+            },
+        )
+    ]
+
+
+def test_scene_deactivation_without_body(hue_client, http):
+    response = http.post("/scenes/scene-1/deactivate")
+
+    assert response.status_code == 204
+    assert hue_client.calls == [
+        (
+            "resolve",
+            "scene-1",
+            {"target_rid": None, "target_rtype": None, "topology": None},
+        ),
+        ("grouped_light", "grouped-1", {"on": {"on": False}}),
+    ]
+
+
+def test_events_long_poll_returns_new_events(http):
+    from hue_plugin.event_feed import EventFeed
+
+    feed = EventFeed()
+    feed.publish([{"event_id": 1, "state": "active"}, {"event_id": 2, "state": "reset"}])
+    server.app.dependency_overrides[server.get_event_feed] = lambda: feed
+    try:
+        response = http.get("/events", params={"after": 1, "timeout": 1})
+        recent = http.get("/events", params={"limit": 1})
+    finally:
+        server.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == {"events": [{"event_id": 2, "state": "reset"}], "latest_event_id": 2}
+    assert recent.json()["events"] == [{"event_id": 2, "state": "reset"}]
+
+
+def test_metrics_endpoint_exposes_text_format(http):
+    response = http.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE hue_process_threads gauge" in response.text
+    assert "hue_client_pool_clients " in response.text
+
+
+def test_embedded_forwarder_feeds_events_directly(tmp_path, monkeypatch):
+    from hue_plugin.config import PluginConfig, VirtualInputConfig, save_config
+
+    save_config(PluginConfig(), tmp_path / "config.json")
+    monkeypatch.setenv("HUE_PLUGIN_CONFIG", str(tmp_path / "config.json"))
+    monkeypatch.setenv("HUE_PLUGIN_EMBEDDED_FORWARDER", "1")
+    mapping = VirtualInputConfig(
+        id="motion-1",
+        bridge_id="bridge-1",
+        resource_id="rid-motion",
+        resource_type="motion",
+        virtual_input="VI.Motion",
+    )
+
+    with TestClient(server.app) as http:
+        forwarder = server._forwarder
+        assert forwarder is not None
+        assert server.get_event_feed() is server.event_feed
+        marker = tmp_path / "embedded_forwarder.pid"
+        assert marker.read_text().strip() == str(os.getpid())
+        event = forwarder._state_store.record(mapping, event_type="motion", state="active", value="1")
+        response = http.get("/events", params={"after": event["event_id"] - 1})
+        stats = http.get("/forwarder/stats")
+
+    assert response.json()["events"][0]["event_id"] == event["event_id"]
+    assert stats.status_code == 200
+    assert set(stats.json()) == {"streams", "events", "delivery", "outbox", "latency"}
+    assert server._forwarder is None
+    assert not marker.exists()
+    assert (tmp_path / "runtime_state.json").exists()
+
+
+def test_bridge_update_keeps_mirror_fed_by_embedded_forwarder(monkeypatch):
+    from hue_plugin.config import HueBridgeConfig
+    from hue_plugin.hue_client import HueClientPool
+    from hue_plugin.resource_mirror import ResourceMirrorRegistry
+
+    registry = ResourceMirrorRegistry(HueClientPool(factory=lambda config: RecordingClient()))
+    config = HueBridgeConfig(id="bridge-1", bridge_ip="192.0.2.1", application_key="k")
+    mirror = registry.feed(config)
+    monkeypatch.setattr(server, "mirror_registry", registry)
+    monkeypatch.setattr(server, "_forwarder", object())
+
+    server._discard_bridge("bridge-1")
+
+    assert registry.get(config) is mirror
+    monkeypatch.setattr(server, "_forwarder", None)
+    server._discard_bridge("bridge-1")
+    assert registry.stream_stats() == {}
@@ -0,0 +1,72 @@
+from hue_plugin.hue_client import HueResource
+from hue_plugin.topology import ResourceTopology
+
+
+def _resource(rid, rtype, name=None, **data):
+    metadata = {"name": name} if name else {}
+    return HueResource(id=rid, type=rtype, metadata=metadata, data=data)
+
+
+def build_topology() -> ResourceTopology:
+    return ResourceTopology(
+        [
+            _resource("light-1", "light", "Desk", owner={"rid": "device-1", "rtype": "device"}),
+            _resource(
+                "device-1",
+                "device",
+                "Desk bulb",
+                services=[{"rid": "light-1", "rtype": "light"}],
+            ),
+            _resource("room-1", "room", "Office", children=[{"rid": "device-1", "rtype": "device"}]),
+            _resource("zone-1", "zone", "Upstairs", children=[{"rid": "light-1", "rtype": "light"}]),
+            _resource(
+                "scene-1",
+                "scene",
+                "Focus",
+                group={"rid": "room-1", "rtype": "room"},
+                actions=[
+                    {"target": {"rid": "light-1", "rtype": "light"}},
+                    {"target": {"rid": "light-1", "rtype": "light"}},
+                ],
+            ),
+            _resource("grouped-1", "grouped_light", owner={"rid": "room-1", "rtype": "room"}),
+            _resource("grouped-2", "grouped_light", owner={"rid": "zone-1", "rtype": "zone"}),
+        ]
+    )
+
+
+def test_topology_resolves_light_relationships():
+    topology = build_topology()
+
+    assert topology.rooms_for_light("light-1") == [{"id": "room-1", "name": "Office"}]
+    assert topology.zones_for_light("light-1") == [{"id": "zone-1", "name": "Upstairs"}]
+    assert topology.scenes_for_light("light-1") == [{"id": "scene-1", "name": "Focus"}]
+    assert topology.owner("light-1").id == "device-1"
+
+
+def test_topology_resolves_scene_group_and_grouped_light():
+    topology = build_topology()
+
+    assert topology.scene_group("scene-1") == {"rid": "room-1", "rtype": "room", "name": "Office"}
+    assert topology.grouped_light_for("room-1", "room") == "grouped-1"
+    assert topology.grouped_light_for("zone-1") == "grouped-2"
+    assert topology.grouped_light_for("room-1", "zone") is None
+
+
+def test_deactivate_scene_uses_topology_without_lookups():
+    calls = []
+
+    from hue_plugin.hue_client import HueBridgeClient
+
+    class Client:
+        scene_grouped_light_id = HueBridgeClient.scene_grouped_light_id
+
+        def get_scene(self, scene_id):  # pragma: no cover - must not be called
+            raise AssertionError
+
+        def set_grouped_light_state(self, grouped_light_id, *, on=None):
+            calls.append((grouped_light_id, on))
+
+    HueBridgeClient.deactivate_scene(Client(), "scene-1", topology=build_topology())  # type: ignore[arg-type]
+
+    assert calls == [("grouped-1", False)]
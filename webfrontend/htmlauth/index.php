@@ -391,6 +391,11 @@ function normalise_virtual_input(array $entry, array $bridges, array $existing):
     if ($resetDelay < 0) {
         $resetDelay = 0;
     }
+    $maxAge = isset($entry['max_age_ms']) && $entry['max_age_ms'] !== ''
+        ? max(0, (int) $entry['max_age_ms'])
+        : null;
+    $dedupWindow = isset($entry['dedup_window_ms']) ? max(0, (int) $entry['dedup_window_ms']) : 0;
+    $minInterval = isset($entry['min_interval_ms']) ? max(0, (int) $entry['min_interval_ms']) : 0;
 
     $id = isset($entry['id']) && $entry['id'] !== ''
         ? (string) $entry['id']
@@ -408,6 +413,9 @@ function normalise_virtual_input(array $entry, array $bridges, array $existing):
         'inactive_value' => $inactiveValue,
         'reset_value' => $resetValue,
         'reset_delay_ms' => $resetDelay,
+        'max_age_ms' => $maxAge,
+        'dedup_window_ms' => $dedupWindow,
+        'min_interval_ms' => $minInterval,
     ];
 }
 
@@ -894,9 +902,121 @@ function process_is_running(int $pid): bool
     return $exitCode === 0;
 }
 
+function embedded_forwarder_marker_file(): string
+{
+    return dirname(plugin_config_path()) . '/embedded_forwarder.pid';
+}
+
+/**
+ * Whether the running REST service runs the event forwarder itself.
+ *
+ * The service writes its pid to a marker file; if that cannot be checked
+ * (e.g. another user owns the process) the service is asked directly.
+ * The environment of the web server does not matter.
+ */
+function embedded_forwarder_running(): bool
+{
+    $marker = embedded_forwarder_marker_file();
+    if (is_file($marker)) {
+        $pid = (int) trim((string) @file_get_contents($marker));
+        if (process_is_running($pid)) {
+            return true;
+        }
+    }
+
+    $context = stream_context_create([
+        'http' => [
+            'method' => 'GET',
+            'timeout' => 1,
+            'ignore_errors' => true,
+        ],
+    ]);
+    $raw = @file_get_contents(service_base_url() . '/forwarder/stats', false, $context);
+    if ($raw === false || !isset($http_response_header[0])) {
+        return false;
+    }
+
+    return preg_match('#^HTTP/\S+\s+200\b#', $http_response_header[0]) === 1;
+}
+
 function start_event_forwarder(): void
 {
-    $pidFile = event_forwarder_pid_file();
+    if (embedded_forwarder_running()) {
+        // Der Forwarder läuft im REST-Dienst und nutzt dessen Verbindungen.
+        return;
+    }
+
+    start_python_service('hue_plugin.event_forwarder', event_forwarder_pid_file(), event_forwarder_log_file());
+}
+
+function command_daemon_pid_file(): string
+{
+    return plugin_var_dir() . '/command_daemon.pid';
+}
+
+function command_daemon_log_file(): string
+{
+    return plugin_var_dir() . '/command_daemon.log';
+}
+
+function command_daemon_socket_path(): string
+{
+    $override = getenv('HUE_PLUGIN_COMMAND_SOCKET');
+    if ($override !== false && $override !== '') {
+        return $override;
+    }
+
+    return dirname(plugin_config_path()) . '/hue_commands.sock';
+}
+
+function service_base_url(): string
+{
+    $host = getenv('HUE_PLUGIN_SERVICE_HOST');
+    $port = getenv('HUE_PLUGIN_SERVICE_PORT');
+    $host = ($host !== false && $host !== '') ? $host : '127.0.0.1';
+    $port = ($port !== false && $port !== '') ? $port : '5510';
+
+    return 'http://' . $host . ':' . $port;
+}
+
+/**
+ * Wait for new Hue → Loxone events on the live feed of the REST service.
+ *
+ * Returns null if the service is not reachable so the caller can fall back
+ * to polling via the CLI.
+ */
+function fetch_event_feed(?int $after, int $timeout): ?array
+{
+    $query = ['timeout' => (string) $timeout];
+    if ($after !== null) {
+        $query['after'] = (string) $after;
+    }
+    $context = stream_context_create([
+        'http' => [
+            'method' => 'GET',
+            'timeout' => $timeout + 5,
+            'ignore_errors' => true,
+        ],
+    ]);
+    $raw = @file_get_contents(service_base_url() . '/events?' . http_build_query($query), false, $context);
+    if ($raw === false) {
+        return null;
+    }
+    $data = json_decode($raw, true);
+    if (!is_array($data) || !isset($data['events']) || !is_array($data['events'])) {
+        return null;
+    }
+
+    return $data;
+}
+
+function start_command_daemon(): void
+{
+    start_python_service('hue_plugin.command_daemon', command_daemon_pid_file(), command_daemon_log_file());
+}
+
+function start_python_service(string $module, string $pidFile, string $logFile): void
+{
     $varDir = plugin_var_dir();
 
     ensure_directory($varDir);
@@ -934,14 +1054,14 @@ function start_event_forwarder(): void
         'PYTHONPATH=' . escapeshellarg(implode(PATH_SEPARATOR, $segments)),
     ];
 
-    $logFile = event_forwarder_log_file();
     ensure_directory(dirname($logFile));
 
     $command = sprintf(
-        'cd %s && %s %s -m hue_plugin.event_forwarder >> %s 2>&1 & echo $!',
+        'cd %s && %s %s -m %s >> %s 2>&1 & echo $!',
         escapeshellarg(plugin_root()),
         implode(' ', $envParts),
         escapeshellcmd($python),
+        escapeshellarg($module),
         escapeshellarg($logFile)
     );
 
@@ -955,6 +1075,68 @@ function start_event_forwarder(): void
     fclose($lockHandle);
 }
 
+/**
+ * Error for a command the daemon ran but that failed, e.g. because the
+ * bridge rejected it.
+ */
+function hue_command_failed(string $message): RuntimeException
+{
+    $message = trim($message);
+    if ($message === '') {
+        $message = 'Unbekannter Fehler beim Aufruf des Hue-Dienstes.';
+    }
+
+    return new RuntimeException('Hue-Befehl fehlgeschlagen: ' . $message);
+}
+
+/**
+ * Execute a CLI command through the persistent command daemon.
+ *
+ * Returns null if the daemon is not reachable so the caller can fall back to
+ * spawning the CLI.
+ *
+ * @param list<string> $args
+ */
+function call_hue_daemon(array $args): ?array
+{
+    $socketPath = command_daemon_socket_path();
+    if (!file_exists($socketPath)) {
+        return null;
+    }
+
+    $errno = 0;
+    $errstr = '';
+    $connection = @stream_socket_client('unix://' . $socketPath, $errno, $errstr, 1.0);
+    if ($connection === false) {
+        return null;
+    }
+
+    stream_set_timeout($connection, 15);
+    $request = json_encode(['argv' => array_values($args)], JSON_UNESCAPED_SLASHES | JSON_UNESCAPED_UNICODE) . "\n";
+    if (@fwrite($connection, $request) === false) {
+        fclose($connection);
+        return null;
+    }
+    $line = fgets($connection);
+    fclose($connection);
+
+    if ($line === false) {
+        return null;
+    }
+
+    $response = json_decode($line, true);
+    if (!is_array($response)) {
+        return null;
+    }
+
+    if (empty($response['ok'])) {
+        // Der Dienst hat geantwortet: der Befehl selbst ist fehlgeschlagen.
+        throw hue_command_failed(isset($response['error']) ? (string) $response['error'] : '');
+    }
+
+    return isset($response['result']) && is_array($response['result']) ? $response['result'] : ['ok' => true];
+}
+
 function python_binary(): string
 {
     $root = plugin_root();
@@ -995,6 +1177,17 @@ function call_hue_cli(array $args): array
         // Best effort: Das Starten des Forwarders darf die eigentliche Aktion nicht verhindern.
     }
 
+    $daemonResult = call_hue_daemon($args);
+    if ($daemonResult !== null) {
+        return $daemonResult;
+    }
+
+    try {
+        start_command_daemon();
+    } catch (Throwable $daemonError) {
+        // Best effort: Der nächste Aufruf nutzt den Dienst, dieser läuft noch über die CLI.
+    }
+
     $process = proc_open($command, $descriptors, $pipes, plugin_root());
     if (!is_resource($process)) {
         throw new RuntimeException('Hue-Dienst konnte nicht gestartet werden.');
@@ -1246,6 +1439,23 @@ function handle_ajax(string $configPath): void
                 respond_json(['events' => $events, 'states' => $states, 'metadata' => $metadata]);
                 break;
 
+            case 'virtual_input_events_feed':
+                $afterRaw = trim((string) ($_GET['after'] ?? ''));
+                $after = ($afterRaw !== '' && preg_match('/^-?\d+$/', $afterRaw)) ? (int) $afterRaw : null;
+                if (function_exists('session_write_close')) {
+                    session_write_close();
+                }
+                $feed = fetch_event_feed($after, 25);
+                if ($feed === null) {
+                    respond_json(['events' => [], 'latest_event_id' => null, 'live' => false]);
+                }
+                respond_json([
+                    'events' => $feed['events'],
+                    'latest_event_id' => $feed['latest_event_id'] ?? null,
+                    'live' => true,
+                ]);
+                break;
+
             case 'clear_virtual_events':
                 call_hue_cli(['clear-virtual-events']);
                 respond_json(['ok' => true]);
@@ -2813,6 +3023,79 @@ header('Content-Type: text/html; charset=utf-8');
         }, 10000);
       };
 
+      const stopVirtualEventPolling = () => {
+        if (virtualEventsInterval) {
+          window.clearInterval(virtualEventsInterval);
+          virtualEventsInterval = null;
+        }
+      };
+
+      const mergeLiveEvents = (events) => {
+        if (state.virtualEventsFilters.before !== null) {
+          return;
+        }
+        if (state.virtualEventsFilters.date) {
+          loadVirtualInputEvents();
+          return;
+        }
+        const known = new Set(state.virtualInputEvents.map((event) => event.event_id));
+        const fresh = events
+          .filter((item) => item && typeof item === 'object' && !known.has(item.event_id))
+          .reverse();
+        if (!fresh.length) {
+          return;
+        }
+        fresh.forEach((event) => {
+          if (event.mapping_id) {
+            state.virtualInputStates[event.mapping_id] = event;
+          }
+        });
+        state.virtualInputEvents = fresh.concat(state.virtualInputEvents).slice(0, VIRTUAL_EVENT_LIMIT);
+        const metadata = state.virtualEventsMeta || {};
+        metadata.latest_event_id = fresh[0].event_id;
+        if (typeof metadata.total_filtered === 'number') {
+          metadata.total_filtered += fresh.length;
+          metadata.has_more = metadata.total_filtered > state.virtualInputEvents.length;
+        }
+        state.virtualEventsMeta = metadata;
+        renderVirtualInputStatus();
+      };
+
+      // Long-poll the live event feed of the REST service; falls back to
+      // periodic reloads while the service is not reachable.
+      const followVirtualEvents = async () => {
+        let cursor = null;
+        for (;;) {
+          const params = cursor === null ? {} : { after: String(cursor) };
+          let live = false;
+          try {
+            const data = await apiFetch('virtual_input_events_feed', { params });
+            live = Boolean(data.live);
+            const events = Array.isArray(data.events) ? data.events : [];
+            if (live && cursor === null) {
+              cursor = typeof data.latest_event_id === 'number' ? data.latest_event_id : 0;
+            } else if (live && events.length) {
+              cursor = events.reduce(
+                (max, event) => (typeof event.event_id === 'number' && event.event_id > max ? event.event_id : max),
+                cursor,
+              );
+              mergeLiveEvents(events);
+            }
+          } catch (error) {
+            live = false;
+          }
+          if (live) {
+            stopVirtualEventPolling();
+          } else {
+            cursor = null;
+            if (!virtualEventsInterval) {
+              startVirtualEventPolling();
+            }
+            await new Promise((resolve) => window.setTimeout(resolve, 30000));
+          }
+        }
+      };
+
       const renderVirtualInputForm = (entry = null) => {
         if (!virtualInputForm) {
           return;
@@ -3645,6 +3928,7 @@ header('Content-Type: text/html; charset=utf-8');
           const inactiveValue = virtualInputInactiveInput ? virtualInputInactiveInput.value.trim() : '';
           const resetValue = virtualInputResetInput ? virtualInputResetInput.value.trim() : '';
           const delayValue = virtualInputDelayInput ? parseInt(virtualInputDelayInput.value, 10) : 250;
+          const editedEntry = state.virtualInputs.find((item) => item.id === state.editingVirtualInputId);
           const payload = {
             id: state.editingVirtualInputId,
             name: virtualInputNameInput ? virtualInputNameInput.value.trim() : '',
@@ -3657,6 +3941,10 @@ header('Content-Type: text/html; charset=utf-8');
             inactive_value: inactiveValue,
             reset_value: resetValue,
             reset_delay_ms: Number.isFinite(delayValue) && delayValue >= 0 ? delayValue : 0,
+            // not editable in the form, keep a value set in the configuration file
+            max_age_ms: editedEntry && editedEntry.max_age_ms != null ? editedEntry.max_age_ms : null,
+            dedup_window_ms: editedEntry && editedEntry.dedup_window_ms ? editedEntry.dedup_window_ms : 0,
+            min_interval_ms: editedEntry && editedEntry.min_interval_ms ? editedEntry.min_interval_ms : 0,
           };
           try {
             const data = await apiFetch('save_virtual_input', { method: 'POST', body: payload });
@@ -3951,6 +4239,7 @@ header('Content-Type: text/html; charset=utf-8');
         await loadBridges();
         await loadVirtualInputEvents({ reset: true });
         startVirtualEventPolling();
+        followVirtualEvents();
       };
 
       init();